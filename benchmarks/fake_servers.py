@@ -0,0 +1,269 @@
+import base64
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+SAMPLE_MODULE = '''"""Generated module {index} used for benchmarking."""
+import os
+
+
+class Service{index}:
+    """Service number {index}."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def run(self, value):
+        # Repeated logic on purpose, so the analysis has something to say
+        if value > {index}:
+            return os.path.join(self.name, str(value))
+        return os.path.join(self.name, str(value * 2))
+'''
+
+
+def git_blob_sha(content):
+    """Returns the git blob SHA of the given bytes, as the tree API reports it."""
+    header = f"blob {len(content)}\0".encode("utf-8")
+    return hashlib.sha1(header + content).hexdigest()
+
+
+class FakeRepository:
+    """Deterministic in-memory repository served by the fake GitHub API."""
+
+    def __init__(self, file_count, duplicate_ratio=0.1, seed=0):
+        rng = random.Random(seed)
+        self.commit_sha = hashlib.sha1(f"commit-{file_count}".encode()).hexdigest()
+        self.files = {}
+
+        for index in range(file_count):
+            package = f"pkg{index % 50}"
+            path = f"src/{package}/module_{index}.py"
+            # A share of files reuse earlier content, like vendored copies do
+            if index and rng.random() < duplicate_ratio:
+                content = self.files["src/pkg0/module_0.py"]
+            else:
+                content = SAMPLE_MODULE.format(index=index).encode("utf-8")
+            self.files[path] = content
+            if index % 10 == 0:
+                self.files[f"docs/{package}/notes_{index}.md"] = b"# Notes\n"
+
+        self.blobs = {git_blob_sha(content): content for content in self.files.values()}
+
+    def tree(self):
+        """Returns the recursive tree listing for the repository."""
+        entries = [
+            {
+                "path": path,
+                "mode": "100644",
+                "type": "blob",
+                "sha": git_blob_sha(content),
+                "size": len(content),
+            }
+            for path, content in self.files.items()
+        ]
+        return {"sha": self.commit_sha, "tree": entries, "truncated": False}
+
+
+class _FakeServer:
+    """Runs a threaded HTTP server with configurable latency and error rate."""
+
+    def __init__(self, handler_class, latency_ms=0.0, error_rate=0.0, seed=0):
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+        self.request_count = 0
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler_class)
+        self.httpd.daemon_threads = True
+        self.httpd.fake = self
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}"
+
+    def should_fail(self):
+        """Decides (deterministically per seed) whether a request should fail."""
+        with self.random_lock:
+            self.request_count += 1
+            return self.error_rate and self.random.random() < self.error_rate
+
+    def delay(self):
+        """Sleeps for the configured latency."""
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    """Base handler that writes JSON responses and stays quiet."""
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; avoid Nagle/delayed-ACK stalls
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+
+class _GitHubHandler(_JSONHandler):
+    ROUTES = [
+        ("commits", re.compile(r"^/repos/[^/]+/[^/]+/(commits)$")),
+        ("commit", re.compile(r"^/repos/[^/]+/[^/]+/commits/(.+)$")),
+        ("tree", re.compile(r"^/repos/[^/]+/[^/]+/git/trees/([^/]+)$")),
+        ("blob", re.compile(r"^/repos/[^/]+/[^/]+/git/blobs/([0-9a-f]+)$")),
+        ("contents", re.compile(r"^/repos/[^/]+/[^/]+/contents/(.+)$")),
+    ]
+
+    # Only content requests fail, so a run always has a tree to work with
+    FALLIBLE_ROUTES = ("blob", "contents")
+
+    def do_GET(self):
+        fake = self.server.fake
+        fake.delay()
+
+        parsed = urlparse(self.path)
+        for name, pattern in self.ROUTES:
+            match = pattern.match(parsed.path)
+            if match:
+                if name in self.FALLIBLE_ROUTES and fake.should_fail():
+                    return self._send_json(500, {"message": "Injected failure"})
+                return getattr(self, f"_get_{name}")(
+                    unquote(match.group(1)), parse_qs(parsed.query)
+                )
+        return self._send_json(404, {"message": "Not Found"})
+
+    def _get_commits(self, _, query):
+        self._send_json(200, [{"sha": self.server.fake.repository.commit_sha}])
+
+    def _get_commit(self, ref, query):
+        self._send_json(200, {"sha": self.server.fake.repository.commit_sha})
+
+    def _get_tree(self, ref, query):
+        self._send_json(200, self.server.fake.repository.tree())
+
+    def _send_content(self, content):
+        self._send_json(
+            200,
+            {
+                "sha": git_blob_sha(content),
+                "size": len(content),
+                "encoding": "base64",
+                "content": base64.b64encode(content).decode("ascii"),
+            },
+        )
+
+    def _get_blob(self, sha, query):
+        content = self.server.fake.repository.blobs.get(sha)
+        if content is None:
+            return self._send_json(404, {"message": "Not Found"})
+        self._send_content(content)
+
+    def _get_contents(self, path, query):
+        content = self.server.fake.repository.files.get(path)
+        if content is None:
+            return self._send_json(404, {"message": "Not Found"})
+        self._send_content(content)
+
+
+class FakeGitHubServer(_FakeServer):
+    """Local stand-in for the GitHub commits, trees, blobs and contents APIs."""
+
+    def __init__(self, repository, latency_ms=0.0, error_rate=0.0, seed=0):
+        super().__init__(_GitHubHandler, latency_ms, error_rate, seed)
+        self.repository = repository
+
+
+class _OpenAIHandler(_JSONHandler):
+    def do_POST(self):
+        fake = self.server.fake
+        request = self._read_json()
+        fake.delay()
+        if fake.should_fail():
+            return self._send_json(
+                429,
+                {"error": {"message": "Injected rate limit", "type": "rate_limit"}},
+                headers={"Retry-After": "0"},
+            )
+
+        if urlparse(self.path).path.rstrip("/") != "/v1/chat/completions":
+            return self._send_json(404, {"error": {"message": "Not Found"}})
+
+        prompt = "".join(m.get("content", "") for m in request.get("messages", []))
+        content = fake.completion_text(prompt)
+        self._send_json(
+            200,
+            {
+                "id": f"chatcmpl-{fake.request_count}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "gpt-4o-mini"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {
+                    "prompt_tokens": len(prompt) // 4,
+                    "completion_tokens": len(content) // 4,
+                    "total_tokens": (len(prompt) + len(content)) // 4,
+                },
+            },
+        )
+
+
+class FakeOpenAIServer(_FakeServer):
+    """Local stand-in for the OpenAI chat completions API."""
+
+    def __init__(self, latency_ms=0.0, error_rate=0.0, seed=0):
+        super().__init__(_OpenAIHandler, latency_ms, error_rate, seed)
+
+    @property
+    def base_url(self):
+        return f"{self.url}/v1"
+
+    def completion_text(self, prompt):
+        """Returns a well-formed analysis whose scores depend on the prompt."""
+        digest = int(hashlib.sha1(prompt.encode("utf-8")).hexdigest(), 16)
+        dry, solid = 3 + digest % 7, 3 + (digest // 7) % 7
+        return (
+            f"### DRY Analysis\n**Score: {dry}/10**\n**Summary:** Repeated branches.\n\n"
+            f"### SOLID Analysis\n**Score: {solid}/10**\n**Summary:** Small class.\n\n"
+            "### Findings\n- Line 12: Duplicate os.path.join call"
+        )
@@ -0,0 +1,288 @@
+"""End-to-end benchmarks of the analysis pipeline against local API stand-ins.
+
+Usage:
+    python -m benchmarks.run_benchmarks --sizes small medium --latency-ms 5
+    python -m benchmarks.run_benchmarks --baseline old.json --output new.json
+
+Every scenario starts a fake GitHub and a fake OpenAI server, runs
+``CodeAnalyzer.analyze_repo`` against them with the pinned configuration in
+``benchmarks/config.yaml`` and records throughput and per-stage latency
+percentiles as JSON. Peak memory is measured in a second, untimed pass, since
+tracing allocations slows the pipeline down.
+"""
+
+import argparse
+import contextlib
+import functools
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from benchmarks.fake_servers import FakeGitHubServer, FakeOpenAIServer, FakeRepository
+from src.analyzer import AnalysisResultHandler, CodeAnalyzer
+from src.disk_cache import DiskCache
+from src.metrics import metrics
+from src.unit_cache import UnitCache
+from src.utils import LogLevel, set_log_level
+
+BENCHMARK_SCHEMA = "github-code-quality-benchmark/1"
+REPO_SIZES = {"small": 10, "medium": 1000, "large": 20000}
+# Benchmarks never read config/config.yaml, so edits to it do not move results
+BENCHMARK_CONFIG = os.path.join(os.path.dirname(__file__), "config.yaml")
+
+
+def percentile(samples, pct):
+    """Returns the nearest-rank percentile of a list of samples."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+class StageTimer:
+    """Collects wall-clock latency samples per pipeline stage."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def wrap(self, stage, func):
+        """Returns func instrumented to record its latency under stage."""
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.samples[stage].append((time.perf_counter() - start) * 1000.0)
+
+        return timed
+
+    def wrap_iter(self, stage, func):
+        """Returns an iterator function instrumented to record the latency of each item."""
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            iterator = iter(func(*args, **kwargs))
+            while True:
+                start = time.perf_counter()
+                item = next(iterator, None)
+                self.samples[stage].append((time.perf_counter() - start) * 1000.0)
+                if item is None:
+                    return
+                yield item
+
+        return timed
+
+    def instrument(self, analyzer):
+        """Instruments the stages of a CodeAnalyzer instance."""
+        github_client = analyzer.github_client
+        github_client.iter_files = self.wrap_iter("get_files", github_client.iter_files)
+        github_client.get_file_content = self.wrap(
+            "fetch_file", github_client.get_file_content
+        )
+        analyzer.analyze_file = self.wrap("analyze_file", analyzer.analyze_file)
+        handler = analyzer.result_handler
+        handler.save_results = self.wrap("save_results", handler.save_results)
+
+    def summary(self):
+        """Returns count, total, p50 and p99 latency per stage in milliseconds."""
+        return {
+            stage: {
+                "count": len(samples),
+                "total_ms": round(sum(samples), 3),
+                "p50_ms": round(percentile(samples, 50), 3),
+                "p99_ms": round(percentile(samples, 99), 3),
+            }
+            for stage, samples in sorted(self.samples.items())
+        }
+
+
+@contextlib.contextmanager
+def patched_environ(values):
+    """Temporarily sets environment variables."""
+    previous = {key: os.environ.get(key) for key in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for key, value in previous.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+def isolate_caches(analyzer, output_dir):
+    """Starts every scenario with cold caches, without touching the working directory."""
+    if analyzer.unit_cache is not None:
+        analyzer.unit_cache = UnitCache(
+            os.path.join(output_dir, "units.json"), analyzer.unit_cache.fingerprint
+        )
+    if analyzer.architecture is not None:
+        analyzer.architecture.cache = DiskCache(
+            os.path.join(output_dir, "summaries.json"),
+            version=analyzer.architecture.cache.version,
+        )
+
+
+def _run_pass(repository, latency_ms, error_rate, output_dir, timer=None):
+    """Analyzes the repository once against fresh fake servers.
+
+    Returns the results, the wall-clock seconds of the run and the request
+    counts of both servers.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    with FakeGitHubServer(
+        repository, latency_ms, error_rate
+    ) as github, FakeOpenAIServer(latency_ms, error_rate) as openai_server:
+        environment = {
+            "ENABLE_ANALYSIS": "true",
+            "REPO": "bench/repo",
+            "GITHUB_BRANCH": "main",
+            "GITHUB_TOKEN": "bench-token",
+            "GITHUB_API_URL": github.url,
+            "OPENAI_API_KEY": "bench-key",
+            "OPENAI_BASE_URL": openai_server.base_url,
+            "ANALYSIS_CONFIG": BENCHMARK_CONFIG,
+        }
+        with patched_environ(environment):
+            analyzer = CodeAnalyzer()
+            analyzer.result_handler = AnalysisResultHandler(
+                output_file=os.path.join(output_dir, "analysis_feedback.md")
+            )
+            isolate_caches(analyzer, output_dir)
+            if timer is not None:
+                timer.instrument(analyzer)
+
+            start = time.perf_counter()
+            results = analyzer.analyze_repo()
+            wall_seconds = time.perf_counter() - start
+
+    return results, wall_seconds, github.request_count, openai_server.request_count
+
+
+def run_scenario(
+    name, file_count, latency_ms=0.0, error_rate=0.0, output_dir=None, memory=True
+):
+    """Runs one end-to-end scenario and returns its measurements.
+
+    The timed pass runs without allocation tracing; with `memory`, a second
+    pass over the same repository measures peak traced memory.
+    """
+    repository = FakeRepository(file_count)
+    output_dir = output_dir or tempfile.mkdtemp(prefix="bench-")
+    timer = StageTimer()
+    metrics.reset()
+
+    results, wall_seconds, github_requests, openai_requests = _run_pass(
+        repository, latency_ms, error_rate, output_dir, timer
+    )
+    files = [r for r in results.values() if r.get("kind") != "architecture"]
+    snapshot = metrics.snapshot()
+
+    peak_bytes = None
+    if memory:
+        tracemalloc.start()
+        try:
+            _run_pass(
+                repository, latency_ms, error_rate, os.path.join(output_dir, "memory")
+            )
+            _, peak_bytes = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    return {
+        "name": name,
+        "files_in_tree": len(repository.files),
+        "files_analyzed": len(files),
+        "latency_ms": latency_ms,
+        "error_rate": error_rate,
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput_files_per_second": (
+            round(len(files) / wall_seconds, 3) if wall_seconds else None
+        ),
+        "stages": timer.summary(),
+        "peak_traced_memory_bytes": peak_bytes,
+        "github_requests": github_requests,
+        "openai_requests": openai_requests,
+        "metrics": snapshot,
+    }
+
+
+def compare(baseline, current):
+    """Returns human-readable lines comparing two benchmark reports."""
+    lines = []
+    for name, scenario in current["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            lines.append(f"{name}: no baseline")
+            continue
+
+        old = previous.get("throughput_files_per_second") or 0
+        new = scenario.get("throughput_files_per_second") or 0
+        ratio = f"{new / old:.2f}x" if old else "n/a"
+        lines.append(f"{name}: throughput {old} -> {new} files/s ({ratio})")
+        for stage, stats in scenario["stages"].items():
+            before = previous.get("stages", {}).get(stage, {})
+            lines.append(
+                f"  {stage}: p50 {before.get('p50_ms')} -> {stats['p50_ms']} ms, "
+                f"p99 {before.get('p99_ms')} -> {stats['p99_ms']} ms"
+            )
+    return lines
+
+
+def run_benchmarks(sizes, latency_ms=0.0, error_rate=0.0):
+    """Runs the given repository sizes and returns the full report."""
+    scenarios = {}
+    for size in sizes:
+        file_count = REPO_SIZES.get(size) or int(size)
+        name = f"{size}-{latency_ms}ms-{error_rate}err"
+        scenarios[name] = run_scenario(name, file_count, latency_ms, error_rate)
+
+    return {
+        "schema": BENCHMARK_SCHEMA,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scenarios": scenarios,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        nargs="+",
+        default=["small", "medium"],
+        help="Repository sizes: small (10), medium (1k), large (20k) or a file count.",
+    )
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="Previous report to compare against.")
+    args = parser.parse_args(argv)
+
+    set_log_level(LogLevel.WARNING)
+    report = run_benchmarks(args.sizes, args.latency_ms, args.error_rate)
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            print("\n".join(compare(json.load(f), report)))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,20 @@
 import os
+import threading
+import time
 from openai import OpenAI
+from openai.types.chat import ChatCompletion
+from src.cassette import active_cassette, is_replaying
+from src.concurrency import AdaptiveConcurrencyLimiter, get_retry_after
 from src.config_loader import load_config
-from src.utils import log
+from src.metrics import metrics
+from src.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    Hedger,
+    RetryPolicy,
+    classify_error,
+)
+from src.utils import log, LogLevel
 
 
 class AIClientConfig:
@@ -10,15 +23,22 @@ class AIClientConfig:
     def __init__(self):
         self.config = load_config()
 
-    def get_model_settings(self):
-        """Returns OpenAI model settings from config."""
+    def get_model_settings(self, tier="default"):
+        """Returns OpenAI model settings for a model tier from config.
+
+        Tiers are configured under `models` (default, triage, escalation);
+        unset values fall back to `prompt_customization`.
+        """
+        prompt_settings = self.config.get("prompt_customization", {})
+        tier_settings = self.config.get("models", {}).get(tier) or {}
         return {
-            "model": "gpt-4o-mini",
-            "temperature": self.config.get("prompt_customization", {}).get(
-                "temperature", 0.3
+            "tier": tier,
+            "model": tier_settings.get("model", "gpt-4o-mini"),
+            "temperature": tier_settings.get(
+                "temperature", prompt_settings.get("temperature", 0.3)
             ),
-            "max_tokens": self.config.get("prompt_customization", {}).get(
-                "max_tokens", 500
+            "max_tokens": tier_settings.get(
+                "max_tokens", prompt_settings.get("max_tokens", 500)
             ),
         }
 
@@ -48,61 +68,268 @@ class PromptGenerator:
     def __init__(self, config):
         self.config = config
 
-    def generate_code_analysis_prompt(self, code):
-        """Constructs an OpenAI prompt dynamically based on YAML configuration."""
+    def generate_code_analysis_prompt(self, code, brief=False, language="Python"):
+        """Constructs an OpenAI prompt dynamically based on YAML configuration.
+
+        A brief prompt asks for terse summaries, for cheap triage passes.
+        """
         weights = self.config.get_analysis_weights()
         priorities = self.config.get_solid_priorities()
 
         prompt = (
-            "Analyze the given Python code based on DRY and SOLID principles.\n\n"
+            f"Analyze the given {language} code based on DRY and SOLID principles.\n\n"
             f"**DRY Analysis:** Focus {weights['dry_weight']*100}% on DRY principles. Identify redundant patterns, "
             "unnecessary repetition, and opportunities for logic reuse.\n\n"
             f"**SOLID Analysis:** Focus {weights['solid_weight']*100}% on SOLID principles. Prioritize {', '.join(priorities)}. "
             "Evaluate adherence to these principles and suggest improvements.\n\n"
             "For each category, assign a **score from 1 to 10**, where 1 is poor adherence and 10 is excellent adherence.\n\n"
+            "Each code line is prefixed with its line number in the original file; comments, blank lines "
+            "and docstring bodies may have been removed. Under **Findings**, list the most important "
+            "concrete issues, each anchored to the line number where it occurs.\n\n"
             f"Code:\n{code}\n\n"
             "### Response Format (Example Output):\n"
             "### DRY Analysis\n**Score: 7/10**\n**Summary:** <your analysis>\n\n"
-            "### SOLID Analysis\n**Score: 5/10**\n**Summary:** <your analysis>"
+            "### SOLID Analysis\n**Score: 5/10**\n**Summary:** <your analysis>\n\n"
+            "### Findings\n- Line 12: <issue and suggested fix>"
         )
 
+        if brief:
+            prompt += (
+                "\n\nKeep each summary to one sentence and list at most three findings."
+            )
+
         return prompt
 
+    def generate_summary_prompt(self, path, code, max_words=120):
+        """Constructs a prompt for a compact summary of one file."""
+        return (
+            f"Summarize the Python file `{path}` for an architecture review, in at most "
+            f"{max_words} words. Use exactly these bullet points:\n"
+            "- **Public API:** the classes and functions other modules use\n"
+            "- **Dependencies:** what it imports or calls, and whether it depends on "
+            "abstractions or concrete implementations\n"
+            "- **Responsibilities:** what the file is responsible for\n\n"
+            f"Code:\n```\n{code}\n```"
+        )
+
+    def generate_architecture_prompt(self, scope, summaries, import_graph):
+        """Constructs a prompt for analyzing a repository or package from summaries."""
+        weights = self.config.get_analysis_weights()
+        priorities = self.config.get_solid_priorities()
+        file_summaries = "\n\n".join(
+            f"#### {path}\n{summary}" for path, summary in sorted(summaries.items())
+        )
+        edges = "\n".join(
+            f"{path} -> {', '.join(targets)}"
+            for path, targets in sorted(import_graph.items())
+            if targets
+        )
+
+        return (
+            f"Analyze the architecture of `{scope}` based on DRY and SOLID principles, using "
+            "the file summaries and internal import graph below.\n\n"
+            f"**DRY Analysis:** Focus {weights['dry_weight']*100}% on responsibilities or logic "
+            "duplicated across modules.\n\n"
+            f"**SOLID Analysis:** Focus {weights['solid_weight']*100}% on cross-module design. "
+            f"Prioritize {', '.join(priorities)}, in particular modules depending on concrete "
+            "implementations instead of abstractions, dependency cycles and modules with "
+            "too many responsibilities.\n\n"
+            "For each category, assign a **score from 1 to 10**, where 1 is poor adherence and "
+            "10 is excellent adherence.\n\n"
+            f"File summaries:\n{file_summaries}\n\n"
+            f"Import graph (importer -> imported):\n{edges or '(no internal imports)'}\n\n"
+            "### Response Format (Example Output):\n"
+            "### DRY Analysis\n**Score: 7/10**\n**Summary:** <your analysis>\n\n"
+            "### SOLID Analysis\n**Score: 5/10**\n**Summary:** <your analysis>\n\n"
+            "### Findings\n- `path/to/module.py`: <issue and suggested fix>"
+        )
+
+
+class AnalysisError(Exception):
+    """Raised when code could not be analyzed, after any retries.
+
+    `reason` is "rate_limited", "transient", "fatal", "circuit_open" or
+    "empty_response".
+    """
+
+    def __init__(self, message, reason):
+        super().__init__(message)
+        self.reason = reason
+
 
 class AIClient:
     """Client for interacting with OpenAI API for code analysis."""
 
-    def __init__(self):
+    def __init__(self, limiter=None):
         self.api_key = self._validate_api_key()
-        self.client = OpenAI(api_key=self.api_key)
+        # Retries are handled here so that rate limits reach the adaptive limiter
+        self.client = OpenAI(api_key=self.api_key, max_retries=0)
         self.config = AIClientConfig()
         self.prompt_generator = PromptGenerator(self.config)
+        self.limiter = limiter or AdaptiveConcurrencyLimiter.from_config(
+            self.config.config
+        )
+        self.retry_policy = RetryPolicy.from_config(self.config.config)
+        self.breaker = CircuitBreaker.from_config(self.config.config)
+        self.hedger = Hedger.from_config(self.config.config)
+        # Total tokens reported by the API, for token budgets
+        self.tokens_used = 0
+        self._usage_lock = threading.Lock()
 
     def _validate_api_key(self):
         """Validates that the OpenAI API key is available."""
         api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key and is_replaying():
+            # Replayed responses need no credentials, but the SDK wants a key
+            return "replay"
         if not api_key:
             raise ValueError("OPENAI_API_KEY is not set in the environment.")
         return api_key
 
-    def analyze_code(self, code):
-        """Analyzes the given code using OpenAI for DRY & SOLID principles."""
-        prompt = self.prompt_generator.generate_code_analysis_prompt(code)
+    def _record_usage(self, model, response, duration):
+        """Records latency and token usage reported by the OpenAI response."""
+        metrics.observe("openai_request_duration_seconds", duration, model=model)
+        metrics.increment("openai_requests_total", model=model, outcome="success")
+
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            for kind in ("prompt_tokens", "completion_tokens"):
+                tokens = getattr(usage, kind, None)
+                if isinstance(tokens, int):
+                    with self._usage_lock:
+                        self.tokens_used += tokens
+                    metrics.increment(
+                        "openai_tokens_total", tokens, model=model, kind=kind
+                    )
+
+    def _create(self, **request):
+        """Creates a chat completion, through the active cassette if any."""
+        cassette = active_cassette()
+        if cassette is None:
+            return self.client.chat.completions.create(**request)
+        return cassette.play(
+            "openai",
+            request,
+            lambda: self.client.chat.completions.create(**request),
+            lambda response: response.model_dump(mode="json"),
+            ChatCompletion.model_validate,
+            summary={"model": request["model"]},
+        )
+
+    def _send_request(self, model_settings, prompt):
+        """Sends a single completion request while holding a concurrency slot."""
+        model = model_settings["model"]
+
+        with self.limiter.slot():
+            start = time.perf_counter()
+            try:
+                response = self._create(
+                    model=model,
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=model_settings["temperature"],
+                    max_tokens=model_settings["max_tokens"],
+                )
+            except Exception as e:
+                if classify_error(e) == "rate_limited":
+                    retry_after = get_retry_after(e)
+                    self.limiter.on_rate_limited(
+                        1.0 if retry_after is None else retry_after
+                    )
+                else:
+                    self.limiter.on_error()
+                raise
+
+        duration = time.perf_counter() - start
+        # Tiers use different models and prompts, so their latencies differ
+        self.limiter.on_success(duration, kind=model_settings["tier"])
+        self.hedger.observe(duration)
+        self._record_usage(model, response, duration)
+        return response
+
+    def _create_completion(self, model_settings, prompt):
+        """Sends a completion request with retries, hedging and circuit breaking.
+
+        Rate limits and transient failures are retried with jittered backoff;
+        fatal errors (e.g. authentication) are raised immediately. Only
+        transient failures count towards opening the circuit breaker; a
+        half-open probe that fails otherwise is released for the next call.
+        """
+        for attempt in range(1, self.retry_policy.max_attempts + 1):
+            probe = self.breaker.before_call()
+            try:
+                response = self.hedger.call(
+                    lambda: self._send_request(model_settings, prompt)
+                )
+            except Exception as e:
+                kind = classify_error(e)
+                if kind == "transient":
+                    self.breaker.record_failure()
+                elif probe:
+                    self.breaker.release_probe()
+                if not self.retry_policy.should_retry(kind, attempt):
+                    raise
+
+                retry_after = get_retry_after(e) if kind == "rate_limited" else None
+                delay = self.retry_policy.delay(attempt, retry_after)
+                log(
+                    f"Retrying OpenAI request in {delay:.2f}s after {kind} error: {e}",
+                    LogLevel.WARNING,
+                    rate_key="openai_retry",
+                )
+                metrics.increment("retries_total", client="openai", reason=kind)
+                time.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return response
+
+    def complete(self, prompt, tier="default"):
+        """Returns the model's response to a prompt, using the model of `tier`.
+
+        Raises AnalysisError if no response could be obtained, so that failures
+        are never mistaken for a model response.
+        """
+        model_settings = self.config.get_model_settings(tier)
+        model = model_settings["model"]
 
         try:
-            model_settings = self.config.get_model_settings()
-            response = self.client.chat.completions.create(
-                model=model_settings["model"],
-                messages=[{"role": "user", "content": prompt}],
-                temperature=model_settings["temperature"],
-                max_tokens=model_settings["max_tokens"],
-            )
-            return response.choices[0].message.content
+            response = self._create_completion(model_settings, prompt)
+        except CircuitOpenError as e:
+            raise AnalysisError(str(e), "circuit_open") from e
         except Exception as e:
-            error_message = (
-                f"Error analyzing code: {str(e)}\n\n"
-                "To resolve this, either run `openai migrate` to update your codebase to the new API "
-                "or pin your installation to an older version, e.g., `pip install openai==0.28`."
+            metrics.increment("openai_requests_total", model=model, outcome="error")
+            reason = classify_error(e)
+            log(
+                f"Error analyzing code ({reason}): {e}",
+                LogLevel.ERROR,
+                model=model,
+                rate_key="openai_error",
             )
-            log(error_message)
-            return error_message
+            raise AnalysisError(f"Error analyzing code: {e}", reason) from e
+
+        content = response.choices[0].message.content
+        if not content:
+            raise AnalysisError("OpenAI returned an empty response", "empty_response")
+        return content
+
+    def analyze_code(self, code, tier="default", language="Python"):
+        """Analyzes the given code using OpenAI for DRY & SOLID principles.
+
+        `tier` selects the configured model; the triage tier uses a brief
+        prompt. Raises AnalysisError if no analysis could be obtained.
+        """
+        prompt = self.prompt_generator.generate_code_analysis_prompt(
+            code, brief=tier == "triage", language=language
+        )
+        return self.complete(prompt, tier)
+
+    def summarize_file(self, path, code, max_words=120):
+        """Returns a compact summary of a file's API, dependencies and responsibilities."""
+        prompt = self.prompt_generator.generate_summary_prompt(path, code, max_words)
+        return self.complete(prompt, tier="summary")
+
+    def analyze_architecture(self, scope, summaries, import_graph):
+        """Analyzes the architecture of a repository or package from file summaries."""
+        prompt = self.prompt_generator.generate_architecture_prompt(
+            scope, summaries, import_graph
+        )
+        return self.complete(prompt, tier="architecture")
@@ -1,21 +1,117 @@
 import os
+import ast
+import hashlib
 import json
 import re
+import textwrap
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
 from dotenv import load_dotenv
-from src.github_client import GitHubClient
-from src.ai_client import AIClient
-from src.config_loader import load_config
-from src.utils import log
+from src.github_client import EnvironmentManager, GitHubClient, create_session
+from src.ai_client import AIClient, AnalysisError
+from src.architecture import SUMMARY_CACHE_VERSION, ArchitectureAnalyzer
+from src.baseline import Baseline
+from src.cassette import Cassette
+from src.code_compactor import CodeCompactor, estimate_tokens
+from src.concurrency import set_tenant
+from src.config_loader import load_config, config_fingerprint
+from src.disk_cache import DiskCache
+from src.file_filter import FileFilter, language_for
+from src.metrics import export_metrics, metrics
+from src.profiling import ProfilingSession, profile_stage
+from src.report_renderer import combined_score, score_weights, split_analysis_sections
+from src.result_spool import ResultSpool
+from src.result_store import ResultStore
+from src.rollup import Rollup
+from src.scheduler import BYTES_PER_TOKEN, WorkScheduler
+from src.sharding import parse_shard, select_shard, shard_suffix
+from src.unit_cache import UnitCache, extract_units
+from src.utils import log, log_context, LogLevel
 
 load_dotenv()  # Loads environment variables from .env if available
 
+# Matches "- Line 12: message" (optionally bold, optionally a range "12-14")
+FINDING_PATTERN = re.compile(
+    r"^\s*[-*]\s*\**Line\s+(\d+)(?:\s*-\s*\d+)?\**\s*[:\-–]\s*(.+)$",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+
+# Statements that carry nothing to judge: imports, `__all__`, `pass` and `...`
+TRIVIAL_STATEMENTS = (ast.Import, ast.ImportFrom, ast.Pass)
+
+
+def is_trivial(code):
+    """Returns True for empty files and boilerplate with nothing to analyze.
+
+    That covers empty or comment-only files and modules made only of a
+    docstring, imports, `__all__`, `pass` or `...`, such as most `__init__.py`.
+    """
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return not code.strip()
+
+    for node in tree.body:
+        if isinstance(node, TRIVIAL_STATEMENTS):
+            continue
+        if isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant):
+            continue
+        if isinstance(node, ast.Assign) and all(
+            isinstance(target, ast.Name) and target.id == "__all__"
+            for target in node.targets
+        ):
+            continue
+        return False
+    return True
+
+
+@contextmanager
+def pipeline_stage(name):
+    """Times a pipeline stage and profiles it when a profiling session is active."""
+    with log_context(stage=name), profile_stage(name):
+        with metrics.timer("stage_duration_seconds", stage=name):
+            yield
+
+
+def timed_stage(name, iterable):
+    """Yields from an iterable, timing the work of producing each item as a stage."""
+    iterator = iter(iterable)
+    while True:
+        with pipeline_stage(name):
+            item = next(iterator, None)
+        if item is None:
+            return
+        yield item
+
 
 class AnalysisResultHandler:
-    """Handles analysis results processing and storage."""
+    """Handles analysis results processing and storage.
+
+    `rollup` aggregates scores per directory, package and repository as
+    results are added to a spool from `create_spool`; its snapshot is stored
+    with the results.
+    """
 
-    def __init__(self, output_file="analysis_feedback.md"):
+    def __init__(
+        self, output_file="analysis_feedback.md", results_file=None, config=None
+    ):
         self.output_file = output_file
-        self.config = load_config()
+        self.config = load_config() if config is None else config
+        self.metadata = None
+        self.rollup = Rollup.from_config(self.config)
+        self.store = ResultStore(
+            results_file
+            or os.path.join(os.path.dirname(output_file), "analysis_results.jsonl")
+        )
+
+    def create_spool(self):
+        """Returns an empty ResultSpool that keeps the rollup up to date."""
+        return ResultSpool(on_add=self.rollup.update)
+
+    def set_metadata(self, metadata):
+        """Sets the run metadata (commit SHA, config fingerprint) stored with results."""
+        self.metadata = metadata
 
     def extract_scores(self, response_text):
         """Extracts DRY and SOLID scores (1-10) from OpenAI's response."""
@@ -31,6 +127,19 @@ class AnalysisResultHandler:
 
         return dry_score, solid_score
 
+    def extract_findings(self, response_text):
+        """Extracts line-anchored findings from the Findings section of a response."""
+        section = re.split(r"### Findings\s*\n", response_text, maxsplit=1)
+        if len(section) < 2:
+            return []
+
+        findings = []
+        for match in FINDING_PATTERN.finditer(section[1]):
+            findings.append(
+                {"line": int(match.group(1)), "message": match.group(2).strip()}
+            )
+        return findings
+
     def format_result(self, path, analysis):
         """Creates a formatted result object from the analysis text."""
         dry_score, solid_score = self.extract_scores(analysis)
@@ -39,10 +148,130 @@ class AnalysisResultHandler:
             "dry_score": dry_score if dry_score is not None else "N/A",
             "solid_score": solid_score if solid_score is not None else "N/A",
             "full_analysis": analysis,
+            "findings": self.extract_findings(analysis),
+        }
+
+    def format_failure(self, path, error):
+        """Creates a result object for a file whose analysis failed.
+
+        Failed results carry `status: failed` and the error instead of an
+        analysis, so they are never mistaken for a response without scores.
+        """
+        return {
+            "status": "failed",
+            "error": str(error),
+            "error_reason": getattr(error, "reason", "fatal"),
+            "dry_score": "N/A",
+            "solid_score": "N/A",
+            "full_analysis": "",
+            "findings": [],
+        }
+
+    def aggregate_units(self, path, unit_results):
+        """Combines per-unit results into a file result.
+
+        File scores are the unit scores weighted by unit size in lines, and the
+        per-unit summaries and findings are merged into one analysis.
+        """
+        scores = {}
+        for category in ("dry", "solid"):
+            weighted = [
+                (result[f"{category}_score"], len(unit.lines))
+                for unit, result, _ in unit_results
+                if isinstance(result.get(f"{category}_score"), (int, float))
+            ]
+            total = sum(weight for _, weight in weighted)
+            scores[category] = (
+                round(sum(score * weight for score, weight in weighted) / total)
+                if total
+                else "N/A"
+            )
+
+        summaries = {"dry": [], "solid": []}
+        findings = []
+        for unit, result, _ in unit_results:
+            sections = split_analysis_sections(result.get("full_analysis", ""))
+            for category, lines in summaries.items():
+                if sections[category]:
+                    score = result.get(f"{category}_score", "N/A")
+                    lines.append(
+                        f"**`{unit.name}`** ({score}/10): {sections[category]}"
+                    )
+            findings.extend(result.get("findings", []))
+        findings.sort(key=lambda finding: finding["line"])
+
+        analysis = (
+            f"### DRY Analysis\n**Score: {scores['dry']}/10**\n"
+            + "\n\n".join(summaries["dry"])
+            + f"\n\n### SOLID Analysis\n**Score: {scores['solid']}/10**\n"
+            + "\n\n".join(summaries["solid"])
+            + "\n\n### Findings\n"
+            + "\n".join(f"- Line {f['line']}: {f['message']}" for f in findings)
+        )
+
+        return {
+            "dry_score": scores["dry"],
+            "solid_score": scores["solid"],
+            "full_analysis": analysis,
+            "findings": findings,
+            "units": [
+                {
+                    "name": unit.name,
+                    "start_line": unit.start,
+                    "dry_score": result.get("dry_score", "N/A"),
+                    "solid_score": result.get("solid_score", "N/A"),
+                    "cached": cached,
+                }
+                for unit, result, cached in unit_results
+            ],
+        }
+
+    def format_skipped(self, path, reason):
+        """Creates a result object for a file that was not sent for analysis."""
+        return {
+            "status": "skipped",
+            "reason": reason,
+            "dry_score": "N/A",
+            "solid_score": "N/A",
+            "full_analysis": "",
+            "findings": [],
         }
 
+    def previous_scores(self):
+        """Returns the combined score of each file in the previous run's result store."""
+        if not os.path.exists(self.store.path):
+            return {}
+
+        scores, weights = {}, score_weights(self.config)
+        try:
+            for path, result in self.store.iter_results():
+                score = combined_score(
+                    result.get("dry_score"), result.get("solid_score"), weights
+                )
+                if score is not None:
+                    scores[path] = score
+        except (OSError, ValueError) as e:
+            log(f"Unable to read previous scores: {e}")
+        return scores
+
     def save_results(self, results):
         """Saves analysis results to the output file."""
+        with pipeline_stage("save_results"):
+            return self._write_results(results)
+
+    def export_metrics(self):
+        """Exports run metrics next to the report, if enabled in the config."""
+        metrics_config = self.config.get("metrics", {})
+        if not metrics_config.get("enabled", True):
+            return
+
+        export_metrics(
+            os.path.dirname(self.output_file) or ".",
+            os.getenv("METRICS_TEXTFILE_DIR") or metrics_config.get("textfile_dir"),
+        )
+
+    def _write_results(self, results):
+        """Writes the markdown report and the result store."""
         log(f"Saving analysis results to {self.output_file}")
         with open(self.output_file, "w") as f:
             for file, feedback in results.items():
@@ -55,66 +284,624 @@ class AnalysisResultHandler:
                 f.write("\n```\n\n")
 
                 # For human readability, also include a direct markdown version
-                f.write(f"{feedback['full_analysis']}\n\n")
+                if feedback.get("status") == "failed":
+                    f.write(f"**Analysis failed:** {feedback['error']}\n\n")
+                elif feedback.get("status") == "skipped":
+                    f.write(f"_Skipped ({feedback['reason']})._\n\n")
+                else:
+                    f.write(f"{feedback['full_analysis']}\n\n")
 
         log(f"Analysis results saved to {self.output_file}")
+
+        rollup = self.rollup.snapshot()
+        # Several repositories may report to the same registry in one process
+        repo = (self.metadata or {}).get("repo", "")
+        for scope, summary in rollup.items():
+            if summary["kind"] != "directory" and summary["score"] is not None:
+                metrics.set_gauge(
+                    "quality_score",
+                    summary["score"],
+                    repo=repo,
+                    scope=scope or ".",
+                    kind=summary["kind"],
+                )
+
+        # Tag results with their commit and config so later steps can reuse them
+        if self.metadata:
+            self.store.write(dict(self.metadata, rollup=rollup), results)
         return results
 
 
+class SharedResources:
+    """Configuration, clients and caches shared by the analyzers of many repositories.
+
+    The GitHub session pools connections, and the AI client carries one
+    global OpenAI concurrency limit and token count. Caches are keyed by
+    content, so every repository benefits from the others' entries; they are
+    saved once by `save_caches`, after all analyzers have finished, so one
+    repository's run never prunes entries another one still needs. Caches
+    saved without pruning are capped at `max_cache_entries`, if given.
+    """
+
+    def __init__(self, config=None, pool_size=32, max_cache_entries=None):
+        self.config = load_config() if config is None else config
+        self.session = create_session(pool_size)
+        self.ai_client = AIClient()
+        fingerprint = config_fingerprint(self.config)
+
+        units_config = self.config.get("units", {})
+        self.unit_cache = None
+        if units_config.get("enabled", False):
+            self.unit_cache = UnitCache(
+                units_config.get("cache_file", ".analysis_cache/units.json"),
+                fingerprint,
+                max_entries=max_cache_entries,
+            )
+
+        architecture_config = self.config.get("architecture", {})
+        self.summary_cache = None
+        if architecture_config.get("enabled", False):
+            self.summary_cache = DiskCache(
+                architecture_config.get("cache_file", ".analysis_cache/summaries.json"),
+                version=SUMMARY_CACHE_VERSION,
+                max_entries=max_cache_entries,
+            )
+
+    def save_caches(self, prune=True):
+        """Persists the shared caches.
+
+        Without prune, entries unused so far are kept, for saving while other
+        analyses may still need them.
+        """
+        for cache in (self.unit_cache, self.summary_cache):
+            if cache is None:
+                continue
+            try:
+                cache.save(prune=prune)
+            except OSError as e:
+                log(f"Error saving cache {cache.path}: {e}")
+
+    def export_metrics(self, output_dir):
+        """Exports the metrics of every analysis so far, if enabled in the config."""
+        metrics_config = self.config.get("metrics", {})
+        if metrics_config.get("enabled", True):
+            export_metrics(
+                output_dir,
+                os.getenv("METRICS_TEXTFILE_DIR") or metrics_config.get("textfile_dir"),
+            )
+
+
 class CodeAnalyzer:
-    """Handles code analysis operations."""
+    """Handles code analysis operations.
 
-    def __init__(self):
-        self.env_vars = self._validate_environment()
+    With a shard index and count (or SHARD_INDEX and SHARD_COUNT), only the
+    files assigned to that shard are analyzed, and results are written to
+    partial artifacts for `src.merge_shards` to combine. `repo`, `branch`,
+    `shared` (SharedResources) and `output_dir` let one process analyze many
+    repositories; see `src.multi_repo`. `pr_number` names the pull request
+    whose changed files come first; it defaults to the one in the environment
+    of a single-repository run.
+    """
+
+    def __init__(
+        self,
+        shard_index=None,
+        shard_count=None,
+        repo=None,
+        branch=None,
+        shared=None,
+        output_dir="",
+        pr_number=None,
+    ):
+        self.env_vars = self._validate_environment(repo)
         if not self.env_vars:
             return
 
-        self.github_client = GitHubClient(self.env_vars["repo"])
-        self.ai_client = AIClient()
-        self.result_handler = AnalysisResultHandler()
+        self.shared = shared
+        # A pull request in the environment only concerns a single-repo run
+        if pr_number is None and shared is None:
+            pr_number = EnvironmentManager.get_pr_number()
+        self.pr_number = pr_number
+        self.config = load_config() if shared is None else shared.config
+        self.shard_index, self.shard_count = parse_shard(
+            os.getenv("SHARD_INDEX") if shard_index is None else shard_index,
+            os.getenv("SHARD_COUNT") if shard_count is None else shard_count,
+        )
+
+        self.github_client = GitHubClient(
+            self.env_vars["repo"],
+            branch=branch,
+            session=None if shared is None else shared.session,
+        )
+        self.ai_client = AIClient() if shared is None else shared.ai_client
+        suffix = (
+            ""
+            if self.shard_count is None
+            else shard_suffix(self.shard_index, self.shard_count)
+        )
+        self.result_handler = AnalysisResultHandler(
+            output_file=os.path.join(output_dir, f"analysis_feedback{suffix}.md"),
+            results_file=os.path.join(output_dir, f"analysis_results{suffix}.jsonl"),
+            config=self.config,
+        )
+        self.scheduler = WorkScheduler.from_config(self.config)
+        self.baseline = Baseline.from_config(self.config, output_dir)
+
+        self.architecture = None
+        if self.shard_count is not None:
+            # Architecture analysis needs every file, which no single shard has
+            log("Architecture analysis is not run on shards")
+        elif self.baseline is not None:
+            # Files reused from the baseline are never fetched
+            log("Architecture analysis is not run in baseline mode")
+        elif self.config.get("architecture", {}).get("enabled", False):
+            self.architecture = ArchitectureAnalyzer.from_config(
+                self.ai_client,
+                self.result_handler,
+                self.config,
+                config_fingerprint(self.config),
+                cache=None if shared is None else shared.summary_cache,
+            )
 
-    def _validate_environment(self):
+        units_config = self.config.get("units", {})
+        self.unit_cache = None
+        if shared is not None:
+            self.unit_cache = shared.unit_cache
+        elif units_config.get("enabled", False):
+            self.unit_cache = UnitCache(
+                units_config.get("cache_file", ".analysis_cache/units.json"),
+                config_fingerprint(self.config),
+            )
+
+    def _validate_environment(self, repo=None):
         """Validates required environment variables."""
         if os.getenv("ENABLE_ANALYSIS", "true").lower() != "true":
             log("Code analysis is disabled. Exiting.")
             return None
 
-        repo_name = os.getenv("REPO")
+        repo_name = repo or os.getenv("REPO")
         if not repo_name:
             log("REPO environment variable is not set.")
             return None
 
         return {"repo": repo_name}
 
-    def prepare_code_for_analysis(self, code):
-        """Prepares code for analysis by wrapping it in markdown code blocks."""
-        return f"```\n{code}\n```"
+    def _build_metadata(self):
+        """Builds the metadata that identifies the inputs of this analysis run."""
+        metadata = {
+            "repo": self.env_vars["repo"],
+            "ref": self.github_client.branch,
+            "commit_sha": self.github_client.get_commit_sha(),
+            "config_fingerprint": config_fingerprint(self.result_handler.config),
+        }
+        if self.shard_count is not None:
+            metadata["shard"] = {"index": self.shard_index, "count": self.shard_count}
+        return metadata
+
+    def _get_worker_count(self):
+        """Returns the number of analysis workers: the concurrency ceiling."""
+        return self.config.get("concurrency", {}).get("max", 16)
+
+    def _skips_trivial(self):
+        """Returns whether trivial files are skipped without an API call."""
+        return self.config.get("deduplication", {}).get("skip_trivial", True)
+
+    def _get_in_flight_bytes(self):
+        """Returns the budget for source bytes fetched but not yet analyzed."""
+        return self.config.get("concurrency", {}).get(
+            "max_in_flight_bytes", 32 * 1024 * 1024
+        )
+
+    def _get_routing(self):
+        """Returns the model routing mode: "single" or "cascade"."""
+        return self.config.get("models", {}).get("routing", "single")
+
+    def _get_escalation_reason(self, result):
+        """Returns why a triage result needs the stronger model, or None.
+
+        A result is escalated when its scores cannot be parsed, or when a score
+        of an enabled category is below its `severity_threshold` (0-1) x 10.
+        """
+        analysis_config = self.config.get("analysis", {})
+        for category in ("dry", "solid"):
+            score = result.get(f"{category}_score")
+            if not isinstance(score, (int, float)):
+                return "unparseable"
+
+            settings = analysis_config.get(category, {})
+            threshold = settings.get("severity_threshold")
+            if settings.get("enabled", True) and threshold is not None:
+                if score < threshold * 10:
+                    return f"low_{category}_score"
+        return None
+
+    def _analyze_with_cascade(self, path, prompt_code):
+        """Triages a file with the cheap model, escalating only problem files."""
+        language = language_for(path)
+        analysis = self.ai_client.analyze_code(
+            prompt_code, tier="triage", language=language
+        )
+        result = self.result_handler.format_result(path, analysis)
+        result["tier"] = "triage"
+
+        reason = self._get_escalation_reason(result)
+        metrics.increment("model_escalations_total", reason=reason or "none")
+        if reason is None:
+            return result
+
+        try:
+            analysis = self.ai_client.analyze_code(
+                prompt_code, tier="escalation", language=language
+            )
+        except AnalysisError as e:
+            # The triage analysis is still better than no analysis at all
+            log(f"Escalation failed, keeping triage result: {e}", LogLevel.WARNING)
+            return result
+
+        result = self.result_handler.format_result(path, analysis)
+        result["tier"] = "escalation"
+        return result
+
+    def _compact(self, code):
+        """Returns the (original line number, text) pairs to send for code.
+
+        With `compaction.enabled`, comments, blank lines and docstring bodies
+        are dropped first; kept lines retain their original numbers.
+        """
+        if not self.config.get("compaction", {}).get("enabled", False):
+            return list(enumerate(code.splitlines(), 1))
+
+        with pipeline_stage("compact"):
+            compacted = CodeCompactor.from_config(self.config).compact(code)
+
+        metrics.increment(
+            "prompt_tokens_estimated_total", estimate_tokens(code), variant="original"
+        )
+        metrics.increment(
+            "prompt_tokens_estimated_total",
+            estimate_tokens(compacted.text()),
+            variant="compacted",
+        )
+        return compacted.lines
+
+    def prepare_code_for_analysis(self, code, line_numbers=None):
+        """Prepares code for analysis by numbering its lines inside a markdown code block.
+
+        `line_numbers` gives the original line number of each line of code, for
+        code that was cut out of a larger file.
+        """
+        lines = self._compact(code)
+        if line_numbers:
+            lines = [(line_numbers[number - 1], line) for number, line in lines]
+
+        numbered = "\n".join(f"{number}: {line}" for number, line in lines)
+        return f"```\n{numbered}\n```"
+
+    def _analyze(self, path, prompt_code):
+        """Runs the configured model routing on prepared code."""
+        if self._get_routing() == "cascade":
+            return self._analyze_with_cascade(path, prompt_code)
+
+        analysis = self.ai_client.analyze_code(prompt_code, language=language_for(path))
+        return self.result_handler.format_result(path, analysis)
+
+    def _get_units(self, path, code):
+        """Returns the units to analyze separately, or None to analyze the whole file."""
+        if self.unit_cache is None or not path.endswith(".py"):
+            return None
+
+        min_lines = self.config.get("units", {}).get("min_file_lines", 200)
+        if code.count("\n") + 1 < min_lines:
+            return None
+        return extract_units(code) or None
+
+    def _analyze_units(self, path, code, units):
+        """Analyzes changed units only, reusing cached results for the rest."""
+        source_lines = code.splitlines()
+        unit_results = []
+
+        for unit in units:
+            result = self.unit_cache.get(unit)
+            cached = result is not None
+            metrics.increment(
+                "cache_hits_total" if cached else "cache_misses_total", cache="units"
+            )
+
+            if not cached:
+                unit_code = textwrap.dedent(unit.source(source_lines))
+                with log_context(unit=unit.name):
+                    prompt_code = self.prepare_code_for_analysis(unit_code, unit.lines)
+                    result = self._analyze(path, prompt_code)
+                self.unit_cache.put(unit, result)
+            unit_results.append((unit, result, cached))
+
+        return self.result_handler.aggregate_units(path, unit_results)
 
     def analyze_file(self, path, code):
         """Analyzes a single file and returns the formatted results."""
-        prompt_code = self.prepare_code_for_analysis(code)
-        analysis = self.ai_client.analyze_code(prompt_code)
-        return self.result_handler.format_result(path, analysis)
+        if self._skips_trivial() and is_trivial(code):
+            metrics.increment("files_analyzed_total", outcome="skipped")
+            return self.result_handler.format_skipped(path, "trivial")
+
+        with log_context(file=path), pipeline_stage("analyze_file"):
+            try:
+                units = self._get_units(path, code)
+                if units:
+                    result = self._analyze_units(path, code, units)
+                else:
+                    prompt_code = self.prepare_code_for_analysis(code)
+                    result = self._analyze(path, prompt_code)
+            except AnalysisError as e:
+                result = self.result_handler.format_failure(path, e)
+
+        # Weights the file in directory and repository rollups
+        result["lines"] = len(code.splitlines())
+        if result.get("status") == "failed":
+            outcome = "failed"
+        else:
+            outcome = "scored" if result.get("dry_score") != "N/A" else "unscored"
+        metrics.increment("files_analyzed_total", outcome=outcome)
+        return result
+
+    def _save_unit_cache(self):
+        """Persists the unit cache, if unit analysis is enabled."""
+        if self.unit_cache is None:
+            return
+        try:
+            self.unit_cache.save()
+        except OSError as e:
+            log(f"Error saving unit cache: {e}")
+
+    def _process_file(self, path, code):
+        """Analyzes a file and collects it for architecture analysis."""
+        result = self.analyze_file(path, code)
+        if self.architecture is not None:
+            self.architecture.collect(
+                path, code, trivial=result.get("reason") == "trivial"
+            )
+        return result
+
+    def _prioritize(self, entries):
+        """Orders tree entries with the signals the scheduler's priorities need."""
+        priorities = self.scheduler.priorities
+        changed, churn, previous_scores = set(), {}, {}
+
+        pr_number = self.pr_number
+        if "changed" in priorities and pr_number:
+            try:
+                changed = self.github_client.get_pull_request_files(pr_number)
+            except Exception as e:
+                log(f"Unable to list files changed by PR #{pr_number}: {e}")
+
+        churn_commits = self.config.get("scheduler", {}).get("churn_commits", 20)
+        if "churn" in priorities and churn_commits:
+            try:
+                churn = self.github_client.get_churn(churn_commits)
+            except Exception as e:
+                log(f"Unable to measure recent churn: {e}")
+
+        if "low_score" in priorities:
+            previous_scores = self.result_handler.previous_scores()
+
+        return self.scheduler.order(entries, changed, churn, previous_scores)
+
+    def _reuse_baseline(self, entries):
+        """Returns the baseline results of unchanged files, if baseline mode is on."""
+        if self.baseline is None or not self.baseline.load(
+            self.env_vars["repo"], config_fingerprint(self.config)
+        ):
+            return {}
+        return self.baseline.reuse(entries)
+
+    def _get_merge_base(self):
+        """Returns the commit the analyzed ref forked from its base branch, or None."""
+        base = os.getenv("GITHUB_BASE_REF") or self.baseline.branches[0]
+        try:
+            return self.github_client.get_merge_base(base)
+        except Exception as e:
+            log(f"Unable to find the merge base with {base}: {e}")
+            return None
+
+    def _finish_baseline(self, entries, tree_paths, results, metadata):
+        """Compares a pull request's results with the baseline, or refreshes it.
+
+        Files are only reported removed if they are missing from the whole
+        tree (`tree_paths`), not just from this shard's `entries`. Runs of a
+        baseline branch outside a pull request replace the baseline; sharded
+        runs never do, since each shard has only some of the files.
+        """
+        if self.pr_number is not None:
+            if self.baseline.metadata is None:
+                return
+            merge_base = self._get_merge_base()
+            if merge_base and merge_base != self.baseline.metadata.get("commit_sha"):
+                log(
+                    f"Baseline is at {self.baseline.metadata.get('commit_sha')}, "
+                    f"not at the merge base {merge_base}",
+                    LogLevel.WARNING,
+                )
+            for path, result in self.baseline.compare(
+                entries, results, merge_base, tree_paths
+            ):
+                results.add(path, result)
+            metadata["baseline_commit_sha"] = self.baseline.metadata.get("commit_sha")
+        elif (
+            self.shard_count is None
+            and self.github_client.branch in self.baseline.branches
+        ):
+            self.baseline.save(
+                metadata, results, {entry["path"]: entry["sha"] for entry in entries}
+            )
+
+    def _analyze_stream(self, entries, executor, results):
+        """Analyzes files as they are fetched, spilling each result as it completes.
+
+        Files are fetched in the order of `entries`, and only while the source
+        bytes of files in flight stay within the byte budget, so memory is
+        bounded by the budget and the worker count rather than by repository
+        size. Identical contents are analyzed once; later copies reuse the
+        first result. Once the scheduler's deadline or token budget is reached,
+        no further files are fetched and queued files are cancelled.
+        """
+        budget = self._get_in_flight_bytes()
+        in_flight = {}  # future -> (path, content key, size)
+        in_flight_bytes = 0
+        originals = {}  # content key -> path analyzed for it
+        waiting = {}  # content key -> copies waiting on the in-flight original
+
+        def usage():
+            return self.ai_client.tokens_used, in_flight_bytes // BYTES_PER_TOKEN
+
+        def complete(done):
+            nonlocal in_flight_bytes
+            for future in done:
+                path, key, size = in_flight.pop(future)
+                in_flight_bytes -= size
+                result = future.result()
+                if result is None:  # An architecture-only job for a copy
+                    continue
+                results.add(path, result)
+                for copy_path in waiting.pop(key, []):
+                    results.add(copy_path, dict(result, duplicate_of=path))
+
+        def cancel_queued(reason):
+            nonlocal in_flight_bytes
+            for future in list(in_flight):
+                if future.cancel():
+                    path, key, size = in_flight.pop(future)
+                    in_flight_bytes -= size
+                    copies = waiting.pop(key, []) if key in waiting else []
+                    if originals.get(key) == path:
+                        self.scheduler.skip([path] + copies, reason)
+
+        admitted = self.scheduler.admit(entries, usage)
+        files = self.github_client.iter_files(entries=admitted)
+        for path, code in timed_stage("get_files", files):
+            key = hashlib.sha256(code.encode("utf-8")).hexdigest()
+            original = originals.setdefault(key, path)
+            if original != path:
+                metrics.increment("files_deduplicated_total", stage="analysis")
+                if key in waiting:
+                    waiting[key].append(path)
+                elif original in results:
+                    results.add(path, dict(results[original], duplicate_of=original))
+                else:
+                    # The original was skipped or cancelled when work stopped
+                    self.scheduler.skip([path], self.scheduler.stop_reason())
+                    continue
+                if self.architecture is None:
+                    continue
+
+            size = len(code.encode("utf-8"))
+            while in_flight and in_flight_bytes + size > budget:
+                complete(wait(in_flight, return_when=FIRST_COMPLETED).done)
+
+            # Waiting for room may have run past the deadline
+            reason = self.scheduler.stop_reason(*usage())
+            if reason:
+                if original == path:
+                    self.scheduler.skip([path], reason)
+                cancel_queued(reason)
+                continue
+
+            if original == path:
+                waiting[key] = []
+                future = executor.submit(self._process_file, path, code)
+            else:
+                # Copies still count for the import graph, with the original's summary
+                future = executor.submit(
+                    self.architecture.collect, path, code, copy_of=original
+                )
+            in_flight[future] = (path, key, size)
+            in_flight_bytes += size
+
+        complete(list(in_flight))
 
     def analyze_repo(self):
-        """Main method to analyze the entire repository."""
+        """Main method to analyze the entire repository.
+
+        Returns a ResultSpool: a mapping of results by path backed by a
+        temporary file rather than held in memory.
+        """
         if not self.env_vars:
             return {}
 
-        files = self.github_client.get_files()
-        results = {}
+        with metrics.timer("stage_duration_seconds", stage="total"):
+            self.scheduler.start(self.ai_client.tokens_used)
+            metadata = self._build_metadata()
+
+            with pipeline_stage("list_files"):
+                entries = list(
+                    self.github_client.iter_entries(FileFilter.from_config(self.config))
+                )
+                tree_paths = [entry["path"] for entry in entries]
+                if self.shard_count is not None:
+                    entries = select_shard(entries, self.shard_index, self.shard_count)
+                    log(
+                        f"Shard {self.shard_index + 1}/{self.shard_count}: "
+                        f"{len(entries)} file(s)"
+                    )
+                reused = self._reuse_baseline(entries)
+                pending = self._prioritize(
+                    [entry for entry in entries if entry["path"] not in reused]
+                )
+            results = self.result_handler.create_spool()
+            results.update(reused)
+
+            # Workers only wait on the AI client's adaptive limiter, which
+            # decides how many requests are actually in flight. They make their
+            # requests on behalf of this repository, so that the limiter can
+            # share slots fairly when several repositories are analyzed at once
+            with ThreadPoolExecutor(
+                max_workers=self._get_worker_count(),
+                initializer=set_tenant,
+                initargs=(self.env_vars["repo"],),
+            ) as executor:
+                self._analyze_stream(pending, executor, results)
+
+            for path, reason in self.scheduler.skipped:
+                results.add(path, self.result_handler.format_skipped(path, reason))
 
-        for path, code in files:
-            results[path] = self.analyze_file(path, code)
+            if self.architecture is not None:
+                reason = self.scheduler.stop_reason(self.ai_client.tokens_used)
+                if reason:
+                    log(f"Skipping architecture analysis ({reason})", LogLevel.WARNING)
+                else:
+                    with pipeline_stage("architecture"):
+                        results.update(self.architecture.finish())
+                    if self.shared is None:
+                        self.architecture.save_cache()
 
-        # Save results and also return them for programmatic use
-        return self.result_handler.save_results(results)
+            # Partial runs are reused as-is; the report lists the skipped files
+            metadata["complete"] = not self.scheduler.skipped
+            if self.baseline is not None:
+                self._finish_baseline(entries, tree_paths, results, metadata)
+            self.result_handler.set_metadata(metadata)
+
+            # Save results and also return them for programmatic use
+            results = self.result_handler.save_results(results)
+            if self.shared is None:
+                self._save_unit_cache()
+
+        # With shared resources, the caller saves caches and exports metrics once
+        if self.shared is None:
+            self.result_handler.export_metrics()
+        return results
 
 
 def analyze_repo():
-    """Entry point function that returns analysis results."""
-    analyzer = CodeAnalyzer()
-    return analyzer.analyze_repo()
+    """Entry point function that returns analysis results.
+
+    Set ANALYSIS_PROFILE=cpu,memory (or `profiling.enabled` in the config) to
+    write CPU and allocation profiles next to the report, and
+    ANALYSIS_CASSETTE_MODE=record or replay (or `cassette.mode`) to record
+    the run's GitHub and OpenAI traffic or replay a recording offline.
+    """
+    config = load_config()
+    with Cassette.from_config(config):
+        analyzer = CodeAnalyzer()
+        with ProfilingSession.from_config(config):
+            return analyzer.analyze_repo()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,241 @@
+import ast
+import hashlib
+import threading
+from src.ai_client import AnalysisError
+from src.disk_cache import DiskCache
+from src.metrics import metrics
+from src.utils import log, LogLevel
+
+SUMMARY_CACHE_VERSION = 2
+ARCHITECTURE_PREFIX = "<architecture>"
+
+
+def module_name(path):
+    """Returns the dotted module name of a Python file path."""
+    name = path[: -len(".py")].replace("/", ".")
+    return name[: -len(".__init__")] if name.endswith(".__init__") else name
+
+
+def _imported_modules(path, code):
+    """Yields the absolute names of modules imported by a file."""
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return
+
+    package = module_name(path).split(".")
+    if not path.endswith("__init__.py"):
+        package = package[:-1]
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                yield alias.name
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                # Relative import: climb from the importing package
+                base = package[: len(package) - node.level + 1]
+                prefix = ".".join(base + ([node.module] if node.module else []))
+            else:
+                prefix = node.module or ""
+            yield prefix
+            for alias in node.names:
+                yield f"{prefix}.{alias.name}" if prefix else alias.name
+
+
+def link_imports(imports):
+    """Maps each file to the repository files among its imported module names.
+
+    Imports of modules outside the repository (stdlib, third-party) are dropped.
+    """
+    modules = {module_name(path): path for path in imports}
+    return {
+        path: sorted(
+            {
+                modules[name]
+                for name in names
+                if name in modules and modules[name] != path
+            }
+        )
+        for path, names in imports.items()
+    }
+
+
+def build_import_graph(files):
+    """Maps each Python file to the repository files it imports."""
+    return link_imports(
+        {
+            path: set(_imported_modules(path, code))
+            for path, code in files
+            if path.endswith(".py")
+        }
+    )
+
+
+def package_of(path):
+    """Returns the top-level package (directory) of a path, or "." for root files."""
+    return path.split("/", 1)[0] if "/" in path else "."
+
+
+class ArchitectureAnalyzer:
+    """Two-level repository analysis: cached file summaries, then one review per scope.
+
+    Every Python file is first reduced to a short summary of its public API,
+    dependencies and responsibilities. Summaries are cached by content hash,
+    so only changed files are summarized again; copies of a file reuse its
+    summary and trivial files are not summarized at all. The summaries and the
+    internal import graph are then analyzed together, either for the whole
+    repository or per top-level package. With scope "auto", the repository is
+    analyzed as one unless its summaries exceed `max_prompt_chars`.
+    """
+
+    def __init__(
+        self,
+        ai_client,
+        result_handler,
+        scope="auto",
+        max_summary_words=120,
+        max_prompt_chars=60000,
+        cache_file=".analysis_cache/summaries.json",
+        fingerprint="",
+        cache=None,
+    ):
+        self.ai_client = ai_client
+        self.result_handler = result_handler
+        self.scope = scope
+        self.max_summary_words = max_summary_words
+        self.max_prompt_chars = max_prompt_chars
+        self.fingerprint = fingerprint
+        self.cache = (
+            DiskCache(cache_file, version=SUMMARY_CACHE_VERSION)
+            if cache is None
+            else cache
+        )
+        self.summaries = {}
+        self.copies = {}  # path -> path of the file it is a copy of
+        self.imports = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, ai_client, result_handler, config, fingerprint="", cache=None):
+        """Builds an analyzer from the `architecture` config section."""
+        settings = config.get("architecture", {}) or {}
+        return cls(
+            ai_client,
+            result_handler,
+            scope=settings.get("scope", "auto"),
+            max_summary_words=settings.get("max_summary_words", 120),
+            max_prompt_chars=settings.get("max_prompt_chars", 60000),
+            cache_file=settings.get("cache_file", ".analysis_cache/summaries.json"),
+            fingerprint=fingerprint,
+            cache=cache,
+        )
+
+    def _cache_key(self, code):
+        content = f"{self.fingerprint}:{code}".encode("utf-8")
+        return hashlib.sha256(content).hexdigest()
+
+    def summarize(self, path, code):
+        """Returns the summary of a file, from the cache when its content is unchanged."""
+        if not code.strip():
+            return "(empty file)"
+
+        key = self._cache_key(code)
+        summary = self.cache.get(key)
+        metrics.increment(
+            "cache_hits_total" if summary else "cache_misses_total", cache="summaries"
+        )
+        if summary:
+            return summary
+
+        try:
+            summary = self.ai_client.summarize_file(path, code, self.max_summary_words)
+        except AnalysisError as e:
+            log(f"Unable to summarize {path}: {e}", LogLevel.WARNING, file=path)
+            return "(summary unavailable)"
+
+        self.cache.put(key, summary)
+        return summary
+
+    def _group(self, summaries):
+        """Splits summaries into the scopes that are analyzed together."""
+        size = sum(len(summary) for summary in summaries.values())
+        if self.scope == "repo" or (
+            self.scope == "auto" and size <= self.max_prompt_chars
+        ):
+            return {ARCHITECTURE_PREFIX: summaries}
+
+        groups = {}
+        for path, summary in summaries.items():
+            scope = f"{ARCHITECTURE_PREFIX} {package_of(path)}"
+            groups.setdefault(scope, {})[path] = summary
+        return groups
+
+    def collect(self, path, code, copy_of=None, trivial=False):
+        """Summarizes a file and records its imports for the next `finish`.
+
+        Only the summary and imported module names are kept, so files can be
+        collected as they stream past and their contents dropped. A copy of
+        another collected file (`copy_of`) gets that file's summary, and a
+        trivial file only contributes its imports; neither calls the model.
+        """
+        if not path.endswith(".py"):
+            return
+        imports = set(_imported_modules(path, code))
+        if copy_of is not None:
+            with self._lock:
+                self.copies[path] = copy_of
+                self.imports[path] = imports
+            return
+
+        summary = "(trivial file)" if trivial else self.summarize(path, code)
+        with self._lock:
+            self.summaries[path] = summary
+            self.imports[path] = imports
+
+    def finish(self):
+        """Analyzes the collected files and returns results keyed by scope label."""
+        with self._lock:
+            summaries, self.summaries = self.summaries, {}
+            copies, self.copies = self.copies, {}
+            imports, self.imports = self.imports, {}
+        for path, original in copies.items():
+            summaries[path] = summaries.get(original, "(summary unavailable)")
+        if not summaries:
+            return {}
+
+        graph = link_imports(imports)
+        results = {}
+        for scope, scope_summaries in self._group(
+            dict(sorted(summaries.items()))
+        ).items():
+            scope_graph = {path: graph.get(path, []) for path in scope_summaries}
+            try:
+                analysis = self.ai_client.analyze_architecture(
+                    scope, scope_summaries, scope_graph
+                )
+            except AnalysisError as e:
+                result = self.result_handler.format_failure(scope, e)
+            else:
+                result = self.result_handler.format_result(scope, analysis)
+            result["kind"] = "architecture"
+            result["files"] = sorted(scope_summaries)
+            results[scope] = result
+        return results
+
+    def analyze(self, files, map_func=map):
+        """Returns architecture results keyed by scope label.
+
+        `map_func` runs the per-file summaries, e.g. an executor's map.
+        """
+        paths = [path for path, _ in files]
+        codes = [code for _, code in files]
+        list(map_func(self.collect, paths, codes))
+        return self.finish()
+
+    def save_cache(self):
+        """Persists the summary cache."""
+        try:
+            self.cache.save()
+        except OSError as e:
+            log(f"Error saving summary cache: {e}")
@@ -0,0 +1,149 @@
+import os
+from src.metrics import metrics
+from src.result_store import ResultStore
+from src.utils import log, LogLevel
+
+
+def is_reusable(result):
+    """Returns whether a stored result came from analyzing the file."""
+    status = result.get("status")
+    return status is None or (status == "skipped" and result.get("reason") == "trivial")
+
+
+class Baseline:
+    """Results of a base branch commit, reused by blob SHA and compared against.
+
+    The baseline is a result store whose results also record each file's blob
+    SHA. Runs reuse the baseline result of every file whose blob is unchanged,
+    so only changed files are analyzed. A run of one of `branches` outside a
+    pull request refreshes the baseline; in a pull request each result notes
+    the baseline scores it is compared with.
+    """
+
+    def __init__(self, path=".analysis_cache/baseline.jsonl", branches=("main",)):
+        self.store = ResultStore(path)
+        self.branches = list(branches)
+        self.metadata = None
+        self.results = {}
+        self.blobs = {}
+
+    @classmethod
+    def from_config(cls, config, output_dir=""):
+        """Builds a baseline from the `baseline` config section, or returns None."""
+        settings = config.get("baseline", {}) or {}
+        if not settings.get("enabled", False):
+            return None
+        return cls(
+            os.path.join(
+                output_dir,
+                settings.get("results_file", ".analysis_cache/baseline.jsonl"),
+            ),
+            branches=settings.get("branches", ["main"]),
+        )
+
+    def load(self, repo, fingerprint):
+        """Loads the stored baseline if it was computed for this repository and config."""
+        metadata = self.store.read_metadata()
+        if not metadata:
+            log("No baseline results found; analyzing every file")
+            return False
+        if (
+            metadata.get("repo") != repo
+            or metadata.get("config_fingerprint") != fingerprint
+        ):
+            log(
+                "Baseline results are for another repository or configuration; "
+                "analyzing every file",
+                LogLevel.WARNING,
+            )
+            return False
+
+        for path, result in self.store.iter_results():
+            blob_sha = result.pop("blob_sha", None)
+            if blob_sha:
+                self.blobs[path] = blob_sha
+                self.results[path] = result
+        self.metadata = metadata
+        log(
+            f"Loaded baseline results for {len(self.results)} file(s) "
+            f"at commit {metadata.get('commit_sha')}"
+        )
+        return True
+
+    def reuse(self, entries):
+        """Returns the baseline results of tree entries whose blob is unchanged."""
+        reused = {}
+        for entry in entries:
+            path = entry["path"]
+            result = self.results.get(path)
+            if (
+                result is not None
+                and entry.get("sha") == self.blobs.get(path)
+                and is_reusable(result)
+            ):
+                reused[path] = result
+
+        metrics.increment("cache_hits_total", len(reused), cache="baseline")
+        metrics.increment(
+            "cache_misses_total", len(entries) - len(reused), cache="baseline"
+        )
+        log(f"Reusing baseline results for {len(reused)} of {len(entries)} file(s)")
+        return reused
+
+    def _note(self, status, path, merge_base):
+        """Returns what a result is compared with."""
+        note = {"status": status, "commit": self.metadata.get("commit_sha")}
+        before = self.results.get(path)
+        if before is not None:
+            note["dry_score"] = before.get("dry_score", "N/A")
+            note["solid_score"] = before.get("solid_score", "N/A")
+        if merge_base and merge_base != note["commit"]:
+            note["merge_base"] = merge_base
+        return note
+
+    def compare(self, entries, results, merge_base=None, tree_paths=None):
+        """Yields (path, result) pairs annotated with a `baseline` note.
+
+        Each file's note has its status against the baseline (unchanged,
+        changed, added or removed) and its baseline scores. Files only in the
+        baseline are yielded as results with status "removed". `tree_paths`
+        are all paths of the analyzed tree, for runs (such as shards) whose
+        `entries` are only some of them; by default they are those of `entries`.
+        """
+        listed = set() if tree_paths is None else set(tree_paths)
+        for entry in entries:
+            path = entry["path"]
+            listed.add(path)
+            if path not in results:
+                continue
+            if entry.get("sha") == self.blobs.get(path):
+                status = "unchanged"
+            else:
+                status = "changed" if path in self.results else "added"
+            yield path, dict(
+                results[path], baseline=self._note(status, path, merge_base)
+            )
+
+        for path in self.results:
+            if path not in listed:
+                yield path, {
+                    "status": "removed",
+                    "dry_score": "N/A",
+                    "solid_score": "N/A",
+                    "full_analysis": "",
+                    "findings": [],
+                    "baseline": self._note("removed", path, merge_base),
+                }
+
+    def save(self, metadata, results, blobs):
+        """Stores a run's results, with the blob SHA of each file, as the new baseline."""
+        os.makedirs(os.path.dirname(self.store.path) or ".", exist_ok=True)
+        self.store.write(
+            metadata,
+            (
+                (path, dict(result, blob_sha=blobs[path]))
+                for path, result in results.items()
+                if path in blobs
+            ),
+        )
+        log(f"Refreshed baseline results at {self.store.path}")
@@ -0,0 +1,268 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from types import SimpleNamespace
+import requests
+from requests.structures import CaseInsensitiveDict
+from src.metrics import metrics
+from src.utils import log
+
+CASSETTE_VERSION = 1
+MODES = ("record", "replay")
+# Values of these variables are replaced wherever they appear in a recording
+SECRET_ENV_VARS = ("GITHUB_TOKEN", "OPENAI_API_KEY", "WEBHOOK_SECRET")
+REDACTED = "[REDACTED]"
+# Response headers worth keeping: paging, rate limits and retry hints
+KEPT_HEADERS = (
+    "content-type",
+    "link",
+    "retry-after",
+    "retry-after-ms",
+    "x-ratelimit-remaining",
+    "x-ratelimit-reset",
+)
+
+# The cassette recording or replaying this process's API traffic, if any
+_active_cassette = None
+
+
+def active_cassette():
+    """Returns the cassette in use, or None."""
+    return _active_cassette
+
+
+def is_replaying():
+    """Returns whether API responses come from a cassette instead of the network."""
+    return _active_cassette is not None and _active_cassette.mode == "replay"
+
+
+def request_key(service, request):
+    """Returns a stable key for a request, used to match it on replay."""
+    payload = json.dumps([service, request], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def _kept_headers(headers):
+    return {
+        name.lower(): value
+        for name, value in (headers or {}).items()
+        if name.lower() in KEPT_HEADERS
+    }
+
+
+def encode_response(response):
+    """Returns the recorded form of a requests response."""
+    return {
+        "status": response.status_code,
+        "headers": _kept_headers(response.headers),
+        "body": response.text,
+    }
+
+
+def decode_response(data):
+    """Rebuilds a requests response from its recorded form."""
+    response = requests.Response()
+    response.status_code = data["status"]
+    response.headers = CaseInsensitiveDict(data["headers"])
+    response._content = data["body"].encode("utf-8")
+    response.encoding = "utf-8"
+    return response
+
+
+class CassetteMiss(LookupError):
+    """Raised on replay for a request that was never recorded."""
+
+
+class RecordedError(Exception):
+    """An API error replayed from a cassette.
+
+    It carries the original status code and retry headers, and its class is
+    named after the original error, so that retries, rate limiting and the
+    circuit breaker treat it as they treated the original.
+    """
+
+    def __init__(self, message, status_code=None, headers=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers=CaseInsensitiveDict(headers or {}))
+
+
+def encode_error(error):
+    """Returns the recorded form of an API error."""
+    response = getattr(error, "response", None)
+    return {
+        "type": type(error).__name__,
+        "status": getattr(error, "status_code", None),
+        "message": str(error),
+        "headers": _kept_headers(getattr(response, "headers", None)),
+        "os_error": isinstance(error, OSError),
+    }
+
+
+def decode_error(data):
+    """Rebuilds an API error from its recorded form."""
+    bases = (RecordedError, ConnectionError) if data["os_error"] else (RecordedError,)
+    error_class = type(data["type"], bases, {})
+    return error_class(data["message"], data["status"], data["headers"])
+
+
+class Cassette:
+    """Records GitHub and OpenAI traffic to a file, or replays it offline.
+
+    In record mode every request made through `play` is sent as usual and
+    its response (or error) and latency are appended to a gzipped JSON-lines
+    file when the cassette is closed. Values of the secret environment
+    variables are redacted, request headers are never stored, and OpenAI
+    prompts are stored only as part of the request key.
+
+    In replay mode responses are served from the file instead of the
+    network, matched by request rather than by order so concurrent runs
+    replay deterministically. Repeats of one request get its recorded
+    responses in order, then the last one again. Each response is delayed by
+    its recorded latency times `latency_scale` (0 for no delay).
+    """
+
+    def __init__(self, path="analysis_cassette.jsonl.gz", mode=None, latency_scale=1.0):
+        if mode is not None and mode not in MODES:
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.interactions = defaultdict(deque)
+        self.recorded = []
+        self.secrets = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        """Builds a cassette from the `cassette` config section and environment.
+
+        ANALYSIS_CASSETTE_MODE (record or replay), ANALYSIS_CASSETTE (the path)
+        and ANALYSIS_CASSETTE_LATENCY (the latency scale) override the config.
+        """
+        settings = config.get("cassette", {}) or {}
+        mode = os.getenv("ANALYSIS_CASSETTE_MODE") or settings.get("mode")
+        return cls(
+            path=os.getenv("ANALYSIS_CASSETTE")
+            or settings.get("path", "analysis_cassette.jsonl.gz"),
+            mode=mode.strip().lower() if mode else None,
+            latency_scale=float(
+                os.getenv("ANALYSIS_CASSETTE_LATENCY")
+                or settings.get("latency_scale", 1.0)
+            ),
+        )
+
+    @property
+    def enabled(self):
+        return self.mode is not None
+
+    def __enter__(self):
+        global _active_cassette
+        if not self.enabled:
+            return self
+
+        if self.mode == "replay":
+            self.load()
+        else:
+            self.recorded = []
+            self.secrets = [
+                os.getenv(name) for name in SECRET_ENV_VARS if os.getenv(name)
+            ]
+        _active_cassette = self
+        log(f"Cassette {self.mode}ing API traffic ({self.path})")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        global _active_cassette
+        if not self.enabled:
+            return False
+
+        _active_cassette = None
+        if self.mode == "record":
+            try:
+                self.save()
+            except OSError as e:
+                log(f"Error writing cassette {self.path}: {e}")
+        return False
+
+    def load(self):
+        """Loads the recorded interactions, keyed by request."""
+        self.interactions = defaultdict(deque)
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            header = json.loads(f.readline() or "{}")
+            if header.get("version") != CASSETTE_VERSION:
+                raise ValueError(f"Unsupported cassette {self.path}")
+            for line in f:
+                if line.strip():
+                    interaction = json.loads(line)
+                    self.interactions[interaction["key"]].append(interaction)
+        log(f"Loaded {sum(map(len, self.interactions.values()))} recorded request(s)")
+
+    def save(self):
+        """Writes the recorded interactions atomically."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            f.write(json.dumps({"version": CASSETTE_VERSION}) + "\n")
+            with self._lock:
+                for line in self.recorded:
+                    f.write(line + "\n")
+        os.replace(tmp_path, self.path)
+        log(f"Recorded {len(self.recorded)} request(s) to {self.path}")
+
+    def _redact(self, text):
+        for secret in self.secrets:
+            text = text.replace(secret, REDACTED)
+        return text
+
+    def _record(self, service, key, summary, latency, **outcome):
+        interaction = dict(
+            service=service, key=key, request=summary, latency=round(latency, 4)
+        )
+        interaction.update(outcome)
+        line = self._redact(json.dumps(interaction, separators=(",", ":")))
+        with self._lock:
+            self.recorded.append(line)
+
+    def _next(self, service, key, summary):
+        with self._lock:
+            queue = self.interactions.get(key)
+            if not queue:
+                raise CassetteMiss(f"No recorded {service} response for {summary}")
+            return queue.popleft() if len(queue) > 1 else queue[0]
+
+    def play(self, service, request, send, encode, decode, summary=None):
+        """Sends a request and records it, or replays its recorded response.
+
+        `request` identifies the request; `summary` (default: `request`) is
+        what is stored to describe it. `send()` makes the real request,
+        `encode(response)` turns the response into JSON data and
+        `decode(data)` rebuilds it.
+        """
+        key = request_key(service, request)
+        summary = request if summary is None else summary
+        metrics.increment("cassette_requests_total", service=service, mode=self.mode)
+
+        if self.mode == "replay":
+            interaction = self._next(service, key, summary)
+            delay = interaction["latency"] * self.latency_scale
+            if delay > 0:
+                time.sleep(delay)
+            if "error" in interaction:
+                raise decode_error(interaction["error"])
+            return decode(interaction["response"])
+
+        start = time.perf_counter()
+        try:
+            response = send()
+        except Exception as e:
+            latency = time.perf_counter() - start
+            self._record(service, key, summary, latency, error=encode_error(e))
+            raise
+        latency = time.perf_counter() - start
+        self._record(service, key, summary, latency, response=encode(response))
+        return response
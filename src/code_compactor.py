@@ -0,0 +1,161 @@
+import ast
+import io
+import re
+import tokenize
+
+# Approximates GPT-style BPE on code: a word or symbol absorbs one leading
+# space, and other runs of whitespace (indentation, newlines) are tokens too
+TOKEN_PATTERN = re.compile(r" ?\w+| ?[^\w\s]|\s+")
+DOCSTRING_MODES = ("keep", "summary", "strip")
+
+
+def estimate_tokens(text):
+    """Estimates the number of model tokens in text."""
+    return len(TOKEN_PATTERN.findall(text))
+
+
+class CompactedCode:
+    """Compacted source lines, each paired with its original line number."""
+
+    def __init__(self, lines):
+        self.lines = lines
+
+    def text(self):
+        """Returns the compacted source."""
+        return "\n".join(text for _, text in self.lines)
+
+
+class CodeCompactor:
+    """Shrinks Python source before prompting without changing what it does.
+
+    Comments and blank lines are dropped, docstrings are cut to their summary
+    line (or removed), and indentation is reduced to `indent` spaces per
+    level. Every kept line remembers its original line number, so findings
+    anchored to the numbered prompt still point at the right lines. Source that
+    does not parse is returned unchanged.
+    """
+
+    def __init__(self, docstrings="summary", strip_comments=True, indent=1):
+        if docstrings not in DOCSTRING_MODES:
+            raise ValueError(f"docstrings must be one of {DOCSTRING_MODES}")
+        self.docstrings = docstrings
+        self.strip_comments = strip_comments
+        self.indent = indent
+
+    @classmethod
+    def from_config(cls, config):
+        """Builds a compactor from the `compaction` config section."""
+        settings = config.get("compaction", {}) or {}
+        return cls(
+            docstrings=settings.get("docstrings", "summary"),
+            strip_comments=settings.get("strip_comments", True),
+            indent=settings.get("indent", 1),
+        )
+
+    def compact(self, code):
+        """Returns the compacted code as a CompactedCode."""
+        source_lines = code.splitlines()
+        try:
+            tree = ast.parse(code)
+            tokens = list(tokenize.generate_tokens(io.StringIO(code).readline))
+        except (SyntaxError, tokenize.TokenError, ValueError):
+            return CompactedCode(list(enumerate(source_lines, 1)))
+
+        docstrings = self._find_docstrings(tree, source_lines)
+        comments, depths, verbatim = self._scan_tokens(tokens)
+
+        lines = []
+        for number, line in enumerate(source_lines, 1):
+            if number in docstrings:
+                replacement = docstrings[number]
+                if replacement is not None:
+                    lines.append((number, self._indent(depths, number) + replacement))
+                continue
+
+            if number in verbatim:
+                lines.append((number, line))
+                continue
+
+            if number in comments:
+                line = line[: comments[number]]
+            stripped = line.strip()
+            if stripped:
+                lines.append((number, self._indent(depths, number) + stripped))
+
+        return CompactedCode(lines)
+
+    def _indent(self, depths, number):
+        return " " * (depths.get(number, 0) * self.indent)
+
+    def _find_docstrings(self, tree, source_lines):
+        """Maps docstring lines to their replacement (None drops the line)."""
+        replacements = {}
+        if self.docstrings == "keep":
+            return replacements
+
+        nodes = [tree] + [
+            node
+            for node in ast.walk(tree)
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+        ]
+        for node in nodes:
+            body = getattr(node, "body", None)
+            if not body or not isinstance(body[0], ast.Expr):
+                continue
+            value = body[0].value
+            if not isinstance(value, ast.Constant) or not isinstance(value.value, str):
+                continue
+
+            start, end = body[0].lineno, body[0].end_lineno
+            first_col, last_col = body[0].col_offset, body[0].end_col_offset
+            before = source_lines[start - 1][:first_col]
+            after = source_lines[end - 1][last_col:]
+            if before.strip() or after.strip():
+                # One-liners such as `def f(): """Doc."""` share their line with code
+                continue
+            for number in range(start, end + 1):
+                replacements[number] = None
+
+            summary = value.value.strip().split("\n", 1)[0].strip()
+            if self.docstrings == "summary" and summary:
+                summary = summary.replace('"""', r"\"\"\"")
+                replacements[start] = f'"""{summary}"""'
+            elif len(body) == 1:
+                # A docstring-only body still needs a statement
+                replacements[start] = "..."
+        return replacements
+
+    def _scan_tokens(self, tokens):
+        """Finds comment columns, indentation depth and multi-line string rows."""
+        comments, depths, verbatim = {}, {}, set()
+        depth = brackets = 0
+
+        for token in tokens:
+            kind, text = token.type, token.string
+            (start_row, start_col), (end_row, _) = token.start, token.end
+
+            if kind == tokenize.INDENT:
+                depth += 1
+            elif kind == tokenize.DEDENT:
+                depth -= 1
+            elif kind == tokenize.COMMENT and self.strip_comments:
+                comments[start_row] = start_col
+
+            if start_row not in depths and kind not in (
+                tokenize.INDENT,
+                tokenize.DEDENT,
+                tokenize.NL,
+                tokenize.NEWLINE,
+            ):
+                # Lines continuing a bracketed expression sit one level deeper
+                depths[start_row] = depth + (1 if brackets else 0)
+
+            if end_row > start_row:
+                # Rows inside a multi-line string are part of its value
+                verbatim.update(range(start_row + 1, end_row + 1))
+            if kind == tokenize.OP and text in "([{":
+                brackets += 1
+            elif kind == tokenize.OP and text in ")]}":
+                brackets -= 1
+
+        return comments, depths, verbatim
@@ -0,0 +1,213 @@
+import contextvars
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from src.metrics import metrics
+from src.utils import log, LogLevel
+
+# Who a request is made for (e.g. the repository), for fair sharing of slots
+current_tenant = contextvars.ContextVar("current_tenant", default=None)
+
+
+def set_tenant(tenant):
+    """Sets the tenant of the calling thread, e.g. as a thread pool initializer."""
+    current_tenant.set(tenant)
+
+
+def get_retry_after(error):
+    """Returns the server-requested delay in seconds from an API error, if any.
+
+    Understands OpenAI's `retry-after-ms` header and the standard
+    `Retry-After` header in both its seconds and HTTP-date forms.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            retry_at = parsedate_to_datetime(value)
+            return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveConcurrencyLimiter:
+    """Additive-increase/multiplicative-decrease limit on concurrent requests.
+
+    The limit grows by roughly `increase` per window of successful requests
+    while latency and error rate are healthy, and is multiplied by
+    `decrease_factor` on a rate limit (429) or a latency spike. Latency is
+    compared with a baseline per kind of request (e.g. model tier), so that
+    slower models do not look like congestion. A Retry-After from the server
+    pauses all new requests until it has elapsed.
+
+    Slots are shared fairly between tenants (see `set_tenant`): when several
+    tenants are waiting, a free slot goes to the one with the fewest requests
+    in flight, so a tenant with a large backlog cannot starve the others.
+    """
+
+    def __init__(
+        self,
+        initial=4,
+        minimum=1,
+        maximum=16,
+        increase=1.0,
+        decrease_factor=0.5,
+        latency_spike_factor=2.0,
+        error_rate_threshold=0.1,
+        cooldown_seconds=1.0,
+        name="openai",
+    ):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.latency_spike_factor = latency_spike_factor
+        self.error_rate_threshold = error_rate_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.name = name
+
+        self.in_flight = 0
+        self.tenant_in_flight = Counter()
+        self.tenant_waiting = Counter()
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+        self.latency_baselines = {}  # kind of request -> typical latency
+        self.error_rate = 0.0
+        self._condition = threading.Condition()
+        self._publish()
+
+    @classmethod
+    def from_config(cls, config):
+        """Builds a limiter from the `concurrency` config section."""
+        settings = config.get("concurrency", {}) or {}
+        return cls(
+            initial=settings.get("initial", 4),
+            minimum=settings.get("min", 1),
+            maximum=settings.get("max", 16),
+            latency_spike_factor=settings.get("latency_spike_factor", 2.0),
+            error_rate_threshold=settings.get("error_rate_threshold", 0.1),
+        )
+
+    @property
+    def current_limit(self):
+        return int(self.limit)
+
+    def _publish(self):
+        metrics.set_gauge("concurrency_limit", self.current_limit, limiter=self.name)
+        metrics.set_gauge("concurrency_in_flight", self.in_flight, limiter=self.name)
+
+    def _is_turn(self, tenant):
+        """Returns whether no waiting tenant has fewer requests in flight."""
+        fewest = min(
+            self.tenant_in_flight[waiting]
+            for waiting, count in self.tenant_waiting.items()
+            if count
+        )
+        return self.tenant_in_flight[tenant] <= fewest
+
+    def acquire(self):
+        """Blocks until a slot is free and no Retry-After pause is in effect."""
+        tenant = current_tenant.get()
+        with self._condition:
+            self.tenant_waiting[tenant] += 1
+            while True:
+                pause = self.blocked_until - time.monotonic()
+                if (
+                    pause <= 0
+                    and self.in_flight < self.current_limit
+                    and self._is_turn(tenant)
+                ):
+                    break
+                self._condition.wait(timeout=pause if pause > 0 else None)
+            self.tenant_waiting[tenant] -= 1
+            self.tenant_in_flight[tenant] += 1
+            self.in_flight += 1
+            self._publish()
+            # Other tenants' turns depend on this tenant's count
+            self._condition.notify_all()
+
+    def release(self):
+        """Frees a slot."""
+        with self._condition:
+            self.tenant_in_flight[current_tenant.get()] -= 1
+            self.in_flight -= 1
+            self._publish()
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self):
+        """Holds a concurrency slot for the duration of the block."""
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def _decrease(self, reason):
+        """Cuts the limit multiplicatively, at most once per cooldown period."""
+        now = time.monotonic()
+        if now - self.last_decrease < self.cooldown_seconds:
+            return
+        self.last_decrease = now
+        self.limit = max(float(self.minimum), self.limit * self.decrease_factor)
+        log(
+            f"Reducing {self.name} concurrency to {self.current_limit} ({reason})",
+            LogLevel.WARNING,
+            rate_key=f"{self.name}_concurrency_decrease",
+        )
+
+    def _record_outcome(self, failed):
+        # Exponentially weighted error rate over roughly the last 20 requests
+        self.error_rate = 0.95 * self.error_rate + (0.05 if failed else 0.0)
+
+    def on_success(self, latency, kind=None):
+        """Records a successful request and adapts the limit to its latency.
+
+        `kind` names the kind of request (e.g. the model tier); its latency is
+        only compared with earlier requests of the same kind.
+        """
+        with self._condition:
+            self._record_outcome(failed=False)
+            baseline = self.latency_baselines.get(kind)
+
+            if baseline is not None and latency > baseline * self.latency_spike_factor:
+                self._decrease(f"latency {latency:.2f}s vs baseline {baseline:.2f}s")
+            elif self.error_rate <= self.error_rate_threshold:
+                self.limit = min(
+                    float(self.maximum), self.limit + self.increase / self.limit
+                )
+
+            # Track the baseline slowly so a spike does not immediately become normal
+            self.latency_baselines[kind] = (
+                latency if baseline is None else 0.9 * baseline + 0.1 * latency
+            )
+            self._publish()
+            self._condition.notify_all()
+
+    def on_rate_limited(self, retry_after=None):
+        """Records a 429: cuts the limit and honours the server's Retry-After."""
+        with self._condition:
+            self._record_outcome(failed=True)
+            self._decrease("rate limited")
+            if retry_after:
+                self.blocked_until = max(
+                    self.blocked_until, time.monotonic() + retry_after
+                )
+            self._publish()
+
+    def on_error(self):
+        """Records a failed request that was not a rate limit."""
+        with self._condition:
+            self._record_outcome(failed=True)
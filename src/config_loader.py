@@ -1,7 +1,22 @@
+import hashlib
+import json
 import yaml
 import os
 from src.utils import log
 
+# Sections that change what the analysis produces; operational settings such
+# as concurrency, deadlines or metrics are left out of the fingerprint
+ANALYSIS_SECTIONS = (
+    "analysis",
+    "prompt_customization",
+    "models",
+    "compaction",
+    "units",
+    "architecture",
+    "files",
+    "deduplication",
+)
+
 
 class ConfigManager:
     """Manages configuration loading, validation, and access."""
@@ -12,8 +27,10 @@ class ConfigManager:
         self.config = None
 
     def _get_default_config_path(self):
-        """Get the default path to the config file."""
-        return os.path.join(os.path.dirname(__file__), "..", "config", "config.yaml")
+        """Get the default path to the config file, overridable with ANALYSIS_CONFIG."""
+        return os.getenv("ANALYSIS_CONFIG") or os.path.join(
+            os.path.dirname(__file__), "..", "config", "config.yaml"
+        )
 
     def _load_yaml_file(self, filepath):
         """Load and parse a YAML configuration file."""
@@ -98,3 +115,10 @@ class ConfigManager:
 def load_config(config_path=None):
     """Load and return the configuration."""
     return ConfigManager(config_path).get_config()
+
+
+def config_fingerprint(config):
+    """Return a stable hash of the analysis-relevant parts of a configuration."""
+    relevant = {k: v for k, v in config.items() if k in ANALYSIS_SECTIONS}
+    encoded = json.dumps(relevant, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
@@ -0,0 +1,96 @@
+import json
+import os
+import tempfile
+import threading
+from itertools import islice
+from src.utils import log
+
+
+class DiskCache:
+    """Thread-safe JSON file cache of entries by key.
+
+    Entries not read or written during a run can be pruned when saving, so
+    caches of content that no longer exists do not grow without bound. A
+    cache that is never pruned, as in a long-running service, can be capped
+    at `max_entries`: saving then keeps only the most recently used entries.
+    """
+
+    def __init__(self, path, version=1, max_entries=None):
+        self.path = path
+        self.version = version
+        self.max_entries = max_entries
+        self.entries = {}
+        self.used = set()
+        self.dirty = False
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """Loads cached entries, starting empty if the file is missing or stale."""
+        if not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            log(f"Ignoring unreadable cache {self.path}: {e}")
+            return
+
+        if data.get("version") == self.version:
+            self.entries = data.get("entries", {})
+
+    def get(self, key):
+        """Returns the entry for key, or None."""
+        with self._lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                # Entries are kept in order of use, most recent last
+                self.entries[key] = entry
+                self.used.add(key)
+            return entry
+
+    def put(self, key, entry):
+        """Stores an entry under key."""
+        with self._lock:
+            self.entries.pop(key, None)
+            self.entries[key] = entry
+            self.used.add(key)
+            self.dirty = True
+
+    def save(self, prune=True):
+        """Writes the cache atomically if it changed.
+
+        With prune, entries not used by this run are dropped. Saves may run
+        while other threads use the cache: each writes a copy of the entries
+        taken under the lock, and concurrent saves are written one at a time.
+        """
+        with self._save_lock:
+            with self._lock:
+                entries = self.entries
+                if prune:
+                    entries = {k: v for k, v in entries.items() if k in self.used}
+                if self.max_entries is not None and len(entries) > self.max_entries:
+                    # Least recently used entries come first
+                    excess = len(entries) - self.max_entries
+                    entries = dict(islice(entries.items(), excess, None))
+                if not self.dirty and len(entries) == len(self.entries):
+                    return
+                self.entries, self.dirty = entries, False
+                self.used.intersection_update(entries)
+                snapshot = dict(entries)
+
+            directory = os.path.dirname(self.path) or "."
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(
+                dir=directory, prefix=f"{os.path.basename(self.path)}.", suffix=".tmp"
+            )
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump({"version": self.version, "entries": snapshot}, f)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        log(f"Saved {len(snapshot)} cache entries to {self.path}")
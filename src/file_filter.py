@@ -0,0 +1,154 @@
+import os
+import re
+from src.utils import log
+
+# Languages named in prompts, by file extension
+LANGUAGES = {
+    ".py": "Python",
+    ".js": "JavaScript",
+    ".jsx": "JavaScript",
+    ".ts": "TypeScript",
+    ".tsx": "TypeScript",
+    ".java": "Java",
+    ".kt": "Kotlin",
+    ".go": "Go",
+    ".rb": "Ruby",
+    ".php": "PHP",
+    ".cs": "C#",
+    ".c": "C",
+    ".h": "C",
+    ".cpp": "C++",
+    ".hpp": "C++",
+    ".rs": "Rust",
+    ".swift": "Swift",
+    ".scala": "Scala",
+}
+
+# .gitattributes attributes that mark files nobody should be reviewed for
+GENERATED_ATTRIBUTES = ("linguist-generated", "linguist-vendored")
+
+
+def language_for(path):
+    """Returns the language name of a file, from its extension."""
+    return LANGUAGES.get(os.path.splitext(path)[1].lower(), "Python")
+
+
+def glob_to_regex(pattern):
+    """Translates a gitignore-style glob into a compiled regular expression.
+
+    `*` and `?` do not cross directory separators, `**` does, and a pattern
+    without a `/` matches the file name at any depth.
+    """
+    pattern = pattern.strip()
+    anchored = "/" in pattern.rstrip("/")
+    pattern = pattern.lstrip("/")
+    if pattern.endswith("/"):
+        pattern += "**"
+
+    parts, index = [], 0
+    while index < len(pattern):
+        if pattern.startswith("**/", index):
+            parts.append("(?:.*/)?")
+            index += 3
+        elif pattern.startswith("**", index):
+            parts.append(".*")
+            index += 2
+        elif pattern[index] == "*":
+            parts.append("[^/]*")
+            index += 1
+        elif pattern[index] == "?":
+            parts.append("[^/]")
+            index += 1
+        else:
+            parts.append(re.escape(pattern[index]))
+            index += 1
+
+    prefix = "" if anchored else "(?:.*/)?"
+    return re.compile(f"^{prefix}{''.join(parts)}$")
+
+
+def parse_gitattributes(text):
+    """Returns (pattern regex, excluded) rules for generated or vendored files.
+
+    `excluded` is False for lines that unset the attributes (e.g.
+    `-linguist-generated` or `linguist-generated=false`), which re-include files.
+    """
+    rules = []
+    for line in (text or "").splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+
+        pattern, *attributes = line.split()
+        for attribute in attributes:
+            name, _, value = attribute.lstrip("-!").partition("=")
+            if name not in GENERATED_ATTRIBUTES:
+                continue
+            unset = attribute[0] in "-!" or value.lower() == "false"
+            rules.append((glob_to_regex(pattern), not unset))
+    return rules
+
+
+class FileFilter:
+    """Decides which tree entries are worth fetching, before any content is read.
+
+    A file is selected when it has one of `extensions`, matches an `include`
+    glob (if any are given), matches no `exclude` glob, is not marked
+    generated or vendored in .gitattributes and is at most `max_file_bytes`
+    large according to the tree's `size` field.
+    """
+
+    def __init__(
+        self,
+        extensions=(".py",),
+        include=(),
+        exclude=(),
+        max_file_bytes=None,
+        respect_gitattributes=False,
+    ):
+        self.extensions = tuple(extension.lower() for extension in extensions)
+        self.include = [glob_to_regex(pattern) for pattern in include]
+        self.exclude = [glob_to_regex(pattern) for pattern in exclude]
+        self.max_file_bytes = max_file_bytes
+        self.respect_gitattributes = respect_gitattributes
+        self.attribute_rules = []
+
+    @classmethod
+    def from_config(cls, config):
+        """Builds a filter from the `files` config section."""
+        settings = config.get("files", {}) or {}
+        return cls(
+            extensions=settings.get("extensions") or [".py"],
+            include=settings.get("include") or [],
+            exclude=settings.get("exclude") or [],
+            max_file_bytes=settings.get("max_file_bytes"),
+            respect_gitattributes=settings.get("respect_gitattributes", True),
+        )
+
+    def load_gitattributes(self, text):
+        """Adds the generated/vendored rules of a root .gitattributes file."""
+        self.attribute_rules = parse_gitattributes(text)
+        log(f"Loaded {len(self.attribute_rules)} generated/vendored rules")
+
+    def is_generated(self, path):
+        """Returns whether .gitattributes marks a path generated or vendored."""
+        generated = False
+        # As in git, the last matching line wins
+        for regex, excluded in self.attribute_rules:
+            if regex.match(path):
+                generated = excluded
+        return generated
+
+    def check(self, path, size=None):
+        """Returns why a file is filtered out, or None if it should be analyzed."""
+        if not path.lower().endswith(self.extensions):
+            return "extension"
+        if self.include and not any(regex.match(path) for regex in self.include):
+            return "not_included"
+        if any(regex.match(path) for regex in self.exclude):
+            return "excluded"
+        if self.is_generated(path):
+            return "generated"
+        if self.max_file_bytes and size is not None and size > self.max_file_bytes:
+            return "too_large"
+        return None
@@ -1,8 +1,32 @@
 import os
 import base64
+import itertools
+import re
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
-from src.utils import log
+from src.cassette import active_cassette, decode_response, encode_response, is_replaying
+from src.file_filter import FileFilter
+from src.metrics import metrics
+from src.utils import log, LogLevel
+
+DEFAULT_GITHUB_API_URL = "https://api.github.com"
+# Subtrees fetched in parallel when a recursive tree listing is truncated
+TREE_FETCH_WORKERS = 8
+# Upper bound on file contents remembered to serve duplicate blobs
+CONTENT_MEMO_BYTES = 4 * 1024 * 1024
+ENDPOINT_PATTERN = re.compile(
+    r"/repos/[^/]+/[^/]+/(git/trees|git/blobs|git/refs|contents|commits|compare|pulls|issues)"
+)
+
+
+def get_endpoint_name(url):
+    """Returns a low-cardinality endpoint name for metrics labels."""
+    match = ENDPOINT_PATTERN.search(url)
+    return match.group(1).replace("git/", "") if match else "other"
 
 
 class EnvironmentManager:
@@ -26,12 +50,41 @@ class EnvironmentManager:
         """Gets an environment variable with a fallback default."""
         return os.getenv(var_name, default)
 
+    @staticmethod
+    def get_pr_number():
+        """Gets the pull request number from PR_NUMBER or a refs/pull/<n>/... GITHUB_REF."""
+        pr_number = os.getenv("PR_NUMBER")
+        if pr_number:
+            return pr_number
+
+        match = re.match(r"refs/pull/(\d+)/", os.getenv("GITHUB_REF", ""))
+        return match.group(1) if match else None
+
+    @staticmethod
+    def get_api_url():
+        """Gets the GitHub API base URL (GitHub Enterprise or a local stand-in)."""
+        return os.getenv("GITHUB_API_URL", DEFAULT_GITHUB_API_URL).rstrip("/")
+
+
+def create_session(pool_size=32):
+    """Returns a requests session whose connection pool can serve pool_size threads."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
 
 class GitHubAPIClient:
-    """Low-level client for GitHub API requests."""
+    """Low-level client for GitHub API requests.
+
+    A shared `session` reuses connections across clients; without one each
+    request goes through `requests.get`.
+    """
 
-    def __init__(self, token):
+    def __init__(self, token, session=None):
         self.token = token
+        self.session = session
 
     def get_auth_headers(self):
         """Returns authentication headers for GitHub API requests."""
@@ -40,7 +93,29 @@ class GitHubAPIClient:
     def make_request(self, url):
         """Makes a GET request to the GitHub API."""
         headers = self.get_auth_headers()
-        response = requests.get(url, headers=headers)
+        endpoint = get_endpoint_name(url)
+
+        start = time.perf_counter()
+        session = self.session or requests
+        cassette = active_cassette()
+        if cassette is None:
+            response = session.get(url, headers=headers)
+        else:
+            response = cassette.play(
+                "github",
+                {"method": "GET", "url": url},
+                lambda: session.get(url, headers=headers),
+                encode_response,
+                decode_response,
+            )
+        metrics.observe(
+            "github_request_duration_seconds",
+            time.perf_counter() - start,
+            endpoint=endpoint,
+        )
+        metrics.increment(
+            "github_requests_total", endpoint=endpoint, status=response.status_code
+        )
 
         if response.status_code != 200:
             raise ValueError(
@@ -53,51 +128,249 @@ class GitHubAPIClient:
 class GitHubClient:
     """Client for interacting with GitHub repositories."""
 
-    def __init__(self, repo_name):
+    def __init__(self, repo_name, branch=None, session=None):
         # Load environment and configuration
         EnvironmentManager.load_environment()
 
-        # Get required configuration
-        self.token = EnvironmentManager.get_required_env_var("GITHUB_TOKEN")
+        # Get required configuration; a replayed run needs no credentials
+        self.token = (
+            EnvironmentManager.get_env_var("GITHUB_TOKEN", "")
+            if is_replaying()
+            else EnvironmentManager.get_required_env_var("GITHUB_TOKEN")
+        )
         self.repo_name = repo_name
-        self.branch = EnvironmentManager.get_env_var("GITHUB_BRANCH", "main")
+        self.branch = branch or EnvironmentManager.get_env_var("GITHUB_BRANCH", "main")
+        self.commit_sha = None
+        self.api_url = EnvironmentManager.get_api_url()
 
         # Initialize API client
-        self.api_client = GitHubAPIClient(self.token)
+        self.api_client = GitHubAPIClient(self.token, session)
 
         # Log configuration
         log(f"Initialized GitHub client for repo: {repo_name}, branch: {self.branch}")
 
-    def _get_tree_url(self):
-        """Returns the URL for the repository tree API."""
-        return f"https://api.github.com/repos/{self.repo_name}/git/trees/{self.branch}?recursive=1"
+    def _get_ref(self):
+        """Returns the resolved commit SHA if known, otherwise the branch name."""
+        return self.commit_sha or self.branch
+
+    def _get_tree_url(self, tree=None, recursive=True):
+        """Returns the URL for the tree API of the pinned ref or of a tree SHA."""
+        url = (
+            f"{self.api_url}/repos/{self.repo_name}/git/trees/{tree or self._get_ref()}"
+        )
+        return f"{url}?recursive=1" if recursive else url
 
     def _get_content_url(self, file_path):
         """Returns the URL for a file's content API."""
-        return f"https://api.github.com/repos/{self.repo_name}/contents/{file_path}?ref={self.branch}"
+        return f"{self.api_url}/repos/{self.repo_name}/contents/{file_path}?ref={self._get_ref()}"
 
-    def get_files(self, extension=".py"):
-        """Fetch all files with the specified extension recursively from the repo."""
-        tree_url = self._get_tree_url()
+    def _get_commit_url(self):
+        """Returns the URL for the commit API of the configured branch."""
+        return f"{self.api_url}/repos/{self.repo_name}/commits/{self.branch}"
 
+    def get_commit_sha(self):
+        """Resolve the configured branch to a commit SHA and pin later reads to it."""
         try:
-            data = self.api_client.make_request(tree_url)
-            files = []
+            data = self.api_client.make_request(self._get_commit_url())
+            self.commit_sha = data.get("sha")
+            return self.commit_sha
+        except Exception as e:
+            log(f"⚠️ Unable to resolve commit for {self.branch}: {str(e)}")
+            return None
 
-            for item in data.get("tree", []):
-                if item["type"] == "blob" and item["path"].endswith(extension):
-                    content = self.get_file_content(item["path"])
-                    if content:  # Only add if content was successfully retrieved
-                        files.append((item["path"], content))
+    def get_default_branch(self):
+        """Returns the repository's default branch."""
+        data = self.api_client.make_request(f"{self.api_url}/repos/{self.repo_name}")
+        return data.get("default_branch", "main")
+
+    def get_pull_request_files(self, pr_number):
+        """Returns the paths changed by a pull request."""
+        paths, page, per_page = set(), 1, 100
+        while True:
+            batch = self.api_client.make_request(
+                f"{self.api_url}/repos/{self.repo_name}/pulls/{pr_number}/files"
+                f"?per_page={per_page}&page={page}"
+            )
+            paths.update(changed_file["filename"] for changed_file in batch)
+            if len(batch) < per_page:
+                return paths
+            page += 1
+
+    def get_merge_base(self, base):
+        """Returns the SHA of the commit where the analyzed ref forked from base."""
+        url = (
+            f"{self.api_url}/repos/{self.repo_name}/compare/{base}...{self._get_ref()}"
+        )
+        return self.api_client.make_request(url)["merge_base_commit"]["sha"]
+
+    def get_open_pull_requests(self, head):
+        """Returns the numbers of open PRs from a head ("owner:branch")."""
+        url = (
+            f"{self.api_url}/repos/{self.repo_name}/pulls"
+            f"?state=open&head={head}&per_page=100"
+        )
+        return [pr["number"] for pr in self.api_client.make_request(url)]
+
+    def get_churn(self, max_commits=20):
+        """Counts how many of the branch's latest commits touched each path."""
+        commits = self.api_client.make_request(
+            f"{self.api_url}/repos/{self.repo_name}/commits"
+            f"?sha={self._get_ref()}&per_page={max_commits}"
+        )
+        churn = {}
+        for commit in commits[:max_commits]:
+            details = self.api_client.make_request(
+                f"{self.api_url}/repos/{self.repo_name}/commits/{commit['sha']}"
+            )
+            for changed_file in details.get("files", []):
+                churn[changed_file["filename"]] = (
+                    churn.get(changed_file["filename"], 0) + 1
+                )
+        return churn
+
+    def _iter_tree_levels(self):
+        """Yields lists of blob entries (with full paths), root directory first.
+
+        The recursive listing is used when GitHub returns it whole. For very
+        large repositories it comes back with `truncated` set; the root is then
+        listed on its own and each top-level subtree is fetched recursively by
+        SHA, concurrently, yielding its blobs as soon as it arrives. Only a
+        subtree whose own recursive listing is truncated is walked one level
+        down the same way, so the number of requests stays close to the number
+        of top-level directories and the full tree is never held in memory.
+        """
+        data = self.api_client.make_request(self._get_tree_url())
+        if not data.get("truncated"):
+            yield [item for item in data.get("tree", []) if item["type"] == "blob"]
+            return
+
+        log(
+            "⚠️ Recursive tree listing was truncated, fetching subtrees individually",
+            LogLevel.WARNING,
+        )
+        metrics.increment("tree_walk_fallbacks_total")
+        del data
+
+        root = self.api_client.make_request(self._get_tree_url(recursive=False))
+        with ThreadPoolExecutor(
+            max_workers=TREE_FETCH_WORKERS, thread_name_prefix="tree"
+        ) as executor:
+            pending = {}
+
+            def fetch(prefix, sha, recursive):
+                url = self._get_tree_url(sha, recursive=recursive)
+                future = executor.submit(self.api_client.make_request, url)
+                pending[future] = (prefix, sha, recursive)
+
+            def visit(prefix, entries, descend):
+                blobs = []
+                for item in entries:
+                    path = f"{prefix}{item['path']}"
+                    if item["type"] == "tree" and descend:
+                        fetch(f"{path}/", item["sha"], recursive=True)
+                    elif item["type"] == "blob":
+                        blobs.append(dict(item, path=path))
+                return blobs
+
+            yield visit("", root.get("tree", []), descend=True)
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    prefix, sha, recursive = pending.pop(future)
+                    subtree = future.result()
+                    if not subtree.get("truncated"):
+                        # A recursive listing already holds every nested entry
+                        yield visit(prefix, subtree.get("tree", []), not recursive)
+                    elif recursive:
+                        log(
+                            f"⚠️ Tree listing for {prefix} was truncated, "
+                            "fetching its subtrees individually",
+                            LogLevel.WARNING,
+                        )
+                        fetch(prefix, sha, recursive=False)
+                    else:
+                        log(
+                            f"⚠️ Tree listing for {prefix} was truncated",
+                            LogLevel.WARNING,
+                        )
+                        yield visit(prefix, subtree.get("tree", []), descend=True)
+
+    def iter_tree(self):
+        """Yields the repository's blob entries as they are listed."""
+        for level in self._iter_tree_levels():
+            yield from level
+
+    def iter_entries(self, file_filter):
+        """Yields the tree entries (path, sha, size) that pass a FileFilter."""
+        levels = self._iter_tree_levels()
+        root = next(levels, [])
+
+        # The root directory always comes first, so .gitattributes rules
+        # are known before any other entry is filtered
+        if file_filter.respect_gitattributes and any(
+            item["path"] == ".gitattributes" for item in root
+        ):
+            file_filter.load_gitattributes(self.get_file_content(".gitattributes"))
 
-            if not files:
-                log(f"⚠️ No {extension} files found in the repository.")
+        for item in itertools.chain(root, itertools.chain.from_iterable(levels)):
+            reason = file_filter.check(item["path"], item.get("size"))
+            if reason:
+                if reason != "extension":
+                    metrics.increment("files_filtered_total", reason=reason)
+                continue
+            yield item
 
-            return files
+    def iter_files(self, extension=".py", file_filter=None, entries=None):
+        """Lazily yields (path, content) for the repository's matching files.
+
+        Contents are fetched one file at a time as the caller asks for them, so
+        only the files the caller still holds are in memory. A FileFilter, if
+        given, replaces the extension check and is applied to the tree entries
+        (path and size) before any content is requested. `entries`, if given,
+        are the tree entries to fetch, in order, instead of the filtered tree.
+        """
+        file_filter = file_filter or FileFilter(extensions=[extension])
+        # Paths sharing a blob SHA have identical content: fetch it once. Only
+        # recent contents are remembered, so the memo stays small; older
+        # duplicates are fetched again.
+        contents_by_sha = OrderedDict()
+        memo_bytes = 0
+        found = 0
+
+        try:
+            if entries is None:
+                entries = self.iter_entries(file_filter)
+
+            for item in entries:
+                sha = item.get("sha")
+                if sha and sha in contents_by_sha:
+                    metrics.increment("files_deduplicated_total", stage="fetch")
+                    contents_by_sha.move_to_end(sha)
+                    content = contents_by_sha[sha]
+                else:
+                    content = self.get_file_content(item["path"])
+                    if sha and content and len(content) <= CONTENT_MEMO_BYTES:
+                        contents_by_sha[sha] = content
+                        memo_bytes += len(content)
+                        while memo_bytes > CONTENT_MEMO_BYTES:
+                            _, evicted = contents_by_sha.popitem(last=False)
+                            memo_bytes -= len(evicted)
+
+                if content:  # Only yield if content was successfully retrieved
+                    found += 1
+                    yield item["path"], content
 
         except Exception as e:
             log(f"Error fetching repository files: {str(e)}")
-            return []
+
+        if not found:
+            log(
+                f"⚠️ No {', '.join(file_filter.extensions)} files found in the repository."
+            )
+
+    def get_files(self, extension=".py", file_filter=None):
+        """Fetch all files with the specified extension recursively from the repo."""
+        return list(self.iter_files(extension, file_filter))
 
     def get_file_content(self, file_path):
         """Fetch and decode the file content."""
@@ -109,5 +382,10 @@ class GitHubClient:
             return base64.b64decode(encoded_content).decode("utf-8")
 
         except Exception as e:
-            log(f"⚠️ Unable to fetch content for {file_path}: {str(e)}")
+            log(
+                f"⚠️ Unable to fetch content for {file_path}: {str(e)}",
+                LogLevel.WARNING,
+                file=file_path,
+                rate_key="fetch_failed",
+            )
             return ""
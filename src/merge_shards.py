@@ -0,0 +1,93 @@
+"""Combines the partial results of sharded analysis runs into one report.
+
+Each shard (SHARD_INDEX/SHARD_COUNT) writes analysis_results.shard-<i>-of-<n>.jsonl.
+This command merges them into analysis_feedback.md and analysis_results.jsonl
+and, in a pull request, posts one comment and one review for the whole run:
+
+    python -m src.merge_shards analysis_results.shard-*.jsonl
+"""
+
+import argparse
+import os
+import sys
+from src.analyzer import AnalysisResultHandler
+from src.post_comment import FeedbackFormatter, post_pr_comment, post_pr_review
+from src.result_store import ResultStore
+from src.utils import log, LogLevel
+
+# Metadata that must agree between the partials of one run
+RUN_KEYS = ("repo", "commit_sha", "config_fingerprint")
+
+
+def merge_partials(paths, output_file="analysis_feedback.md", results_file=None):
+    """Merges partial result stores, writing the combined report and store.
+
+    Raises ValueError if a partial is unreadable or belongs to another run.
+    Missing shards are reported and make the merged run incomplete.
+    """
+    metadata, shards = None, set()
+    handler = AnalysisResultHandler(output_file=output_file, results_file=results_file)
+    results = handler.create_spool()
+    complete = True
+
+    for path in paths:
+        store = ResultStore(path)
+        partial = store.read_metadata()
+        if not partial or not partial.get("shard"):
+            raise ValueError(f"{path} is not a readable partial result")
+
+        if metadata is None:
+            metadata = partial
+        for key in RUN_KEYS:
+            if partial.get(key) != metadata.get(key):
+                raise ValueError(f"{path} is from a different run ({key} differs)")
+        if partial["shard"]["count"] != metadata["shard"]["count"]:
+            raise ValueError(f"{path} is from a different run (shard count differs)")
+
+        shards.add(partial["shard"]["index"])
+        complete = complete and partial.get("complete", True)
+        for file_path, result in store.iter_results():
+            results.add(file_path, result)
+
+    if metadata is None:
+        raise ValueError("No partial results to merge")
+
+    missing = sorted(set(range(metadata["shard"]["count"])) - shards)
+    if missing:
+        log(f"Missing results for shard(s) {missing}", LogLevel.WARNING)
+
+    merged = {key: metadata[key] for key in RUN_KEYS + ("ref",) if key in metadata}
+    merged["shards"] = metadata["shard"]["count"]
+    merged["complete"] = complete and not missing
+
+    handler.set_metadata(merged)
+    log(f"Merged {len(results)} result(s) from {len(shards)} shard(s)")
+    return handler.save_results(results)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("partials", nargs="+", help="Partial result files")
+    parser.add_argument("--output", default="analysis_feedback.md")
+    parser.add_argument(
+        "--no-comment",
+        action="store_true",
+        help="Only write the merged report; do not post to the pull request",
+    )
+    args = parser.parse_args(argv)
+
+    results = merge_partials(args.partials, output_file=args.output)
+    if args.no_comment:
+        return 0
+
+    metadata = ResultStore(
+        os.path.join(os.path.dirname(args.output), "analysis_results.jsonl")
+    ).read_metadata()
+    rollup = (metadata or {}).get("rollup")
+    post_pr_comment(FeedbackFormatter().format_all_feedback(results, rollup))
+    post_pr_review(results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from src.utils import log
+
+# Latency buckets in seconds, from fast API calls to slow model completions
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+METRIC_DESCRIPTIONS = {
+    "github_requests_total": "GitHub API requests by endpoint and status.",
+    "github_request_duration_seconds": "GitHub API request latency.",
+    "openai_requests_total": "OpenAI requests by model and outcome.",
+    "openai_request_duration_seconds": "OpenAI request latency.",
+    "openai_tokens_total": "OpenAI token usage by model and kind.",
+    "stage_duration_seconds": "Duration of pipeline stages.",
+    "tree_walk_fallbacks_total": "Truncated recursive tree listings walked per subtree.",
+    "files_analyzed_total": "Files analyzed by outcome.",
+    "files_filtered_total": "Tree entries skipped before fetching, by reason.",
+    "files_deduplicated_total": "Files served from identical content by stage.",
+    "prompt_tokens_estimated_total": "Estimated code tokens before and after compaction.",
+    "model_escalations_total": "Cascade triage results by escalation reason.",
+    "retries_total": "Retried requests by client and reason.",
+    "hedged_requests_total": "Duplicate requests sent to cut tail latency.",
+    "circuit_open": "Whether a circuit breaker is open (1) or closed (0).",
+    "circuit_rejections_total": "Calls rejected by an open circuit breaker.",
+    "cache_hits_total": "Cache hits by cache.",
+    "cache_misses_total": "Cache misses by cache.",
+    "concurrency_limit": "Current adaptive concurrency limit.",
+    "concurrency_in_flight": "Requests currently holding a concurrency slot.",
+    "cassette_requests_total": "Requests recorded or replayed by the cassette.",
+    "quality_score": "Combined quality score by repository, scope and kind.",
+    "webhook_events_total": "Webhook deliveries by event and outcome.",
+    "webhook_queue_depth": "Analysis jobs waiting in the webhook queue.",
+    "webhook_jobs_total": "Webhook analysis jobs by outcome.",
+    "webhook_job_duration_seconds": "Duration of webhook analysis jobs.",
+}
+
+
+class Histogram:
+    """Cumulative-bucket histogram compatible with the Prometheus data model."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        """Records a single observation."""
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+
+    def to_dict(self):
+        """Returns the histogram as a JSON-serialisable dictionary."""
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "buckets": {str(bound): n for bound, n in zip(self.buckets, self.counts)},
+        }
+
+
+class MetricsRegistry:
+    """Thread-safe registry of counters, gauges and latency histograms."""
+
+    def __init__(self, prefix="code_quality"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Clears all recorded metrics."""
+        with self._lock:
+            self.counters = {}
+            self.gauges = {}
+            self.histograms = {}
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def increment(self, name, value=1, **labels):
+        """Adds value to a counter."""
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        """Sets a gauge to value."""
+        with self._lock:
+            self.gauges[self._key(name, labels)] = value
+
+    def observe(self, name, value, **labels):
+        """Records an observation in a histogram."""
+        key = self._key(name, labels)
+        with self._lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Times the enclosed block and records it in a histogram, in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def get_counter(self, name, **labels):
+        """Returns the current value of a counter."""
+        with self._lock:
+            return self.counters.get(self._key(name, labels), 0)
+
+    def snapshot(self):
+        """Returns all metrics as a JSON-serialisable dictionary."""
+        with self._lock:
+
+            def entries(series, render):
+                return [
+                    {"name": name, "labels": dict(labels), **render(value)}
+                    for (name, labels), value in sorted(series.items())
+                ]
+
+            return {
+                "generated_at": datetime.now(timezone.utc).isoformat(
+                    timespec="seconds"
+                ),
+                "counters": entries(self.counters, lambda v: {"value": v}),
+                "gauges": entries(self.gauges, lambda v: {"value": v}),
+                "histograms": entries(self.histograms, lambda h: h.to_dict()),
+            }
+
+    @staticmethod
+    def _format_labels(labels, extra=()):
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ""
+        escaped = (
+            (k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+            for k, v in pairs
+        )
+        return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+    def _describe(self, lines, seen, name, kind):
+        full_name = f"{self.prefix}_{name}"
+        if full_name in seen:
+            return full_name
+        seen.add(full_name)
+        if name in METRIC_DESCRIPTIONS:
+            lines.append(f"# HELP {full_name} {METRIC_DESCRIPTIONS[name]}")
+        lines.append(f"# TYPE {full_name} {kind}")
+        return full_name
+
+    def to_prometheus(self):
+        """Renders all metrics in the Prometheus text exposition format."""
+        lines, seen = [], set()
+        with self._lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                full_name = self._describe(lines, seen, name, "counter")
+                lines.append(f"{full_name}{self._format_labels(labels)} {value}")
+
+            for (name, labels), value in sorted(self.gauges.items()):
+                full_name = self._describe(lines, seen, name, "gauge")
+                lines.append(f"{full_name}{self._format_labels(labels)} {value}")
+
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                full_name = self._describe(lines, seen, name, "histogram")
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    bucket_labels = self._format_labels(labels, [("le", str(bound))])
+                    lines.append(f"{full_name}_bucket{bucket_labels} {count}")
+                inf_labels = self._format_labels(labels, [("le", "+Inf")])
+                lines.append(f"{full_name}_bucket{inf_labels} {histogram.count}")
+                lines.append(
+                    f"{full_name}_sum{self._format_labels(labels)} {histogram.sum}"
+                )
+                lines.append(
+                    f"{full_name}_count{self._format_labels(labels)} {histogram.count}"
+                )
+
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _write_atomically(path, content):
+        # Textfile collectors may read at any time, so never expose a partial file
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def export(self, json_path, prometheus_path):
+        """Writes the metrics as JSON and as a Prometheus textfile."""
+        self._write_atomically(json_path, json.dumps(self.snapshot(), indent=2))
+        self._write_atomically(prometheus_path, self.to_prometheus())
+        log(f"Metrics exported to {json_path} and {prometheus_path}")
+
+
+# Create a singleton registry for easy access
+metrics = MetricsRegistry()
+
+
+def export_metrics(output_dir=".", textfile_dir=None):
+    """Exports the singleton registry next to the report, or to a collector directory."""
+    json_path = os.path.join(output_dir, "analysis_metrics.json")
+    prometheus_path = os.path.join(textfile_dir or output_dir, "analysis_metrics.prom")
+    try:
+        metrics.export(json_path, prometheus_path)
+    except OSError as e:
+        log(f"Error exporting metrics: {e}")
@@ -0,0 +1,176 @@
+"""Analyzes many repositories in one process.
+
+Repositories share one GitHub connection pool, one OpenAI concurrency limit
+and token count, the configuration and the content caches:
+
+    python -m src.multi_repo owner/api owner/web@develop
+    python -m src.multi_repo --org my-org
+"""
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from src.analyzer import CodeAnalyzer, SharedResources
+from src.cassette import Cassette
+from src.config_loader import load_config
+from src.github_client import EnvironmentManager, GitHubAPIClient
+from src.report_renderer import combined_score, score_weights
+from src.utils import log, log_context, LogLevel
+
+
+def list_org_repos(api_client, org, include_archived=False, include_forks=False):
+    """Returns (full name, default branch) for every repository of an organization."""
+    api_url = EnvironmentManager.get_api_url()
+    repos, page, per_page = [], 1, 100
+    while True:
+        batch = api_client.make_request(
+            f"{api_url}/orgs/{org}/repos?type=all&per_page={per_page}&page={page}"
+        )
+        for repo in batch:
+            if repo.get("archived") and not include_archived:
+                continue
+            if repo.get("fork") and not include_forks:
+                continue
+            repos.append((repo["full_name"], repo.get("default_branch")))
+        if len(batch) < per_page:
+            return repos
+        page += 1
+
+
+def parse_repo(spec):
+    """Splits an "owner/name[@branch]" argument into (full name, branch or None)."""
+    name, _, branch = spec.partition("@")
+    return name, branch or None
+
+
+def summarize(results, weights=None):
+    """Returns a repository's file count, failures and mean combined score."""
+    scores = [
+        score
+        for score in (
+            combined_score(r.get("dry_score"), r.get("solid_score"), weights)
+            for r in results.values()
+        )
+        if score is not None
+    ]
+    return {
+        "files": len(results),
+        "failed": sum(1 for r in results.values() if r.get("status") == "failed"),
+        "mean_score": round(sum(scores) / len(scores), 2) if scores else None,
+    }
+
+
+class MultiRepoAnalyzer:
+    """Runs CodeAnalyzer over many repositories with shared resources.
+
+    Up to `max_parallel` repositories are analyzed at once. Their OpenAI
+    requests go through one adaptive limiter that hands free slots to the
+    repository with the fewest requests in flight, so a giant repository
+    cannot starve the others. Each repository's report and result store are
+    written to `<output_dir>/<owner>__<name>/`.
+    """
+
+    def __init__(
+        self, repos, output_dir="analysis_reports", max_parallel=4, shared=None
+    ):
+        self.repos = repos
+        self.output_dir = output_dir
+        self.max_parallel = max_parallel
+        self.shared = shared or SharedResources()
+
+    @classmethod
+    def from_config(cls, repos, config=None, output_dir=None):
+        """Builds a runner from the `multi_repo` config section."""
+        shared = SharedResources(config)
+        settings = shared.config.get("multi_repo", {}) or {}
+        return cls(
+            repos,
+            output_dir=output_dir or settings.get("output_dir", "analysis_reports"),
+            max_parallel=settings.get("max_parallel", 4),
+            shared=shared,
+        )
+
+    def _repo_dir(self, repo):
+        return os.path.join(self.output_dir, repo.replace("/", "__"))
+
+    def analyze(self, repo, branch=None):
+        """Analyzes one repository, returning its summary."""
+        with log_context(repo=repo):
+            try:
+                output_dir = self._repo_dir(repo)
+                os.makedirs(output_dir, exist_ok=True)
+                analyzer = CodeAnalyzer(
+                    repo=repo, branch=branch, shared=self.shared, output_dir=output_dir
+                )
+                if branch is None:
+                    analyzer.github_client.branch = (
+                        analyzer.github_client.get_default_branch()
+                    )
+                results = analyzer.analyze_repo()
+                weights = score_weights(self.shared.config)
+                return dict(summarize(results, weights), status="ok")
+            except Exception as e:
+                log(f"Analysis of {repo} failed: {e}", LogLevel.ERROR)
+                return {"status": "failed", "error": str(e)}
+
+    def run(self):
+        """Analyzes every repository and returns their summaries by name."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        with ThreadPoolExecutor(
+            max_workers=self.max_parallel, thread_name_prefix="repo"
+        ) as executor:
+            summaries = dict(
+                zip(
+                    [repo for repo, _ in self.repos],
+                    executor.map(lambda repo: self.analyze(*repo), self.repos),
+                )
+            )
+
+        self.shared.save_caches()
+        with open(os.path.join(self.output_dir, "analysis_summary.json"), "w") as f:
+            json.dump(summaries, f, indent=2)
+        self.shared.export_metrics(self.output_dir)
+
+        failed = [
+            repo for repo, summary in summaries.items() if summary["status"] != "ok"
+        ]
+        log(f"Analyzed {len(summaries) - len(failed)} of {len(summaries)} repositories")
+        return summaries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("repos", nargs="*", help="owner/name[@branch] to analyze")
+    parser.add_argument("--org", help="Analyze every repository of an organization")
+    parser.add_argument("--include-archived", action="store_true")
+    parser.add_argument("--include-forks", action="store_true")
+    parser.add_argument("--output-dir", help="Directory for per-repository reports")
+    args = parser.parse_args(argv)
+
+    EnvironmentManager.load_environment()
+    config = load_config()
+    repos = [parse_repo(spec) for spec in args.repos]
+    with Cassette.from_config(config):
+        runner = MultiRepoAnalyzer.from_config([], config, output_dir=args.output_dir)
+        if args.org:
+            api_client = GitHubAPIClient(
+                EnvironmentManager.get_required_env_var("GITHUB_TOKEN"),
+                runner.shared.session,
+            )
+            repos.extend(
+                list_org_repos(
+                    api_client, args.org, args.include_archived, args.include_forks
+                )
+            )
+        if not repos:
+            parser.error("give at least one repository or --org")
+        runner.repos = repos
+        summaries = runner.run()
+
+    return 0 if all(s["status"] == "ok" for s in summaries.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,53 +1,127 @@
+import hashlib
 import os
+import re
 import requests
 from src.analyzer import analyze_repo
-from src.config_loader import load_config
+from src.config_loader import load_config, config_fingerprint
+from src.github_client import EnvironmentManager, GitHubClient
+from src.metrics import metrics
+from src.report_renderer import (
+    ReportRenderer,
+    score_weights,
+    split_analysis_sections,
+)
+from src.result_store import ResultStore
+from src.review_publisher import PullRequestReviewer
 from src.utils import log
 
+# GitHub rejects issue comments longer than this many characters
+GITHUB_COMMENT_LIMIT = 65536
+COMMENT_MARKER = "<!-- github-code-quality:report"
+COMMENT_MARKER_PATTERN = re.compile(
+    r"<!-- github-code-quality:report part=(\d+)/(\d+) hash=([0-9a-f]+) -->"
+)
+
 
 class FeedbackFormatter:
     """Formats analysis feedback according to configuration."""
 
-    def __init__(self):
-        self.config = load_config()
+    def __init__(self, config=None):
+        self.config = load_config() if config is None else config
         self.format_config = self.config.get("feedback_format", {})
 
     def format_file_feedback(self, file, result):
         """Formats feedback for a single file according to the template."""
+        if result.get("status") == "failed":
+            return (
+                f"### {file}\n\n**Analysis failed** "
+                f"({result.get('error_reason', 'error')}): {result.get('error', '')}"
+            )
+
         template = self.format_config.get("message_template", "")
+        sections = split_analysis_sections(result.get("full_analysis", ""))
 
         return template.format(
             file=file,
             dry_score=result.get("dry_score", "N/A"),
-            dry_analysis=result.get("full_analysis", "No analysis available."),
+            dry_analysis=sections["dry"] or "No analysis available.",
             solid_score=result.get("solid_score", "N/A"),
-            solid_analysis=result.get("full_analysis", "No analysis available."),
+            solid_analysis=sections["solid"] or "No analysis available.",
         )
 
-    def format_all_feedback(self, results):
-        """Formats feedback for all analyzed files."""
+    def format_all_feedback(self, results, rollup=None):
+        """Formats feedback for all analyzed files.
+
+        `rollup` is a Rollup snapshot of directory, package and repository
+        scores to summarize.
+        """
         if not results:
             return "No analysis feedback generated."
 
-        feedback = ""
-        for file, result in results.items():
-            feedback += self.format_file_feedback(file, result)
-
-        return feedback
+        renderer = ReportRenderer(
+            self.format_config,
+            score_weights(self.config),
+            self.format_file_feedback,
+            regression_threshold=self.config.get("baseline", {}).get(
+                "regression_threshold", 1.0
+            ),
+        )
+        return renderer.render(results, rollup)
 
 
 class FeedbackProvider:
     """Provides analysis feedback from various sources."""
 
-    def __init__(self):
+    def __init__(self, results_file="analysis_results.jsonl"):
         self.formatter = FeedbackFormatter()
+        self.store = ResultStore(results_file)
+        self.results = None
+
+    def _get_current_commit_sha(self, metadata):
+        """Resolves the current head of the ref the stored results were computed for."""
+        try:
+            client = GitHubClient(metadata["repo"], branch=metadata.get("ref"))
+            return client.get_commit_sha()
+        except Exception as e:
+            log(f"Unable to verify freshness of stored results: {e}")
+            return None
+
+    def get_from_store(self):
+        """Gets feedback from stored results if they match the current commit and config."""
+        try:
+            metadata = self.store.read_metadata()
+            if not metadata:
+                return None
+
+            fingerprint = config_fingerprint(self.formatter.config)
+            commit_sha = self._get_current_commit_sha(metadata)
+            if not self.store.is_fresh(commit_sha, fingerprint):
+                log("Stored analysis results are stale; re-running analysis.")
+                metrics.increment("cache_misses_total", cache="result_store")
+                return None
+
+            metrics.increment("cache_hits_total", cache="result_store")
+            log(f"Reusing stored analysis results for commit {commit_sha}")
+            if not metadata.get("complete", True):
+                log("Stored analysis results are partial; skipped files are listed.")
+            self.results = self.store.load_results()
+            return self.formatter.format_all_feedback(
+                self.results, metadata.get("rollup")
+            )
+        except Exception as e:
+            log(f"Error reading stored analysis results: {e}")
+            return None
 
     def get_from_analysis(self):
         """Gets feedback by running a fresh analysis."""
         try:
             results = analyze_repo()
             if results:
-                return self.formatter.format_all_feedback(results)
+                self.results = results
+                metadata = self.store.read_metadata() or {}
+                return self.formatter.format_all_feedback(
+                    results, metadata.get("rollup")
+                )
         except Exception as e:
             log(f"Error fetching fresh analysis: {e}")
             return None
@@ -64,9 +138,13 @@ class FeedbackProvider:
         return None
 
     def get_feedback(self):
-        """Gets feedback, prioritizing fresh analysis but falling back to cached file."""
-        # Try to get fresh analysis first
-        feedback = self.get_from_analysis()
+        """Gets feedback, reusing fresh stored results before running a new analysis."""
+        # Results for the same commit and config are reused as-is
+        feedback = self.get_from_store()
+
+        # Otherwise run a fresh analysis
+        if not feedback:
+            feedback = self.get_from_analysis()
 
         # If that fails, try to get from file
         if not feedback:
@@ -79,13 +157,110 @@ class FeedbackProvider:
         return feedback
 
 
+class CommentSplitter:
+    """Splits a report into a bounded number of comments under GitHub's size limit."""
+
+    TRUNCATION_NOTICE = (
+        "\n\n_Report truncated: it exceeds the configured maximum number of comments._"
+    )
+
+    def __init__(self, max_comments=5, max_chars=GITHUB_COMMENT_LIMIT, reserve=512):
+        self.max_comments = max(1, max_comments)
+        # Leave room for the hidden marker, page header and truncation notice
+        self.budget = max_chars - reserve
+
+    def _split_sections(self, body):
+        """Splits the report at top-level sections so files stay in one piece.
+
+        Headings inside an open `<details>` block are not split points, so a
+        section always closes every block it opens.
+        """
+        sections, current, depth = [], [], 0
+        for line in body.splitlines(keepends=True):
+            if (
+                depth == 0
+                and current
+                and (line.startswith("## ") or line.startswith("<details>"))
+            ):
+                sections.append("".join(current))
+                current = []
+            current.append(line)
+            depth = max(0, depth + line.count("<details>") - line.count("</details>"))
+        if current:
+            sections.append("".join(current))
+        return sections
+
+    def _split_oversized(self, text):
+        """Splits a section that does not fit in one comment at line boundaries.
+
+        A `<details>` section is closed at the end of each piece and reopened,
+        with its summary, at the start of the next one.
+        """
+        budget, prefix, suffix = self.budget, "", ""
+        if text.startswith("<details>") and "</summary>\n" in text:
+            head_end = text.index("</summary>\n") + len("</summary>\n")
+            prefix, suffix = text[:head_end], "\n</details>\n\n"
+            body_end = text.rfind("</details>")
+            text = text[head_end:body_end]
+            budget -= len(prefix) + len(suffix)
+
+        pieces, current = [], ""
+        for line in text.splitlines(keepends=True):
+            if current and len(current) + len(line) > budget:
+                pieces.append(current)
+                current = ""
+            while len(line) > budget:
+                pieces.append(line[:budget])
+                line = line[budget:]
+            current += line
+        if current:
+            pieces.append(current)
+        return [prefix + piece + suffix for piece in pieces]
+
+    def split(self, body):
+        """Returns the list of comment chunks for the given report body."""
+        pieces = []
+        for section in self._split_sections(body):
+            if len(section) > self.budget:
+                pieces.extend(self._split_oversized(section))
+            else:
+                pieces.append(section)
+
+        chunks, current = [], []
+        current_size = 0
+        for piece in pieces:
+            if current and current_size + len(piece) > self.budget:
+                chunks.append("".join(current))
+                current, current_size = [], 0
+            current.append(piece)
+            current_size += len(piece)
+        if current or not chunks:
+            chunks.append("".join(current))
+
+        if len(chunks) > self.max_comments:
+            chunks = chunks[: self.max_comments]
+            chunks[-1] += self.TRUNCATION_NOTICE
+
+        return chunks
+
+
 class GitHubPRCommenter:
-    """Handles posting comments to GitHub PRs."""
+    """Handles posting comments to GitHub PRs.
+
+    The repository and PR number come from the GitHub Actions environment
+    unless given, e.g. by the webhook service.
+    """
 
-    def __init__(self):
-        self.repo = os.getenv("GITHUB_REPOSITORY")
-        self.pr_number = self._extract_pr_number()
+    def __init__(self, repo=None, pr_number=None, config=None):
+        self.repo = repo or os.getenv("GITHUB_REPOSITORY")
+        self.pr_number = str(pr_number) if pr_number else self._extract_pr_number()
         self.token = os.getenv("GITHUB_TOKEN")
+        self.api_url = EnvironmentManager.get_api_url()
+        config = load_config() if config is None else config
+        self.format_config = config.get("feedback_format", {})
+        self.splitter = CommentSplitter(
+            max_comments=self.format_config.get("max_comments", 5)
+        )
 
     def _extract_pr_number(self):
         """Extracts PR number from GitHub environment variables."""
@@ -109,7 +284,7 @@ class GitHubPRCommenter:
             log(f"Could not extract PR number from reference: {ref}")
             return None
 
-    def _validate(self):
+    def validate(self):
         """Validates that all required information is available."""
         if not self.pr_number:
             log("No PR number found. Is this running in a pull request context?")
@@ -125,29 +300,115 @@ class GitHubPRCommenter:
 
         return True
 
-    def post_comment(self, comment_body):
-        """Posts a comment to a GitHub Pull Request."""
-        if not self._validate():
-            log("Skipping PR comment - not in a PR context or missing configuration")
-            return True
-
-        url = (
-            f"https://api.github.com/repos/{self.repo}/issues/{self.pr_number}/comments"
-        )
-        headers = {
+    def _get_headers(self):
+        """Returns the headers for GitHub API requests."""
+        return {
             "Authorization": f"token {self.token}",
             "Content-Type": "application/json",
         }
-        payload = {"body": comment_body}
+
+    def _comments_url(self):
+        """Returns the URL for the PR's issue comments."""
+        return f"{self.api_url}/repos/{self.repo}/issues/{self.pr_number}/comments"
+
+    def _comment_url(self, comment_id):
+        """Returns the URL for a single issue comment."""
+        return f"{self.api_url}/repos/{self.repo}/issues/comments/{comment_id}"
+
+    def find_report_comments(self):
+        """Finds previously posted report comments by their hidden marker, in part order."""
+        comments, page, per_page = [], 1, 100
+
+        while True:
+            response = requests.get(
+                self._comments_url(),
+                headers=self._get_headers(),
+                params={"per_page": per_page, "page": page},
+            )
+            if response.status_code != 200:
+                raise ValueError(
+                    f"Failed to list comments: {response.status_code} {response.json()}"
+                )
+
+            batch = response.json()
+            for comment in batch:
+                match = COMMENT_MARKER_PATTERN.search(comment.get("body") or "")
+                if match:
+                    comments.append(
+                        {
+                            "id": comment["id"],
+                            "part": int(match.group(1)),
+                            "total": int(match.group(2)),
+                            "hash": match.group(3),
+                        }
+                    )
+
+            if len(batch) < per_page:
+                break
+            page += 1
+
+        return sorted(comments, key=lambda comment: comment["part"])
+
+    def _render_chunks(self, comment_body):
+        """Splits the report and prefixes each chunk with its marker."""
+        content_hash = hashlib.sha256(comment_body.encode("utf-8")).hexdigest()[:16]
+        chunks = self.splitter.split(comment_body)
+        total = len(chunks)
+
+        rendered = []
+        for part, chunk in enumerate(chunks, start=1):
+            header = f"{COMMENT_MARKER} part={part}/{total} hash={content_hash} -->\n"
+            if total > 1:
+                header += f"_Code quality report, part {part} of {total}_\n\n"
+            rendered.append(header + chunk)
+
+        return content_hash, rendered
+
+    def _is_unchanged(self, existing, content_hash, total):
+        """Checks whether the existing comments already hold this exact report."""
+        return len(existing) == total and all(
+            comment["hash"] == content_hash and comment["total"] == total
+            for comment in existing
+        )
+
+    def _send(self, method, url, payload=None):
+        """Sends a write request and raises on an unexpected status."""
+        response = method(url, headers=self._get_headers(), json=payload)
+        if response.status_code not in (200, 201, 204):
+            raise ValueError(
+                f"GitHub API error: {response.status_code} {response.json()}"
+            )
+        return response
+
+    def post_comment(self, comment_body):
+        """Creates or updates the report comments on a GitHub Pull Request."""
+        if not self.validate():
+            log("Skipping PR comment - not in a PR context or missing configuration")
+            return True
 
         try:
-            response = requests.post(url, headers=headers, json=payload)
-            if response.status_code == 201:
-                log("Successfully posted PR comment.")
+            content_hash, chunks = self._render_chunks(comment_body)
+            existing = self.find_report_comments()
+
+            if self._is_unchanged(existing, content_hash, len(chunks)):
+                log("PR comment is already up to date; skipping update.")
                 return True
-            else:
-                log(f"Failed to post comment: {response.status_code} {response.json()}")
-                return False
+
+            for index, chunk in enumerate(chunks):
+                payload = {"body": chunk}
+                if index < len(existing):
+                    url = self._comment_url(existing[index]["id"])
+                    self._send(requests.patch, url, payload)
+                else:
+                    self._send(requests.post, self._comments_url(), payload)
+
+            # Remove pages left over from a previously longer report
+            part_count = len(chunks)
+            for comment in existing[part_count:]:
+                self._send(requests.delete, self._comment_url(comment["id"]))
+
+            log(f"Successfully published PR comment in {len(chunks)} part(s).")
+            return True
         except Exception as e:
             log(f"Error posting PR comment: {e}")
             return False
@@ -165,6 +426,27 @@ def post_pr_comment(comment_body=None):
     return commenter.post_comment(comment_body)
 
 
+def post_pr_review(results, commenter=None):
+    """Submits line-anchored findings as a single review on the current PR."""
+    commenter = commenter or GitHubPRCommenter()
+    if not commenter.validate():
+        log("Skipping PR review - not in a PR context or missing configuration")
+        return True
+
+    format_config = commenter.format_config
+    if not format_config.get("inline_review", True):
+        return True
+
+    reviewer = PullRequestReviewer(
+        commenter.repo,
+        commenter.pr_number,
+        commenter.token,
+        api_url=commenter.api_url,
+        max_inline_comments=format_config.get("max_inline_comments", 50),
+    )
+    return reviewer.submit(results)
+
+
 def get_analysis_feedback():
     """Entry point to get analysis feedback."""
     provider = FeedbackProvider()
@@ -173,5 +455,10 @@ def get_analysis_feedback():
 
 if __name__ == "__main__":
     # Fetch analysis feedback dynamically and post it to the PR
-    feedback = get_analysis_feedback()
+    provider = FeedbackProvider()
+    feedback = provider.get_feedback()
     post_pr_comment(feedback)
+
+    # Anchor line-level findings on the diff through a single review
+    if provider.results:
+        post_pr_review(provider.results)
@@ -0,0 +1,215 @@
+import cProfile
+import io
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from src.utils import log
+
+# The session currently profiling this process, if any
+_active_session = None
+
+
+class ProfilingSession:
+    """Opt-in CPU and allocation profiling around an analysis run.
+
+    CPU profiling uses cProfile for the whole run, including the worker
+    threads started during it: before Python 3.12 cProfile only sees the
+    thread that enabled it, so each new thread gets its own profiler and
+    their stats are merged. Allocation profiling uses tracemalloc: a snapshot
+    is taken at the end of the run, and selected stages can additionally be
+    sampled to record their CPU time (of the calling thread) and what the
+    whole process allocated meanwhile, including other threads' allocations.
+    Artifacts are written to output_dir, next to the analysis report.
+    """
+
+    def __init__(
+        self,
+        output_dir=".",
+        cpu=False,
+        memory=False,
+        stages=(),
+        stage_sample_rate=1.0,
+        top_n=25,
+    ):
+        self.output_dir = output_dir
+        self.cpu = cpu
+        self.memory = memory
+        self.stages = set(stages)
+        self.stage_sample_rate = stage_sample_rate
+        self.top_n = top_n
+        self.profiler = None
+        self.thread_profilers = []
+        self.started_tracing = False
+        self._lock = threading.Lock()
+        self.stage_reports = []
+
+    @classmethod
+    def from_config(cls, config, output_dir="."):
+        """Builds a session from the `profiling` config section and environment.
+
+        ANALYSIS_PROFILE (e.g. "cpu", "memory" or "cpu,memory") enables profiling
+        without a config change; ANALYSIS_PROFILE_STAGES selects sampled stages.
+        """
+        profiling_config = config.get("profiling", {}) or {}
+        modes = os.getenv("ANALYSIS_PROFILE")
+
+        if modes:
+            requested = {mode.strip().lower() for mode in modes.split(",")}
+            all_modes = bool(requested & {"1", "true", "all"})
+            cpu = all_modes or "cpu" in requested
+            memory = all_modes or "memory" in requested
+        elif profiling_config.get("enabled", False):
+            cpu = profiling_config.get("cpu", True)
+            memory = profiling_config.get("memory", True)
+        else:
+            cpu = memory = False
+
+        stages = profiling_config.get("stages") or []
+        if os.getenv("ANALYSIS_PROFILE_STAGES"):
+            stages = os.getenv("ANALYSIS_PROFILE_STAGES").split(",")
+
+        return cls(
+            output_dir=output_dir,
+            cpu=cpu,
+            memory=memory,
+            stages=[stage.strip() for stage in stages if stage.strip()],
+            stage_sample_rate=profiling_config.get("stage_sample_rate", 1.0),
+            top_n=profiling_config.get("top_n", 25),
+        )
+
+    @property
+    def enabled(self):
+        return self.cpu or self.memory
+
+    def _path(self, filename):
+        return os.path.join(self.output_dir, filename)
+
+    def __enter__(self):
+        global _active_session
+        if not self.enabled:
+            return self
+
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+            self.started_tracing = True
+        if self.cpu:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+            if sys.version_info < (3, 12):
+                threading.setprofile(self._profile_thread)
+
+        _active_session = self
+        log(f"Profiling enabled (cpu={self.cpu}, memory={self.memory})")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        global _active_session
+        if not self.enabled:
+            return False
+
+        _active_session = None
+        try:
+            if self.profiler:
+                if sys.version_info < (3, 12):
+                    threading.setprofile(None)
+                self.profiler.disable()
+                self._write_cpu_profile()
+            if self.memory:
+                self._write_memory_profile(tracemalloc.take_snapshot())
+        except OSError as e:
+            log(f"Error writing profiling artifacts: {e}")
+        finally:
+            # Leave tracing alone if someone else (e.g. a benchmark) started it
+            if self.started_tracing:
+                tracemalloc.stop()
+        return False
+
+    def _profile_thread(self, frame, event, arg):
+        """Starts profiling a new thread at its first call (a threading.setprofile hook)."""
+        profiler = cProfile.Profile()
+        with self._lock:
+            self.thread_profilers.append(profiler)
+        profiler.enable()
+
+    def _write_cpu_profile(self):
+        """Writes the raw pstats file of all threads and a readable summary."""
+        summary = io.StringIO()
+        stats = pstats.Stats(self.profiler, stream=summary)
+        with self._lock:
+            thread_profilers, self.thread_profilers = self.thread_profilers, []
+        for profiler in thread_profilers:
+            # Stops collecting; the thread has usually finished by now
+            profiler.create_stats()
+            if profiler.stats:
+                stats.add(profiler)
+        stats.dump_stats(self._path("analysis_profile.pstats"))
+
+        stats.sort_stats("cumulative").print_stats(self.top_n)
+        with open(self._path("analysis_profile.txt"), "w") as f:
+            f.write(summary.getvalue())
+
+        log(f"CPU profile written to {self._path('analysis_profile.pstats')}")
+
+    def _write_memory_profile(self, snapshot):
+        """Writes the top allocation sites and any sampled per-stage reports."""
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"Current traced memory: {current} bytes", f"Peak: {peak} bytes", ""]
+        lines.extend(str(stat) for stat in snapshot.statistics("lineno")[: self.top_n])
+
+        if self.stage_reports:
+            lines.extend(["", "Sampled stages:"])
+            lines.extend(self.stage_reports)
+
+        with open(self._path("analysis_memory.txt"), "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+        log(f"Allocation profile written to {self._path('analysis_memory.txt')}")
+
+    def should_sample(self, stage):
+        """Decides whether this invocation of a stage gets a detailed snapshot."""
+        if not self.memory or stage not in self.stages:
+            return False
+        return random.random() < self.stage_sample_rate
+
+    @contextmanager
+    def stage(self, name):
+        """Records allocations and CPU time of a sampled stage invocation.
+
+        CPU time is the calling thread's; allocations are the whole process's
+        during the stage, since tracemalloc cannot tell threads apart.
+        """
+        if not self.should_sample(name):
+            yield
+            return
+
+        before = tracemalloc.take_snapshot()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            cpu_seconds = time.thread_time() - cpu_start
+            diff = tracemalloc.take_snapshot().compare_to(before, "lineno")
+            allocated = sum(stat.size_diff for stat in diff)
+            report = [
+                f"[{name}] thread_cpu={cpu_seconds:.4f}s "
+                f"process_net_allocated={allocated}B"
+            ]
+            report.extend(f"  {stat}" for stat in diff[:5])
+            self.stage_reports.extend(report)
+
+
+@contextmanager
+def profile_stage(name):
+    """Profiles a pipeline stage if a profiling session is active."""
+    session = _active_session
+    if session is None:
+        yield
+        return
+
+    with session.stage(name):
+        yield
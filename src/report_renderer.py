@@ -0,0 +1,308 @@
+import html
+import re
+
+SECTION_PATTERN = re.compile(r"^### (DRY Analysis|SOLID Analysis|Findings)\s*$", re.M)
+SCORE_LINE_PATTERN = re.compile(r"^\*\*Score:\s*\d+/10\*\*[ \t]*\n?")
+SECTION_KEYS = {
+    "DRY Analysis": "dry",
+    "SOLID Analysis": "solid",
+    "Findings": "findings",
+}
+# Why files were left unanalyzed, for reasons other than being trivial
+SKIP_REASONS = {
+    "deadline": "deadline reached",
+    "token_budget": "token budget reached",
+}
+
+
+def score_weights(config):
+    """Returns the DRY and SOLID weights of the `analysis` config section."""
+    analysis = config.get("analysis", {})
+    return {
+        "dry_weight": analysis.get("dry", {}).get("weight", 0.5),
+        "solid_weight": analysis.get("solid", {}).get("weight", 0.5),
+    }
+
+
+def combined_score(dry, solid, weights=None):
+    """Returns the weighted mean of a DRY and a SOLID score, or None if either is missing."""
+    if not isinstance(dry, (int, float)) or not isinstance(solid, (int, float)):
+        return None
+
+    weights = weights or {}
+    dry_weight = weights.get("dry_weight", 0.5)
+    solid_weight = weights.get("solid_weight", 0.5)
+    total = (dry_weight + solid_weight) or 1
+    return (dry * dry_weight + solid * solid_weight) / total
+
+
+def split_analysis_sections(analysis):
+    """Splits a model response into its DRY, SOLID and Findings sections.
+
+    Section headings and score lines are dropped because the report template
+    renders them itself. Text that has no recognisable sections is returned
+    as the DRY section so that nothing is lost.
+    """
+    sections = {"dry": "", "solid": "", "findings": ""}
+    matches = list(SECTION_PATTERN.finditer(analysis or ""))
+
+    if not matches:
+        sections["dry"] = (analysis or "").strip()
+        return sections
+
+    for index, match in enumerate(matches):
+        start = match.end()
+        end = matches[index + 1].start() if index + 1 < len(matches) else None
+        body = analysis[start:end].lstrip("\n")
+        sections[SECTION_KEYS[match.group(1)]] = SCORE_LINE_PATTERN.sub(
+            "", body, count=1
+        ).strip()
+
+    return sections
+
+
+class ReportRenderer:
+    """Renders analysis results as a size-bounded markdown report.
+
+    The report starts with a table of the worst-scoring files followed by one
+    collapsible section per file, worst first. Output is collected as a list of
+    parts and joined once, and rendering stops cleanly when the byte budget is
+    reached.
+    """
+
+    def __init__(
+        self, format_config, weights, file_formatter, regression_threshold=1.0
+    ):
+        self.max_bytes = format_config.get("max_report_bytes", 60000)
+        self.summary_rows = format_config.get("summary_rows", 20)
+        self.weights = weights
+        self.file_formatter = file_formatter
+        self.regression_threshold = regression_threshold
+
+    def combined_score(self, result):
+        """Returns the weighted DRY/SOLID score, or None if a score is missing."""
+        score = combined_score(
+            result.get("dry_score"), result.get("solid_score"), self.weights
+        )
+        return None if score is None else round(score, 1)
+
+    def _rank(self, results):
+        """Orders files worst first; files without scores are listed first."""
+        rows = [
+            (path, result, self.combined_score(result))
+            for path, result in results.items()
+        ]
+        rows.sort(key=lambda row: (row[2] is not None, row[2] or 0, row[0]))
+        return rows
+
+    @staticmethod
+    def _score_label(result, score):
+        """Returns the combined score, or why there is none."""
+        if result.get("status") == "failed":
+            return "failed"
+        return score if score is not None else "N/A"
+
+    @staticmethod
+    def _failure_note(rows):
+        """Returns a note on how many files failed analysis, if any."""
+        failed = sum(1 for _, result, _ in rows if result.get("status") == "failed")
+        return f" ({failed} failed)" if failed else ""
+
+    def _render_summary(self, rows):
+        """Renders the summary table of the worst files."""
+        lines = [
+            "## Code Quality Summary",
+            "",
+            f"Analyzed {len(rows)} file(s){self._failure_note(rows)}. "
+            "Worst files first:",
+            "",
+            "| File | DRY | SOLID | Combined |",
+            "| --- | --- | --- | --- |",
+        ]
+        shown = self.summary_rows
+        for path, result, score in rows[:shown]:
+            lines.append(
+                f"| `{path}` | {result.get('dry_score', 'N/A')} "
+                f"| {result.get('solid_score', 'N/A')} "
+                f"| {self._score_label(result, score)} |"
+            )
+        if len(rows) > shown:
+            lines.append(f"\n_{len(rows) - shown} more file(s) not shown._")
+        return "\n".join(lines) + "\n\n"
+
+    def _render_details(self, path, result, score):
+        """Renders the collapsible section for one file."""
+        label = self._score_label(result, score)
+        return (
+            f"<details>\n<summary><code>{html.escape(path)}</code> "
+            f"(score {label})</summary>\n\n"
+            f"{self.file_formatter(path, result).strip()}\n\n</details>\n\n"
+        )
+
+    def _render_skipped(self, skipped):
+        """Renders a note on the files skipped, by reason."""
+        parts = []
+        for reason, paths in sorted(skipped.items(), key=lambda item: str(item[0])):
+            if reason == "trivial":
+                parts.append(f"_{len(paths)} trivial file(s) skipped._\n\n")
+                continue
+
+            label = SKIP_REASONS.get(reason, reason)
+            shown = ", ".join(f"`{path}`" for path in paths[: self.summary_rows])
+            more = len(paths) - self.summary_rows
+            if more > 0:
+                shown += f" and {more} more"
+            parts.append(
+                f"**{len(paths)} file(s) not analyzed ({label}):** {shown}\n\n"
+            )
+        return "".join(parts)
+
+    @staticmethod
+    def _mean(scores):
+        scores = [score for score in scores if score is not None]
+        return round(sum(scores) / len(scores), 1) if scores else None
+
+    def _render_changes(self, rows):
+        """Renders how scores changed against the baseline, listing regressions."""
+        counts = {}
+        befores, afters, regressions = [], [], []
+        commit, merge_base = None, None
+        for path, result, score in rows:
+            note = result["baseline"]
+            commit, merge_base = note.get("commit"), note.get("merge_base", merge_base)
+            counts[note["status"]] = counts.get(note["status"], 0) + 1
+            before = self.combined_score(note) if note["status"] != "added" else None
+            after = score if note["status"] != "removed" else None
+            befores.append(before)
+            afters.append(after)
+            if before is not None and after is not None:
+                if after - before <= -self.regression_threshold:
+                    regressions.append((path, result, score, before))
+
+        mean_before, mean_after = self._mean(befores), self._mean(afters)
+        trend = ""
+        if mean_before is not None and mean_after is not None:
+            trend = (
+                f" Mean score {mean_before} → {mean_after} "
+                f"({mean_after - mean_before:+.1f})."
+            )
+        changes = ", ".join(
+            f"{counts.get(status, 0)} {status}"
+            for status in ("changed", "added", "removed")
+        )
+        lines = [
+            "## Code Quality Changes",
+            "",
+            f"Compared with `{(commit or 'unknown')[:7]}`: {changes}.{trend}",
+        ]
+        if merge_base:
+            lines.append(
+                f"\n_The baseline is not at the merge base `{merge_base[:7]}`; "
+                "changes merged into the base since may show up here._"
+            )
+
+        if not regressions:
+            lines.append(
+                f"\nNo file's score dropped by {self.regression_threshold} or more."
+            )
+            return "\n".join(lines) + "\n\n", []
+
+        regressions.sort(key=lambda row: (row[2] - row[3], row[0]))
+        lines += [
+            "",
+            "| File | Before | After | Change |",
+            "| --- | --- | --- | --- |",
+        ]
+        for path, _, score, before in regressions[: self.summary_rows]:
+            lines.append(f"| `{path}` | {before} | {score} | {score - before:+.1f} |")
+        if len(regressions) > self.summary_rows:
+            lines.append(
+                f"\n_{len(regressions) - self.summary_rows} more regression(s) "
+                "not shown._"
+            )
+        return "\n".join(lines) + "\n\n", [row[:3] for row in regressions]
+
+    def _render_rollup(self, rollup):
+        """Renders the repository score and the worst packages (or top directories)."""
+        repo = (rollup or {}).get("")
+        if not repo or repo.get("score") is None:
+            return ""
+
+        lines = [
+            f"**Repository score: {repo['score']}** (DRY {repo['dry_score']}, "
+            f"SOLID {repo['solid_score']}) over {repo['files']} file(s), "
+            "weighted by lines.",
+        ]
+        scored = {
+            scope: summary
+            for scope, summary in rollup.items()
+            if scope and summary.get("score") is not None
+        }
+        scopes = {s: v for s, v in scored.items() if v["kind"] == "package"}
+        label = "Package"
+        if not scopes:
+            scopes = {s: v for s, v in scored.items() if "/" not in s}
+            label = "Directory"
+        if scopes:
+            lines += [
+                "",
+                f"| {label} | Files | Lines | Score |",
+                "| --- | --- | --- | --- |",
+            ]
+            ranked = sorted(
+                scopes.items(), key=lambda item: (item[1]["score"], item[0])
+            )
+            for scope, summary in ranked[: self.summary_rows]:
+                lines.append(
+                    f"| `{scope}` | {summary['files']} | {summary['lines']} "
+                    f"| {summary['score']} |"
+                )
+        return "\n".join(lines) + "\n\n"
+
+    def render(self, results, rollup=None):
+        """Renders the full report within the configured byte budget.
+
+        Skipped files are left out of the ranking: trivial ones are only
+        counted, and files left out by a deadline or token budget are named.
+        Results compared with a baseline are reported as changes instead,
+        with details only for files whose score dropped by at least the
+        regression threshold. With a Rollup snapshot, the summary also gives
+        the repository score and the worst-scoring packages.
+        """
+        analyzed, skipped = {}, {}
+        for path, result in results.items():
+            if result.get("status") == "skipped":
+                skipped.setdefault(result.get("reason"), []).append(path)
+            else:
+                analyzed[path] = result
+        rows = self._rank(analyzed)
+
+        if any("baseline" in result for result in analyzed.values()):
+            compared = [row for row in rows if "baseline" in row[1]]
+            summary, rows = self._render_changes(compared)
+        else:
+            summary = self._render_summary(rows)
+        summary += self._render_rollup(rollup) + self._render_skipped(skipped)
+
+        parts = [summary]
+        used = len(summary.encode("utf-8"))
+        rendered = 0
+
+        for path, result, score in rows:
+            section = self._render_details(path, result, score)
+            size = len(section.encode("utf-8"))
+            if used + size > self.max_bytes:
+                break
+
+            parts.append(section)
+            used += size
+            rendered += 1
+
+        omitted = len(rows) - rendered
+        if omitted:
+            parts.append(
+                f"_Details for {omitted} file(s) omitted to stay within the "
+                f"{self.max_bytes}-byte report budget._\n"
+            )
+
+        return "".join(parts)
@@ -0,0 +1,253 @@
+import contextvars
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from src.metrics import metrics
+from src.utils import log, LogLevel
+
+# HTTP statuses worth retrying: timeouts, conflicts and server-side failures
+TRANSIENT_STATUSES = {408, 409, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency while its circuit breaker is open."""
+
+
+def classify_error(error):
+    """Classifies an exception as "rate_limited", "transient" or "fatal".
+
+    Works on OpenAI SDK errors (which carry a `status_code`) and on plain
+    connection and timeout errors; anything else, such as an authentication
+    failure or an invalid request, is fatal and not worth retrying.
+    """
+    status = getattr(error, "status_code", None)
+    if status == 429:
+        return "rate_limited"
+    if status in TRANSIENT_STATUSES or (status is not None and status >= 500):
+        return "transient"
+    if status is None and isinstance(error, (ConnectionError, TimeoutError)):
+        return "transient"
+
+    # The SDK's connection and timeout errors have no status code
+    names = {cls.__name__ for cls in type(error).__mro__}
+    if names & {"APIConnectionError", "APITimeoutError"}:
+        return "transient"
+    return "fatal"
+
+
+class RetryPolicy:
+    """Capped exponential backoff with full jitter.
+
+    The delay before retry n is drawn uniformly from [0, min(max_delay,
+    base_delay * 2**(n-1))] so that clients failing together do not retry in
+    lockstep. A server-provided Retry-After takes precedence.
+    """
+
+    def __init__(self, max_attempts=3, base_delay=0.5, max_delay=8.0):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    @classmethod
+    def from_config(cls, config):
+        """Builds a policy from the `resilience` config section."""
+        settings = config.get("resilience", {}) or {}
+        return cls(
+            max_attempts=settings.get("max_attempts", 3),
+            base_delay=settings.get("base_delay", 0.5),
+            max_delay=settings.get("max_delay", 8.0),
+        )
+
+    def should_retry(self, kind, attempt):
+        """Returns whether a failure of the given kind on this attempt is retried."""
+        return kind != "fatal" and attempt < self.max_attempts
+
+    def delay(self, attempt, retry_after=None):
+        """Returns the number of seconds to wait before the next attempt."""
+        if retry_after is not None:
+            return min(self.max_delay, retry_after)
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return random.uniform(0, ceiling)
+
+
+class CircuitBreaker:
+    """Fails fast after repeated failures, then probes for recovery.
+
+    After `failure_threshold` consecutive failures the circuit opens and calls
+    fail immediately with CircuitOpenError. Once `reset_timeout` seconds have
+    passed a single probe call is let through (half-open); its success closes
+    the circuit again and its failure re-opens it. A probe that ends any other
+    way (e.g. rate limited) must be released so that another one can be sent.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, name="openai"):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.name = name
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self._lock = threading.Lock()
+        self._publish()
+
+    @classmethod
+    def from_config(cls, config):
+        """Builds a breaker from the `resilience.circuit_breaker` config section."""
+        settings = (config.get("resilience", {}) or {}).get("circuit_breaker", {})
+        return cls(
+            failure_threshold=settings.get("failure_threshold", 5),
+            reset_timeout=settings.get("reset_timeout", 30.0),
+        )
+
+    def _publish(self):
+        metrics.set_gauge(
+            "circuit_open", int(self.state != self.CLOSED), breaker=self.name
+        )
+
+    def before_call(self):
+        """Raises CircuitOpenError unless a call may be attempted now.
+
+        Returns whether the call is the half-open probe.
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return False
+
+            waited = time.monotonic() - self.opened_at
+            if self.state == self.OPEN and waited >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self.probing = False
+
+            if self.state == self.HALF_OPEN and not self.probing:
+                self.probing = True
+                return True
+
+            metrics.increment("circuit_rejections_total", breaker=self.name)
+            raise CircuitOpenError(
+                f"{self.name} circuit is open after {self.failures} consecutive failures"
+            )
+
+    def record_success(self):
+        """Records a successful call, closing the circuit."""
+        with self._lock:
+            if self.state != self.CLOSED:
+                log(f"{self.name} circuit closed")
+            self.state = self.CLOSED
+            self.failures = 0
+            self.probing = False
+            self._publish()
+
+    def release_probe(self):
+        """Lets another probe through after one that neither succeeded nor failed."""
+        with self._lock:
+            self.probing = False
+
+    def record_failure(self):
+        """Records a failed call, opening the circuit past the threshold."""
+        with self._lock:
+            self.failures += 1
+            self.probing = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    log(
+                        f"{self.name} circuit opened after {self.failures} failures",
+                        LogLevel.WARNING,
+                    )
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+            self._publish()
+
+
+class Hedger:
+    """Sends a duplicate request when the first one is slower than usual.
+
+    Once `min_samples` latencies have been seen, a call that has not finished
+    within the `percentile` latency gets a second, identical request, and
+    whichever finishes first successfully wins. The slower request is not
+    cancelled (the SDK call is synchronous) but its result is ignored. The
+    delay counts from when the first request starts running, so time spent
+    waiting for one of the `max_workers` threads never triggers a hedge.
+    """
+
+    def __init__(
+        self, enabled=False, percentile=95, min_samples=20, window=200, max_workers=32
+    ):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.max_workers = max_workers
+        self.latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._executor = None
+
+    @classmethod
+    def from_config(cls, config):
+        """Builds a hedger from the `resilience.hedging` config section."""
+        settings = (config.get("resilience", {}) or {}).get("hedging", {})
+        return cls(
+            enabled=settings.get("enabled", False),
+            percentile=settings.get("percentile", 95),
+            min_samples=settings.get("min_samples", 20),
+            # Room for a request and its hedge per analysis worker
+            max_workers=2 * config.get("concurrency", {}).get("max", 16),
+        )
+
+    def observe(self, latency):
+        """Records the latency of a completed request."""
+        with self._lock:
+            self.latencies.append(latency)
+
+    def threshold(self):
+        """Returns the hedging delay in seconds, or None until enough samples exist."""
+        with self._lock:
+            if len(self.latencies) < self.min_samples:
+                return None
+            ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100.0))
+        return ordered[index]
+
+    def _submit(self, func):
+        # Carry the caller's log context (file, stage) into the worker thread
+        context = contextvars.copy_context()
+        return self._executor.submit(context.run, func)
+
+    def call(self, func):
+        """Calls func, hedging it with a duplicate call if it runs long."""
+        delay = self.threshold() if self.enabled else None
+        if delay is None:
+            return func()
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="hedge"
+                )
+
+        started = threading.Event()
+
+        def first():
+            started.set()
+            return func()
+
+        pending = {self._submit(first)}
+        started.wait()
+        done, pending = wait(pending, timeout=delay)
+        if not done:
+            metrics.increment("hedged_requests_total")
+            pending.add(self._submit(func))
+
+        error = None
+        while done or pending:
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        raise error
@@ -0,0 +1,58 @@
+import json
+import tempfile
+import threading
+from collections.abc import Mapping
+
+
+class ResultSpool(Mapping):
+    """Read-only mapping of analysis results kept in a temporary file.
+
+    Results are appended as JSON lines as soon as they are added and only
+    their file offsets stay in memory; each lookup reads one result back from
+    disk. Adding a path again replaces its result. The file is deleted when
+    the spool is closed or garbage collected. `on_add` is called with each
+    added path and result, e.g. to keep a Rollup up to date.
+    """
+
+    def __init__(self, directory=None, on_add=None):
+        self._file = tempfile.TemporaryFile(
+            mode="w+b", prefix="analysis_results_", suffix=".jsonl", dir=directory
+        )
+        self._offsets = {}
+        self._lock = threading.Lock()
+        self.on_add = on_add
+
+    def add(self, path, result):
+        """Appends the result for a path."""
+        line = json.dumps(result).encode("utf-8") + b"\n"
+        with self._lock:
+            self._file.seek(0, 2)
+            self._offsets[path] = self._file.tell()
+            self._file.write(line)
+        if self.on_add is not None:
+            self.on_add(path, result)
+
+    def update(self, results):
+        """Appends every result of a mapping."""
+        for path, result in results.items():
+            self.add(path, result)
+
+    def __getitem__(self, path):
+        with self._lock:
+            offset = self._offsets[path]
+            self._file.seek(offset)
+            line = self._file.readline()
+        return json.loads(line)
+
+    def __iter__(self):
+        return iter(list(self._offsets))
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __contains__(self, path):
+        return path in self._offsets
+
+    def close(self):
+        """Deletes the spool file."""
+        self._file.close()
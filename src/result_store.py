@@ -0,0 +1,84 @@
+import json
+import os
+from datetime import datetime, timezone
+from src.utils import log
+
+RESULT_STORE_VERSION = 1
+
+
+class ResultStore:
+    """Persists analysis results together with the metadata needed to judge freshness.
+
+    The store is a JSON-lines file: the first line holds run metadata (repository,
+    ref, commit SHA and configuration fingerprint) and every following line holds
+    the result for a single file.
+    """
+
+    def __init__(self, path="analysis_results.jsonl"):
+        self.path = path
+
+    def write(self, metadata, results):
+        """Writes metadata and results atomically to the store file.
+
+        `results` is a mapping or an iterable of (path, result) pairs.
+        """
+        header = dict(metadata)
+        header["version"] = RESULT_STORE_VERSION
+        header.setdefault(
+            "generated_at", datetime.now(timezone.utc).isoformat(timespec="seconds")
+        )
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(json.dumps({"meta": header}) + "\n")
+            items = results.items() if hasattr(results, "items") else results
+            for path, result in items:
+                f.write(json.dumps({"path": path, "result": result}) + "\n")
+        os.replace(tmp_path, self.path)
+
+        log(f"Stored analysis results for commit {header.get('commit_sha')}")
+
+    def read_metadata(self):
+        """Returns the metadata header, or None if the store is missing or unreadable."""
+        if not os.path.exists(self.path):
+            return None
+
+        try:
+            with open(self.path, "r") as f:
+                header = json.loads(f.readline() or "{}")
+        except (OSError, ValueError) as e:
+            log(f"Error reading result store {self.path}: {e}")
+            return None
+
+        metadata = header.get("meta")
+        if not metadata or metadata.get("version") != RESULT_STORE_VERSION:
+            return None
+        return metadata
+
+    def iter_results(self):
+        """Yields (path, result) pairs in the order they were written."""
+        with open(self.path, "r") as f:
+            f.readline()  # Skip the metadata header
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    yield record["path"], record["result"]
+
+    def load_results(self):
+        """Loads all stored results into a dictionary keyed by file path."""
+        return dict(self.iter_results())
+
+    def is_fresh(self, commit_sha, fingerprint):
+        """Checks whether stored results match the given commit and configuration.
+
+        A partial run (stopped at its deadline or token budget) is fresh too:
+        analyzing the same commit again would only spend the budget twice.
+        """
+        metadata = self.read_metadata()
+        if not metadata or not commit_sha:
+            return False
+
+        return (
+            metadata.get("commit_sha") == commit_sha
+            and metadata.get("config_fingerprint") == fingerprint
+        )
@@ -0,0 +1,247 @@
+import hashlib
+import json
+import re
+import requests
+from src.github_client import DEFAULT_GITHUB_API_URL
+from src.utils import log
+
+HUNK_HEADER_PATTERN = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,\d+)? @@")
+REVIEW_BODY_LIMIT = 65536
+REVIEW_MARKER = "<!-- github-code-quality:review"
+REVIEW_MARKER_PATTERN = re.compile(
+    r"<!-- github-code-quality:review hash=([0-9a-f]+) -->"
+)
+# Room for the hidden marker line in front of the review body
+REVIEW_MARKER_RESERVE = 64
+SUPERSEDED_BODY = "_Superseded by a newer code quality review._"
+
+
+def map_diff_positions(patch):
+    """Maps new-file line numbers in a unified diff patch to GitHub review positions.
+
+    Position 1 is the line just below the first hunk header; positions keep
+    counting through later hunk headers. Deleted lines have no new-file line
+    and are therefore not mapped.
+    """
+    positions = {}
+    position = 0
+    new_line = None
+
+    for raw_line in (patch or "").splitlines():
+        match = HUNK_HEADER_PATTERN.match(raw_line)
+        if match:
+            if new_line is not None:
+                position += 1
+            new_line = int(match.group(1))
+            continue
+
+        if new_line is None:
+            continue
+
+        position += 1
+        if raw_line.startswith("-") or raw_line.startswith("\\"):
+            continue
+
+        positions[new_line] = position
+        new_line += 1
+
+    return positions
+
+
+class PullRequestReviewer:
+    """Publishes line-anchored findings as a single pull request review.
+
+    Reviews carry a hidden marker with a hash of their content, so a push
+    that leaves the findings unchanged posts nothing. GitHub can neither add
+    inline comments to a submitted review nor dismiss a comment-only one:
+    a review without inline comments is therefore updated in place, and
+    otherwise a new review is submitted and the previous ones are retired
+    (their inline comments deleted, their body replaced by a short note).
+    """
+
+    def __init__(
+        self,
+        repo,
+        pr_number,
+        token,
+        api_url=DEFAULT_GITHUB_API_URL,
+        max_inline_comments=50,
+    ):
+        self.repo = repo
+        self.pr_number = pr_number
+        self.token = token
+        self.api_url = api_url
+        self.max_inline_comments = max_inline_comments
+
+    def _get_headers(self):
+        """Returns the headers for GitHub API requests."""
+        return {
+            "Authorization": f"token {self.token}",
+            "Content-Type": "application/json",
+        }
+
+    def _pull_url(self, suffix):
+        """Returns a URL below the pull request API endpoint."""
+        return f"{self.api_url}/repos/{self.repo}/pulls/{self.pr_number}/{suffix}"
+
+    def _send(self, method, url, payload=None):
+        """Sends a request and raises on an unexpected status."""
+        response = method(url, headers=self._get_headers(), json=payload)
+        if response.status_code not in (200, 201, 204):
+            raise ValueError(
+                f"GitHub API error: {response.status_code} {response.json()}"
+            )
+        return response
+
+    def _list(self, suffix):
+        """Fetches every page of a list endpoint below the pull request."""
+        items, page, per_page = [], 1, 100
+        while True:
+            response = requests.get(
+                self._pull_url(suffix),
+                headers=self._get_headers(),
+                params={"per_page": per_page, "page": page},
+            )
+            if response.status_code != 200:
+                raise ValueError(
+                    f"Failed to list PR {suffix}: {response.status_code} {response.json()}"
+                )
+            batch = response.json()
+            items.extend(batch)
+            if len(batch) < per_page:
+                return items
+            page += 1
+
+    def find_previous_reviews(self):
+        """Finds earlier reviews by this tool through their hidden marker, oldest first."""
+        reviews = []
+        for review in self._list("reviews"):
+            match = REVIEW_MARKER_PATTERN.search(review.get("body") or "")
+            if match:
+                reviews.append({"id": review["id"], "hash": match.group(1)})
+        return reviews
+
+    def _retire(self, review, body=SUPERSEDED_BODY):
+        """Deletes a previous review's inline comments and replaces its body."""
+        for comment in self._list(f"reviews/{review['id']}/comments"):
+            self._send(
+                requests.delete,
+                f"{self.api_url}/repos/{self.repo}/pulls/comments/{comment['id']}",
+            )
+        self._send(
+            requests.put, self._pull_url(f"reviews/{review['id']}"), {"body": body}
+        )
+
+    def get_diff_positions(self):
+        """Fetches the PR's changed files and maps each file's lines to positions."""
+        positions, page, per_page = {}, 1, 100
+
+        while True:
+            response = requests.get(
+                self._pull_url("files"),
+                headers=self._get_headers(),
+                params={"per_page": per_page, "page": page},
+            )
+            if response.status_code != 200:
+                raise ValueError(
+                    f"Failed to list PR files: {response.status_code} {response.json()}"
+                )
+
+            batch = response.json()
+            for changed_file in batch:
+                positions[changed_file["filename"]] = map_diff_positions(
+                    changed_file.get("patch")
+                )
+
+            if len(batch) < per_page:
+                break
+            page += 1
+
+        return positions
+
+    def build_review(self, results, diff_positions):
+        """Splits findings into inline comments and findings outside the diff."""
+        comments_by_anchor = {}
+        outside_diff = []
+
+        for path, result in results.items():
+            file_positions = diff_positions.get(path, {})
+            for finding in result.get("findings") or []:
+                position = file_positions.get(finding["line"])
+                if position is None:
+                    outside_diff.append((path, finding))
+                    continue
+                anchor = (path, position)
+                comments_by_anchor.setdefault(anchor, []).append(finding["message"])
+
+        comments = [
+            {"path": path, "position": position, "body": "\n\n".join(messages)}
+            for (path, position), messages in comments_by_anchor.items()
+        ]
+
+        # Keep the review within a sane size; the rest is rolled into the body
+        limit = self.max_inline_comments
+        for comment in comments[limit:]:
+            for message in comment["body"].split("\n\n"):
+                outside_diff.append(
+                    (comment["path"], {"line": None, "message": message})
+                )
+
+        return comments[:limit], outside_diff
+
+    def build_summary(self, inline_count, outside_diff):
+        """Builds the review body, rolling up findings that have no diff anchor."""
+        lines = [
+            "## Code quality review",
+            f"{inline_count} finding(s) are attached to changed lines.",
+        ]
+
+        if outside_diff:
+            lines.append("")
+            lines.append("### Findings outside the diff")
+            for path, finding in outside_diff:
+                location = f"{path}:{finding['line']}" if finding["line"] else path
+                lines.append(f"- `{location}`: {finding['message']}")
+
+        body = "\n".join(lines)
+        if len(body) > REVIEW_BODY_LIMIT:
+            notice = "\n\n_Summary truncated._"
+            cutoff = REVIEW_BODY_LIMIT - REVIEW_MARKER_RESERVE - len(notice)
+            body = body[:cutoff] + notice
+        return body
+
+    def submit(self, results):
+        """Publishes all findings as one review; returns True on success."""
+        try:
+            diff_positions = self.get_diff_positions()
+            comments, outside_diff = self.build_review(results, diff_positions)
+            previous = self.find_previous_reviews()
+
+            if not comments and not outside_diff and not previous:
+                log("No line-level findings to review.")
+                return True
+
+            body = self.build_summary(len(comments), outside_diff)
+            content = json.dumps([body, comments], sort_keys=True)
+            content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+            if previous and previous[-1]["hash"] == content_hash:
+                log("PR review is already up to date; skipping.")
+                return True
+
+            body = f"{REVIEW_MARKER} hash={content_hash} -->\n{body}"
+            if comments or not previous:
+                payload = {"body": body, "event": "COMMENT", "comments": comments}
+                self._send(requests.post, self._pull_url("reviews"), payload)
+                stale = previous
+                log(f"Submitted PR review with {len(comments)} inline comment(s).")
+            else:
+                self._retire(previous[-1], body)
+                stale = previous[:-1]
+                log("Updated the PR review summary.")
+
+            for review in stale:
+                self._retire(review)
+            return True
+        except Exception as e:
+            log(f"Error submitting PR review: {e}")
+            return False
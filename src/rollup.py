@@ -0,0 +1,131 @@
+import posixpath
+import threading
+from collections import Counter
+from src.report_renderer import combined_score, score_weights
+
+# Running sums kept per scope
+FILES, LINES, DRY_SUM, DRY_LINES, SOLID_SUM, SOLID_LINES = range(6)
+
+
+def scopes_of(path):
+    """Returns the repository ("") and every directory above a file path."""
+    scopes = [""]
+    directory = posixpath.dirname(path)
+    if directory:
+        parts = directory.split("/")
+        scopes.extend("/".join(parts[: index + 1]) for index in range(len(parts)))
+    return scopes
+
+
+class Rollup:
+    """Size-weighted DRY/SOLID scores per directory, package and repository.
+
+    Each file counts with its number of lines (`lines` in its result, else 1).
+    Every scope keeps running sums of its files' line-weighted scores, so
+    adding, replacing or removing one result updates only the scopes above
+    that file, and a scope's score is read off its sums without revisiting
+    any result. Directories with an `__init__.py` are packages; the scope ""
+    is the repository. Combined scores use the configured DRY/SOLID weights.
+    """
+
+    def __init__(self, dry_weight=0.5, solid_weight=0.5):
+        self.dry_weight = dry_weight
+        self.solid_weight = solid_weight
+        self.files = {}  # path -> its contribution to each scope above it
+        self.scopes = {}  # scope -> running sums
+        self.packages = Counter()  # scope -> number of __init__.py files
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config):
+        """Builds a rollup with the weights of the `analysis` config section."""
+        return cls(**score_weights(config))
+
+    @staticmethod
+    def _contribution(result):
+        lines = result.get("lines") or 1
+        contribution = [1, lines, 0, 0, 0, 0]
+        for category, total, weight in (
+            ("dry_score", DRY_SUM, DRY_LINES),
+            ("solid_score", SOLID_SUM, SOLID_LINES),
+        ):
+            score = result.get(category)
+            if isinstance(score, (int, float)):
+                contribution[total] = score * lines
+                contribution[weight] = lines
+        return contribution
+
+    def _apply(self, path, contribution, sign):
+        for scope in scopes_of(path):
+            sums = self.scopes.setdefault(scope, [0] * len(contribution))
+            for index, value in enumerate(contribution):
+                sums[index] += sign * value
+            if not sums[FILES]:
+                del self.scopes[scope]
+
+    def _remove(self, path):
+        contribution = self.files.pop(path, None)
+        if contribution is None:
+            return
+        self._apply(path, contribution, -1)
+        if posixpath.basename(path) == "__init__.py":
+            self.packages[posixpath.dirname(path)] -= 1
+
+    def update(self, path, result):
+        """Adds a file's result, replacing its previous one.
+
+        Architecture results are not files and are ignored; a result with
+        status "removed" takes the file out of the rollup.
+        """
+        if result.get("kind") == "architecture":
+            return
+        with self._lock:
+            self._remove(path)
+            if result.get("status") == "removed":
+                return
+            contribution = self._contribution(result)
+            self.files[path] = contribution
+            self._apply(path, contribution, 1)
+            if posixpath.basename(path) == "__init__.py":
+                self.packages[posixpath.dirname(path)] += 1
+
+    def remove(self, path):
+        """Takes a file out of the rollup."""
+        with self._lock:
+            self._remove(path)
+
+    def _kind(self, scope):
+        if not scope:
+            return "repo"
+        return "package" if self.packages[scope] > 0 else "directory"
+
+    def _summarize(self, scope, sums):
+        dry = sums[DRY_SUM] / sums[DRY_LINES] if sums[DRY_LINES] else None
+        solid = sums[SOLID_SUM] / sums[SOLID_LINES] if sums[SOLID_LINES] else None
+        combined = combined_score(
+            dry,
+            solid,
+            {"dry_weight": self.dry_weight, "solid_weight": self.solid_weight},
+        )
+        return {
+            "kind": self._kind(scope),
+            "files": sums[FILES],
+            "lines": sums[LINES],
+            "dry_score": None if dry is None else round(dry, 2),
+            "solid_score": None if solid is None else round(solid, 2),
+            "score": None if combined is None else round(combined, 2),
+        }
+
+    def score(self, scope=""):
+        """Returns the aggregate of one scope, or None if it holds no files."""
+        with self._lock:
+            sums = self.scopes.get(scope)
+            return None if sums is None else self._summarize(scope, sums)
+
+    def snapshot(self):
+        """Returns the aggregate of every scope, keyed by directory path."""
+        with self._lock:
+            return {
+                scope: self._summarize(scope, sums)
+                for scope, sums in sorted(self.scopes.items())
+            }
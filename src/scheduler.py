@@ -0,0 +1,123 @@
+import time
+from src.metrics import metrics
+from src.utils import log, LogLevel
+
+PRIORITY_SIGNALS = ("changed", "churn", "size", "low_score")
+# Rough source bytes per model token, to estimate the cost of unsent files
+BYTES_PER_TOKEN = 4
+
+
+class WorkScheduler:
+    """Orders files by priority and stops starting work at a deadline or token budget.
+
+    Files are sorted by the configured `priorities`, in order: files changed
+    in the pull request, recent churn (how many of the latest commits touched
+    them), size (in power-of-two buckets, larger first) and low scores in the
+    previous run (files never scored come first). Remaining ties go to the
+    largest file, so that long jobs start early and the run ends with short
+    ones (longest-job-first), which keeps the total wall-clock time low.
+
+    Once `deadline_seconds` have passed since `start`, or the tokens used since
+    `start` plus the estimate for requests in flight reach `token_budget`
+    (so a long-lived AI client can be shared across runs), no further files
+    are started for the rest of the run; they are recorded as skipped with the
+    reason.
+    """
+
+    def __init__(
+        self, priorities=PRIORITY_SIGNALS, deadline_seconds=None, token_budget=None
+    ):
+        unknown = set(priorities) - set(PRIORITY_SIGNALS)
+        if unknown:
+            raise ValueError(f"Unknown scheduler priorities: {sorted(unknown)}")
+        self.priorities = list(priorities)
+        self.deadline_seconds = deadline_seconds
+        self.token_budget = token_budget
+        self.started = None
+        self.start_tokens = 0
+        self.stopped = None
+        self.skipped = []
+
+    @classmethod
+    def from_config(cls, config):
+        """Builds a scheduler from the `scheduler` config section."""
+        settings = config.get("scheduler", {}) or {}
+        return cls(
+            priorities=settings.get("priority", PRIORITY_SIGNALS),
+            deadline_seconds=settings.get("deadline_seconds"),
+            token_budget=settings.get("token_budget"),
+        )
+
+    def order(self, entries, changed=(), churn=None, previous_scores=None):
+        """Returns tree entries in the order they should be analyzed."""
+        churn = churn or {}
+        previous_scores = previous_scores or {}
+
+        def key(entry):
+            path, size = entry["path"], entry.get("size") or 0
+            signals = {
+                "changed": path not in changed,
+                "churn": -churn.get(path, 0),
+                "size": -size.bit_length(),
+                # Files without a previous score have never been analyzed
+                "low_score": previous_scores.get(path, -1),
+            }
+            return [signals[name] for name in self.priorities] + [-size, path]
+
+        return sorted(entries, key=key)
+
+    def start(self, tokens_used=0):
+        """Starts the deadline clock, counting tokens from the client's current total."""
+        self.started = time.monotonic()
+        self.start_tokens = tokens_used
+        self.stopped = None
+        self.skipped = []
+
+    def elapsed(self):
+        """Returns the seconds since `start`."""
+        return time.monotonic() - self.started if self.started is not None else 0.0
+
+    def stop_reason(self, tokens_used=0, tokens_in_flight=0):
+        """Returns "deadline" or "token_budget" once no new work may start, else None.
+
+        Once work has stopped, the reason is kept for the rest of the run, even
+        if cancelled work frees up some of the token budget.
+        """
+        if self.stopped is None:
+            if (
+                self.deadline_seconds is not None
+                and self.elapsed() >= self.deadline_seconds
+            ):
+                self.stopped = "deadline"
+            elif (
+                self.token_budget is not None
+                and tokens_used - self.start_tokens + tokens_in_flight
+                >= self.token_budget
+            ):
+                self.stopped = "token_budget"
+        return self.stopped
+
+    def skip(self, paths, reason):
+        """Records files that will not be analyzed in this run."""
+        paths = list(paths)
+        if not paths:
+            return
+        if not self.skipped:
+            log(
+                f"Stopping analysis ({reason}) after {self.elapsed():.0f}s",
+                LogLevel.WARNING,
+            )
+        metrics.increment("files_analyzed_total", len(paths), outcome=reason)
+        self.skipped.extend((path, reason) for path in paths)
+
+    def admit(self, entries, usage):
+        """Yields entries in order until work must stop, recording the rest as skipped.
+
+        `usage` returns the current (tokens used, tokens in flight).
+        """
+        for index, entry in enumerate(entries):
+            reason = self.stop_reason(*usage())
+            if reason:
+                self.skip((entry["path"] for entry in entries[index:]), reason)
+                return
+            yield entry
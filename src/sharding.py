@@ -0,0 +1,66 @@
+import hashlib
+import heapq
+
+# Fixed cost of a file beyond its size (prompt template, response), in bytes
+REQUEST_OVERHEAD_BYTES = 2000
+
+
+def shard_key(value):
+    """Returns a stable integer hash of a string."""
+    return int(hashlib.sha256(value.encode("utf-8")).hexdigest()[:16], 16)
+
+
+def shard_suffix(index, count):
+    """Returns the file name suffix of a shard's partial artifacts."""
+    return f".shard-{index}-of-{count}"
+
+
+def parse_shard(index, count):
+    """Validates a shard index and count, returning them as ints (or None, None)."""
+    if index in (None, "") and count in (None, ""):
+        return None, None
+
+    index, count = int(index), int(count)
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard {index} of {count}")
+    return index, count
+
+
+def assign_shards(entries, count):
+    """Maps each tree entry's path to a shard index in [0, count).
+
+    Entries with the same blob SHA stay together so identical contents are
+    analyzed once. Groups are placed largest first on the least loaded shard,
+    ordered by path hash among equal sizes, which balances the bytes per
+    shard. The assignment depends only on the entries, so every shard of a
+    run computes the same one independently.
+    """
+    groups = {}
+    for entry in entries:
+        groups.setdefault(entry.get("sha") or entry["path"], []).append(entry)
+
+    def cost(group):
+        return (group[0].get("size") or 0) + REQUEST_OVERHEAD_BYTES
+
+    ordered = sorted(
+        groups.values(),
+        key=lambda group: (
+            -cost(group),
+            shard_key(min(entry["path"] for entry in group)),
+        ),
+    )
+
+    loads = [(0, index) for index in range(count)]
+    assignment = {}
+    for group in ordered:
+        load, index = heapq.heappop(loads)
+        for entry in group:
+            assignment[entry["path"]] = index
+        heapq.heappush(loads, (load + cost(group), index))
+    return assignment
+
+
+def select_shard(entries, index, count):
+    """Returns the entries assigned to one shard, in their original order."""
+    assignment = assign_shards(entries, count)
+    return [entry for entry in entries if assignment[entry["path"]] == index]
@@ -0,0 +1,174 @@
+import ast
+import bisect
+import copy
+import hashlib
+from src.disk_cache import DiskCache
+
+UNIT_CACHE_VERSION = 2
+DEFINITION_TYPES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+FUNCTION_TYPES = (ast.FunctionDef, ast.AsyncFunctionDef)
+
+
+class CodeUnit:
+    """A function, method, class body or module remainder analyzed on its own.
+
+    `lines` are the unit's original line numbers, which need not be contiguous
+    (a module remainder skips the definitions between its statements), and
+    `digest` is the hash of its normalized AST.
+    """
+
+    def __init__(self, name, lines, digest):
+        self.name = name
+        self.lines = lines
+        self.digest = digest
+
+    @property
+    def start(self):
+        return self.lines[0]
+
+    def source(self, source_lines):
+        """Returns the unit's source text."""
+        return "\n".join(source_lines[number - 1] for number in self.lines)
+
+
+def _strip_docstring(node):
+    body = getattr(node, "body", None)
+    if (
+        body
+        and isinstance(body[0], ast.Expr)
+        and isinstance(body[0].value, ast.Constant)
+        and isinstance(body[0].value.value, str)
+    ):
+        node.body = body[1:] or [ast.Pass()]
+    return node
+
+
+def normalized_hash(nodes):
+    """Hashes AST nodes ignoring formatting, comments, positions and docstrings."""
+    digest = hashlib.sha256()
+    for node in nodes:
+        node = copy.deepcopy(node)
+        for child in ast.walk(node):
+            if isinstance(child, (ast.Module,) + DEFINITION_TYPES):
+                _strip_docstring(child)
+        digest.update(ast.dump(node, include_attributes=False).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _node_lines(node):
+    """Returns the line numbers spanned by a statement, including decorators."""
+    first = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+    return list(range(first, node.end_lineno + 1))
+
+
+def _remainder_unit(name, statements):
+    """Builds a unit from statements left over once definitions are split off."""
+    content = [
+        node
+        for node in statements
+        if not (isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant))
+    ]
+    if not content:
+        return None
+
+    lines = sorted({number for node in statements for number in _node_lines(node)})
+    return CodeUnit(name, lines, normalized_hash(statements))
+
+
+def extract_units(code):
+    """Splits Python source into analysis units, or returns None if it does not parse.
+
+    Top-level functions are units; a class contributes one unit per method and
+    one for the rest of its body; remaining module-level statements form the
+    `<module>` unit.
+    """
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        return None
+
+    units, module_statements = [], []
+    for node in tree.body:
+        if isinstance(node, FUNCTION_TYPES):
+            units.append(
+                CodeUnit(node.name, _node_lines(node), normalized_hash([node]))
+            )
+        elif isinstance(node, ast.ClassDef):
+            class_statements = []
+            for child in node.body:
+                if isinstance(child, FUNCTION_TYPES):
+                    name = f"{node.name}.{child.name}"
+                    lines = _node_lines(child)
+                    units.append(CodeUnit(name, lines, normalized_hash([child])))
+                else:
+                    class_statements.append(child)
+
+            # The class shell: its header, bases and non-method body
+            shell = copy.copy(node)
+            shell.body = class_statements or [ast.Pass()]
+            unit = _remainder_unit(node.name, class_statements)
+            if unit is not None:
+                header = list(range(_node_lines(node)[0], node.body[0].lineno))
+                unit.lines = sorted(set(header + unit.lines))
+                unit.digest = normalized_hash([shell])
+                units.append(unit)
+        else:
+            module_statements.append(node)
+
+    unit = _remainder_unit("<module>", module_statements)
+    if unit is not None:
+        units.append(unit)
+
+    units.sort(key=lambda unit: unit.start)
+    return units
+
+
+class UnitCache(DiskCache):
+    """On-disk cache of per-unit analysis results keyed by normalized AST hash.
+
+    Keys also include the configuration fingerprint, so changing the prompt
+    or model settings invalidates every entry. Findings are stored by their
+    position in the unit's `lines`, so they follow the unit when it moves and
+    when code between the lines of a non-contiguous unit changes size.
+    """
+
+    def __init__(
+        self, path=".analysis_cache/units.json", fingerprint="", max_entries=None
+    ):
+        self.fingerprint = fingerprint
+        super().__init__(path, version=UNIT_CACHE_VERSION, max_entries=max_entries)
+
+    def key(self, unit):
+        return hashlib.sha256(
+            f"{self.fingerprint}:{unit.digest}".encode("utf-8")
+        ).hexdigest()
+
+    def get(self, unit):
+        """Returns the cached result for a unit with absolute finding lines, or None."""
+        entry = super().get(self.key(unit))
+        if entry is None:
+            return None
+
+        result = dict(entry)
+        last = len(unit.lines) - 1
+        result["findings"] = [
+            dict(finding, line=unit.lines[min(finding["line"], last)])
+            for finding in entry.get("findings", [])
+        ]
+        return result
+
+    def put(self, unit, result):
+        """Caches a unit result whose findings carry absolute line numbers."""
+        entry = dict(result)
+        # A finding outside the unit's lines is kept at the next line of the unit
+        entry["findings"] = [
+            dict(
+                finding,
+                line=min(
+                    bisect.bisect_left(unit.lines, finding["line"]),
+                    len(unit.lines) - 1,
+                ),
+            )
+            for finding in result.get("findings", [])
+        ]
+        super().put(self.key(unit), entry)
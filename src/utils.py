@@ -1,8 +1,24 @@
+import atexit
+import contextvars
+import json
 import logging
+import logging.handlers
+import queue
 import sys
 import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
 from enum import Enum
-from datetime import datetime
+from datetime import datetime, timezone
+
+# Identifies every record of this process's run
+RUN_ID = os.getenv("ANALYSIS_RUN_ID") or uuid.uuid4().hex[:12]
+
+# Fields (run_id, file, stage, ...) attached to every record logged in this context
+_log_context = contextvars.ContextVar("log_context", default={"run_id": RUN_ID})
 
 
 class LogLevel(Enum):
@@ -15,12 +31,147 @@ class LogLevel(Enum):
     CRITICAL = 50
 
 
+class ContextFilter(logging.Filter):
+    """Attaches the current log context and call-site fields to each record.
+
+    Runs on the calling thread, before the record is queued, so context
+    variables are captured where the message was logged.
+    """
+
+    def filter(self, record):
+        fields = dict(_log_context.get())
+        fields.update(getattr(record, "fields", None) or {})
+        record.fields = fields
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """Limits repeats of the same noisy message, sampling the excess.
+
+    Records at or above min_level sharing a key (the `rate_key` field, or the
+    message text) pass through at most `burst` times per window. After that
+    only every `sample_every`-th repeat is let through, annotated with the
+    number of suppressed records. Windows are kept in the order they started
+    and dropped once expired, so messages with variable text do not pile up
+    in a long-running process.
+    """
+
+    def __init__(
+        self, burst=5, window_seconds=60.0, sample_every=100, min_level=logging.WARNING
+    ):
+        super().__init__()
+        self.burst = burst
+        self.window_seconds = window_seconds
+        self.sample_every = sample_every
+        self.min_level = min_level
+        self._lock = threading.Lock()
+        self._windows = OrderedDict()  # key -> (window start, count, suppressed)
+
+    def filter(self, record):
+        if record.levelno < self.min_level:
+            return True
+
+        fields = getattr(record, "fields", None) or {}
+        key = (record.levelno, fields.get("rate_key") or record.getMessage())
+        now = time.monotonic()
+
+        with self._lock:
+            while self._windows:
+                oldest, (started, _, _) = next(iter(self._windows.items()))
+                if now - started <= self.window_seconds:
+                    break
+                del self._windows[oldest]
+
+            window_start, count, suppressed = self._windows.get(key, (now, 0, 0))
+            count += 1
+            allowed = count <= self.burst or count % self.sample_every == 0
+            if allowed:
+                if suppressed:
+                    record.fields = dict(fields, suppressed=suppressed)
+                suppressed = 0
+            else:
+                suppressed += 1
+            self._windows[key] = (window_start, count, suppressed)
+
+        return allowed
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable formatter that appends structured fields as key=value pairs."""
+
+    def __init__(self):
+        super().__init__(
+            "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+            datefmt="%Y-%m-%d %H:%M:%S",
+        )
+
+    def format(self, record):
+        message = super().format(record)
+        fields = getattr(record, "fields", None) or {}
+        extras = " ".join(
+            f"{key}={value}" for key, value in fields.items() if key != "rate_key"
+        )
+        return f"{message} [{extras}]" if extras else message
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats records as one JSON object per line."""
+
+    def format(self, record):
+        payload = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in (getattr(record, "fields", None) or {}).items():
+            if key != "rate_key":
+                payload.setdefault(key, value)
+        if record.exc_info:
+            payload["exception"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
 class Logger:
-    """Flexible logging utility for the application."""
+    """Flexible logging utility for the application.
+
+    Records are handed to a queue on the calling thread and written by a
+    background listener, so slow console or file I/O never blocks workers.
+    """
 
     def __init__(self, name="github-code-quality", level=LogLevel.INFO):
         self.logger = logging.getLogger(name)
+        self.queue = queue.SimpleQueue()
+        self.listener = None
+        self.output_handlers = []
         self.configure(level)
+        atexit.register(self.stop)
+
+    def _get_formatter(self):
+        """Returns the JSON or text formatter selected by LOG_FORMAT."""
+        if os.getenv("LOG_FORMAT", "text").lower() == "json":
+            return JSONFormatter()
+        return TextFormatter()
+
+    def _start_listener(self):
+        """(Re)starts the background listener with the current output handlers."""
+        self.stop()
+        self.listener = logging.handlers.QueueListener(
+            self.queue, *self.output_handlers
+        )
+        self.listener.start()
+
+    def stop(self):
+        """Stops the background listener, flushing any queued records."""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+    def flush(self):
+        """Waits until all queued records have been written."""
+        self._start_listener()
 
     def configure(self, level=LogLevel.INFO):
         """Configure the logger with handlers and formatting."""
@@ -31,19 +182,19 @@ class Logger:
         # Set level
         self.logger.setLevel(level.value)
 
-        # Create console handler
+        # Create console handler; it is driven by the background listener
         console_handler = logging.StreamHandler(sys.stdout)
         console_handler.setLevel(level.value)
+        console_handler.setFormatter(self._get_formatter())
+        self.output_handlers = [console_handler]
 
-        # Create formatter
-        formatter = logging.Formatter(
-            "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-            datefmt="%Y-%m-%d %H:%M:%S",
-        )
-        console_handler.setFormatter(formatter)
+        # The logger itself only enqueues records
+        queue_handler = logging.handlers.QueueHandler(self.queue)
+        queue_handler.addFilter(ContextFilter())
+        queue_handler.addFilter(RateLimitFilter())
+        self.logger.addHandler(queue_handler)
 
-        # Add handler to logger
-        self.logger.addHandler(console_handler)
+        self._start_listener()
 
     def get_file_handler(self, log_file="app.log"):
         """Create a file handler for logging to a file."""
@@ -54,13 +205,7 @@ class Logger:
         file_path = os.path.join("logs", log_file)
         file_handler = logging.FileHandler(file_path)
         file_handler.setLevel(self.logger.level)
-
-        # Create formatter
-        formatter = logging.Formatter(
-            "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-            datefmt="%Y-%m-%d %H:%M:%S",
-        )
-        file_handler.setFormatter(formatter)
+        file_handler.setFormatter(self._get_formatter())
 
         return file_handler
 
@@ -72,45 +217,66 @@ class Logger:
             log_file = f"app-{timestamp}.log"
 
         file_handler = self.get_file_handler(log_file)
-        self.logger.addHandler(file_handler)
+        self.output_handlers.append(file_handler)
+        self._start_listener()
+
+    def _log(self, level, message, fields):
+        if fields:
+            self.logger.log(level, message, extra={"fields": fields})
+        else:
+            self.logger.log(level, message)
 
-    def debug(self, message):
+    def debug(self, message, **fields):
         """Log a debug message."""
-        self.logger.debug(message)
+        self._log(logging.DEBUG, message, fields)
 
-    def info(self, message):
+    def info(self, message, **fields):
         """Log an info message."""
-        self.logger.info(message)
+        self._log(logging.INFO, message, fields)
 
-    def warning(self, message):
+    def warning(self, message, **fields):
         """Log a warning message."""
-        self.logger.warning(message)
+        self._log(logging.WARNING, message, fields)
 
-    def error(self, message):
+    def error(self, message, **fields):
         """Log an error message."""
-        self.logger.error(message)
+        self._log(logging.ERROR, message, fields)
 
-    def critical(self, message):
+    def critical(self, message, **fields):
         """Log a critical message."""
-        self.logger.critical(message)
+        self._log(logging.CRITICAL, message, fields)
 
 
 # Create a singleton instance for easy access
 _logger = Logger()
 
 
-def log(message, level=LogLevel.INFO):
-    """Simple logging function that uses the singleton logger."""
+def log(message, level=LogLevel.INFO, **fields):
+    """Simple logging function that uses the singleton logger.
+
+    Keyword arguments are attached to the record as structured fields; pass
+    `rate_key` to group repeats of a noisy message for rate limiting.
+    """
     if level == LogLevel.DEBUG:
-        _logger.debug(message)
+        _logger.debug(message, **fields)
     elif level == LogLevel.INFO:
-        _logger.info(message)
+        _logger.info(message, **fields)
     elif level == LogLevel.WARNING:
-        _logger.warning(message)
+        _logger.warning(message, **fields)
     elif level == LogLevel.ERROR:
-        _logger.error(message)
+        _logger.error(message, **fields)
     elif level == LogLevel.CRITICAL:
-        _logger.critical(message)
+        _logger.critical(message, **fields)
+
+
+@contextmanager
+def log_context(**fields):
+    """Attaches fields (e.g. file, stage) to every record logged within the block."""
+    token = _log_context.set({**_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
 
 
 def enable_file_logging(log_file=None):
@@ -121,3 +287,8 @@ def enable_file_logging(log_file=None):
 def set_log_level(level):
     """Set the log level on the singleton logger."""
     _logger.configure(level)
+
+
+def flush_logs():
+    """Block until all queued log records have been written."""
+    _logger.flush()
@@ -0,0 +1,359 @@
+"""Runs the analyzer as a long-lived service driven by GitHub webhooks.
+
+Configuration, the GitHub connection pool, the AI client and the caches stay
+warm in memory between analyses. Point a repository or organization webhook
+(content type application/json, events "push" and "pull_request") at the
+service and set its secret in WEBHOOK_SECRET:
+
+    python -m src.webhook_service --port 8080
+"""
+
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.analyzer import CodeAnalyzer, SharedResources
+from src.config_loader import load_config
+from src.github_client import EnvironmentManager, GitHubClient
+from src.metrics import metrics
+from src.post_comment import FeedbackFormatter, GitHubPRCommenter, post_pr_review
+from src.utils import log, log_context, LogLevel
+
+# GitHub never delivers payloads larger than this
+MAX_PAYLOAD_BYTES = 25 * 1024 * 1024
+PULL_REQUEST_ACTIONS = ("opened", "reopened", "synchronize", "ready_for_review")
+NULL_SHA = "0" * 40
+
+
+def verify_signature(secret, body, signature):
+    """Checks an X-Hub-Signature-256 header against the payload and secret."""
+    if not signature or not signature.startswith("sha256="):
+        return False
+    expected = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature.removeprefix("sha256="))
+
+
+def parse_event(event, payload):
+    """Returns the analysis job for a webhook event, or None if it needs none.
+
+    A job analyzes one head ("owner:branch") of a repository at a commit and
+    reports to the given pull requests; a push does not name its pull
+    requests, so they are looked up when the job runs. Push jobs also carry
+    the branch name, so that a push to a baseline branch refreshes it.
+    """
+    if event == "pull_request":
+        pr = payload.get("pull_request") or {}
+        if payload.get("action") not in PULL_REQUEST_ACTIONS or pr.get("draft"):
+            return None
+        return {
+            "repo": payload["repository"]["full_name"],
+            "head": pr["head"]["label"],
+            "sha": pr["head"]["sha"],
+            "pr_numbers": {pr["number"]},
+        }
+
+    if event == "push":
+        ref = payload.get("ref", "")
+        if (
+            not ref.startswith("refs/heads/")
+            or payload.get("deleted")
+            or payload.get("after", NULL_SHA) == NULL_SHA
+        ):
+            return None
+        repository = payload["repository"]
+        branch = ref.removeprefix("refs/heads/")
+        return {
+            "repo": repository["full_name"],
+            "head": f"{repository['owner']['login']}:{branch}",
+            "sha": payload["after"],
+            "branch": branch,
+            "pr_numbers": set(),
+        }
+
+    return None
+
+
+def merge_jobs(queued, new):
+    """Coalesces a new job into a queued job for the same head."""
+    return dict(new, pr_numbers=queued["pr_numbers"] | new["pr_numbers"])
+
+
+class CoalescingQueue:
+    """Bounded job queue that merges jobs with the same key.
+
+    A job waits `debounce_seconds` after its latest update before it can
+    start, so a burst of pushes runs once, at the last commit. While a job
+    runs, a new job for its key waits until it is `done`, so a head is never
+    analyzed twice at once.
+    """
+
+    def __init__(self, maxsize=100, debounce_seconds=0.0):
+        self.maxsize = maxsize
+        self.debounce_seconds = debounce_seconds
+        self._jobs = OrderedDict()
+        self._running = set()
+        self._closed = False
+        self._condition = threading.Condition()
+
+    def __len__(self):
+        with self._condition:
+            return len(self._jobs)
+
+    def put(self, key, job, merge=merge_jobs):
+        """Queues a job, returning "queued", "coalesced" or "rejected" (full)."""
+        with self._condition:
+            ready_at = time.monotonic() + self.debounce_seconds
+            if key in self._jobs:
+                self._jobs[key] = (merge(self._jobs[key][0], job), ready_at)
+                outcome = "coalesced"
+            elif len(self._jobs) >= self.maxsize:
+                return "rejected"
+            else:
+                self._jobs[key] = (job, ready_at)
+                outcome = "queued"
+            self._condition.notify_all()
+            return outcome
+
+    def get(self):
+        """Blocks until a job may start and returns (key, job), or None once closed."""
+        with self._condition:
+            while not self._closed:
+                now, timeout = time.monotonic(), None
+                for key, (job, ready_at) in self._jobs.items():
+                    if key in self._running:
+                        continue
+                    if ready_at <= now:
+                        del self._jobs[key]
+                        self._running.add(key)
+                        return key, job
+                    wait = ready_at - now
+                    timeout = wait if timeout is None else min(timeout, wait)
+                self._condition.wait(timeout)
+            return None
+
+    def done(self, key):
+        """Marks the job for a key as finished."""
+        with self._condition:
+            self._running.discard(key)
+            self._condition.notify_all()
+
+    def close(self):
+        """Wakes all waiting workers and makes `get` return None."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+
+class WebhookService:
+    """Queues analyses for webhook events and posts their results to pull requests.
+
+    Each (repository, head) is analyzed by one of `workers` threads with the
+    shared resources; its report and result store are written to
+    `<output_dir>/<owner>__<name>/<head>/`.
+    """
+
+    def __init__(
+        self,
+        secret,
+        shared=None,
+        workers=2,
+        queue_size=100,
+        debounce_seconds=5.0,
+        output_dir="analysis_reports",
+    ):
+        self.secret = secret
+        self.shared = shared or SharedResources()
+        self.workers = workers
+        self.output_dir = output_dir
+        self.queue = CoalescingQueue(queue_size, debounce_seconds)
+        self._threads = []
+
+    @classmethod
+    def from_config(cls, config=None):
+        """Builds a service from the `service` config section and WEBHOOK_SECRET."""
+        config = load_config() if config is None else config
+        settings = config.get("service", {}) or {}
+        shared = SharedResources(
+            config, max_cache_entries=settings.get("max_cache_entries", 50000)
+        )
+        return cls(
+            EnvironmentManager.get_required_env_var("WEBHOOK_SECRET"),
+            shared=shared,
+            workers=settings.get("workers", 2),
+            queue_size=settings.get("queue_size", 100),
+            debounce_seconds=settings.get("debounce_seconds", 5.0),
+            output_dir=settings.get("output_dir", "analysis_reports"),
+        )
+
+    def handle(self, event, body, signature):
+        """Handles one webhook delivery, returning (HTTP status, message)."""
+        if not verify_signature(self.secret, body, signature):
+            metrics.increment("webhook_events_total", event=event, outcome="forbidden")
+            return 401, "invalid signature"
+
+        try:
+            job = parse_event(event, json.loads(body))
+        except (ValueError, KeyError, TypeError) as e:
+            metrics.increment("webhook_events_total", event=event, outcome="invalid")
+            return 400, f"invalid payload: {e}"
+
+        if job is None:
+            metrics.increment("webhook_events_total", event=event, outcome="ignored")
+            return 200, "ignored"
+
+        outcome = self.queue.put((job["repo"], job["head"]), job)
+        metrics.increment("webhook_events_total", event=event, outcome=outcome)
+        metrics.set_gauge("webhook_queue_depth", len(self.queue))
+        if outcome == "rejected":
+            log(f"Queue full; dropping {event} for {job['repo']}", LogLevel.WARNING)
+            return 503, "queue full"
+        return 202, outcome
+
+    def _job_dir(self, job):
+        head = re.sub(r"[^\w.-]", "_", job["head"])
+        return os.path.join(self.output_dir, job["repo"].replace("/", "__"), head)
+
+    def process(self, job):
+        """Analyzes a job's commit and posts the report to its pull requests."""
+        output_dir = self._job_dir(job)
+        os.makedirs(output_dir, exist_ok=True)
+        pr_numbers = sorted(job["pr_numbers"])
+        if not pr_numbers:
+            client = GitHubClient(job["repo"], job["sha"], self.shared.session)
+            pr_numbers = client.get_open_pull_requests(job["head"])
+
+        analyzer = CodeAnalyzer(
+            repo=job["repo"],
+            # A pull request's head may live in a fork: analyze it by SHA
+            branch=job.get("branch") or job["sha"],
+            shared=self.shared,
+            output_dir=output_dir,
+            pr_number=pr_numbers[0] if pr_numbers else None,
+        )
+        results = analyzer.analyze_repo()
+        # Other jobs may still use entries this one did not; the caches are
+        # capped at service.max_cache_entries instead of pruned
+        self.shared.save_caches(prune=False)
+        self.shared.export_metrics(self.output_dir)
+
+        body = FeedbackFormatter(self.shared.config).format_all_feedback(
+            results, analyzer.result_handler.rollup.snapshot()
+        )
+        for pr_number in pr_numbers:
+            commenter = GitHubPRCommenter(job["repo"], pr_number, self.shared.config)
+            commenter.post_comment(body)
+            post_pr_review(results, commenter)
+        return results
+
+    def _work(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            key, job = item
+            metrics.set_gauge("webhook_queue_depth", len(self.queue))
+            with log_context(repo=job["repo"], head=job["head"]):
+                try:
+                    with metrics.timer("webhook_job_duration_seconds"):
+                        self.process(job)
+                    metrics.increment("webhook_jobs_total", outcome="succeeded")
+                except Exception as e:
+                    log(f"Analysis of {job['sha']} failed: {e}", LogLevel.ERROR)
+                    metrics.increment("webhook_jobs_total", outcome="failed")
+                finally:
+                    self.queue.done(key)
+
+    def start(self):
+        """Starts the worker threads."""
+        for index in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, name=f"webhook-worker-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """Stops the workers after their current jobs and saves the caches."""
+        self.queue.close()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self.shared.save_caches()
+
+    def make_server(self, host="127.0.0.1", port=8080):
+        """Returns an HTTP server that delivers webhooks to this service."""
+        return ThreadingHTTPServer((host, port), make_handler(self))
+
+
+def make_handler(service):
+    """Returns a request handler class bound to a service."""
+
+    class WebhookHandler(BaseHTTPRequestHandler):
+        def _reply(self, status, message):
+            body = json.dumps({"message": message}).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path != "/healthz":
+                self._reply(404, "not found")
+                return
+            self._reply(200, f"{len(service.queue)} job(s) queued")
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > MAX_PAYLOAD_BYTES:
+                self._reply(413, "payload too large")
+                return
+            body = self.rfile.read(length)
+            self._reply(
+                *service.handle(
+                    self.headers.get("X-GitHub-Event", ""),
+                    body,
+                    self.headers.get("X-Hub-Signature-256"),
+                )
+            )
+
+        def log_message(self, format, *args):
+            log(f"{self.address_string()} {format % args}", LogLevel.DEBUG)
+
+    return WebhookHandler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", help="Address to listen on")
+    parser.add_argument("--port", type=int, help="Port to listen on")
+    args = parser.parse_args(argv)
+
+    EnvironmentManager.load_environment()
+    service = WebhookService.from_config()
+    settings = service.shared.config.get("service", {}) or {}
+    server = service.make_server(
+        args.host or settings.get("host", "127.0.0.1"),
+        args.port or settings.get("port", 8080),
+    )
+    service.start()
+    log(f"Listening for webhooks on {server.server_address[0]}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,8 @@
 import pytest
-from src.ai_client import AIClient, AIClientConfig, PromptGenerator
+from unittest.mock import MagicMock, patch
+from openai import RateLimitError
+from src.ai_client import AIClient, AIClientConfig, AnalysisError, PromptGenerator
+from src.resilience import CircuitBreaker, RetryPolicy
 
 
 # This fixture sets the OPENAI_API_KEY before each test runs.
@@ -46,3 +49,74 @@ def test_prompt_generator():
     assert "SOLID Analysis" in prompt
     assert code in prompt
     assert "Response Format" in prompt
+
+
+def test_analyze_code_raises_analysis_error_on_fatal_error():
+    """Test that non-retryable errors surface as AnalysisError, not as analysis text."""
+    ai_client = AIClient(limiter=MagicMock())
+    error = Exception("invalid api key")
+    error.status_code = 401
+
+    with patch.object(
+        ai_client.client.chat.completions, "create", side_effect=error
+    ) as create:
+        with pytest.raises(AnalysisError) as excinfo:
+            ai_client.analyze_code("x = 1")
+
+    assert excinfo.value.reason == "fatal"
+    create.assert_called_once()
+
+
+def test_analyze_code_retries_rate_limit_through_limiter():
+    """Test that a 429 is reported to the limiter and the request retried."""
+    ai_client = AIClient(limiter=MagicMock())
+    response = MagicMock(status_code=429, headers={"retry-after": "0"})
+    completion = MagicMock()
+    completion.choices[0].message.content = "analysis"
+    completion.usage = None
+
+    with patch.object(
+        ai_client.client.chat.completions,
+        "create",
+        side_effect=[
+            RateLimitError("slow down", response=response, body=None),
+            completion,
+        ],
+    ):
+        assert ai_client.analyze_code("x = 1") == "analysis"
+
+    ai_client.limiter.on_rate_limited.assert_called_once_with(0.0)
+    ai_client.limiter.on_success.assert_called_once()
+
+
+def test_rate_limited_probe_does_not_hold_the_circuit_open():
+    """Test that a half-open probe answered with a 429 lets the next call probe again."""
+    ai_client = AIClient(limiter=MagicMock())
+    ai_client.retry_policy = RetryPolicy(max_attempts=1)
+    ai_client.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    server_error = Exception("internal error")
+    server_error.status_code = 500
+    response = MagicMock(status_code=429, headers={"retry-after": "0"})
+    completion = MagicMock()
+    completion.choices[0].message.content = "analysis"
+    completion.usage = None
+
+    with patch.object(
+        ai_client.client.chat.completions,
+        "create",
+        side_effect=[
+            server_error,
+            RateLimitError("slow down", response=response, body=None),
+            completion,
+            completion,
+        ],
+    ) as create:
+        for reason in ("transient", "rate_limited"):
+            with pytest.raises(AnalysisError) as excinfo:
+                ai_client.analyze_code("x = 1")
+            assert excinfo.value.reason == reason
+        assert ai_client.analyze_code("x = 1") == "analysis"
+        assert ai_client.analyze_code("x = 1") == "analysis"
+
+    assert create.call_count == 4
+    assert ai_client.breaker.state == CircuitBreaker.CLOSED
@@ -1,6 +1,13 @@
 import sys
+import time
 from unittest.mock import patch, MagicMock
-from src.analyzer import AnalysisResultHandler, CodeAnalyzer, analyze_repo
+from src.ai_client import AnalysisError
+from src.analyzer import AnalysisResultHandler, CodeAnalyzer, analyze_repo, is_trivial
+from src.baseline import Baseline
+from src.config_loader import config_fingerprint
+from src.merge_shards import merge_partials
+from src.metrics import metrics
+from src.result_spool import ResultSpool
 
 
 def test_analysis_result_handler_extract_scores():
@@ -54,6 +61,47 @@ def test_analysis_result_handler_format_result():
         assert result["full_analysis"] == analysis
 
 
+def test_analysis_result_handler_format_failure():
+    """Test that failed analyses are marked as failed rather than unscored."""
+    with patch("src.analyzer.load_config") as mock_load_config:
+        mock_load_config.return_value = {}
+
+        handler = AnalysisResultHandler()
+        result = handler.format_failure(
+            "test_file.py", AnalysisError("Error analyzing code: boom", "transient")
+        )
+
+        assert result["status"] == "failed"
+        assert result["error_reason"] == "transient"
+        assert result["full_analysis"] == ""
+        assert result["findings"] == []
+
+
+def test_analysis_result_handler_extract_findings():
+    """Test extracting line-anchored findings from analysis text."""
+    with patch("src.analyzer.load_config") as mock_load_config:
+        mock_load_config.return_value = {}
+
+        handler = AnalysisResultHandler()
+
+        analysis = (
+            "### DRY Analysis\n**Score: 8/10**\nFine.\n\n"
+            "### SOLID Analysis\n**Score: 7/10**\nFine.\n\n"
+            "### Findings\n"
+            "- Line 12: Duplicate request handling\n"
+            "- **Line 30-34**: Class has two responsibilities\n"
+            "- Not anchored to a line\n"
+        )
+
+        findings = handler.extract_findings(analysis)
+
+        assert findings == [
+            {"line": 12, "message": "Duplicate request handling"},
+            {"line": 30, "message": "Class has two responsibilities"},
+        ]
+        assert handler.extract_findings("### DRY Analysis\nNo findings") == []
+
+
 @patch("builtins.open")
 @patch("src.analyzer.load_config")
 def test_analysis_result_handler_save_results(mock_load_config, mock_open):
@@ -179,7 +227,9 @@ def test_code_analyzer_analyze_repo(
 
     # Set up GitHub client mock
     mock_github_instance = MagicMock()
-    mock_github_instance.get_files.return_value = [("test_file.py", "# Sample code")]
+    mock_github_instance.iter_files.return_value = [
+        ("test_file.py", "def sample():\n    return 1\n")
+    ]
     mock_github_client.return_value = mock_github_instance
 
     # Set up AI client mock
@@ -202,6 +252,7 @@ def test_code_analyzer_analyze_repo(
         "full_analysis": "Sample analysis",
     }
     mock_handler_instance.save_results.side_effect = lambda x: x  # Return input
+    mock_handler_instance.create_spool.side_effect = ResultSpool
     mock_result_handler.return_value = mock_handler_instance
 
     # Create an analyzer and analyze the repo
@@ -226,3 +277,509 @@ def test_analyze_repo_function(mock_code_analyzer):
     # Verify the result
     assert result == {"test_file.py": "result"}
     mock_instance.analyze_repo.assert_called_once()
+
+
+@patch("src.analyzer.GitHubClient")
+@patch("src.analyzer.AIClient")
+@patch("src.analyzer.AnalysisResultHandler")
+@patch("src.analyzer.load_config")
+@patch("src.analyzer.os.getenv")
+def test_code_analyzer_cascade_escalates_low_scores(
+    mock_getenv,
+    mock_load_config,
+    mock_result_handler,
+    mock_ai_client,
+    mock_github_client,
+):
+    """Test that cascade routing escalates only files below the severity threshold."""
+    mock_load_config.return_value = {
+        "models": {"routing": "cascade"},
+        "analysis": {"dry": {"severity_threshold": 0.7}},
+    }
+    mock_getenv.side_effect = lambda key, default=None: {
+        "ENABLE_ANALYSIS": "true",
+        "REPO": "test/repo",
+    }.get(key, default)
+    mock_result_handler.return_value = AnalysisResultHandler()
+
+    def analysis(dry, solid):
+        return (
+            f"### DRY Analysis\n**Score: {dry}/10**\nText.\n\n"
+            f"### SOLID Analysis\n**Score: {solid}/10**\nText."
+        )
+
+    analyzer = CodeAnalyzer()
+    analyzer.ai_client.analyze_code.side_effect = [analysis(9, 8)]
+    good = analyzer.analyze_file("good.py", "x = 1")
+
+    analyzer.ai_client.analyze_code.side_effect = [analysis(4, 8), analysis(3, 7)]
+    bad = analyzer.analyze_file("bad.py", "x = 1")
+
+    assert good["tier"] == "triage" and good["dry_score"] == 9
+    assert bad["tier"] == "escalation" and bad["dry_score"] == 3
+    assert analyzer.ai_client.analyze_code.call_args.kwargs["tier"] == "escalation"
+
+
+@patch("src.analyzer.GitHubClient")
+@patch("src.analyzer.AIClient")
+@patch("src.analyzer.load_config")
+@patch("src.analyzer.os.getenv")
+def test_code_analyzer_reuses_unchanged_units(
+    mock_getenv, mock_load_config, mock_ai_client, mock_github_client, tmp_path
+):
+    """Test that only changed units are re-analyzed and scores are aggregated."""
+    mock_load_config.return_value = {
+        "units": {
+            "enabled": True,
+            "min_file_lines": 1,
+            "cache_file": str(tmp_path / "units.json"),
+        }
+    }
+    mock_getenv.side_effect = lambda key, default=None: {
+        "ENABLE_ANALYSIS": "true",
+        "REPO": "test/repo",
+    }.get(key, default)
+    code = "def a():\n    return 1\n\n\ndef b():\n    return 2\n"
+
+    analyzer = CodeAnalyzer()
+    analyzer.result_handler = AnalysisResultHandler(
+        output_file=str(tmp_path / "analysis_feedback.md")
+    )
+    analyzer.ai_client.analyze_code.side_effect = [
+        "### DRY Analysis\n**Score: 8/10**\nA.\n\n### SOLID Analysis\n**Score: 6/10**\nA.",
+        "### DRY Analysis\n**Score: 4/10**\nB.\n\n### SOLID Analysis\n**Score: 6/10**\n"
+        "B.\n\n### Findings\n- Line 6: Magic number",
+    ]
+    first = analyzer.analyze_file("mod.py", code)
+
+    analyzer.ai_client.analyze_code.side_effect = [
+        "### DRY Analysis\n**Score: 10/10**\nB.\n\n### SOLID Analysis\n**Score: 8/10**\nB."
+    ]
+    second = analyzer.analyze_file("mod.py", code.replace("return 2", "return 3"))
+
+    assert (first["dry_score"], first["solid_score"]) == (6, 6)
+    assert first["findings"] == [{"line": 6, "message": "Magic number"}]
+    assert analyzer.ai_client.analyze_code.call_count == 3
+    assert [unit["cached"] for unit in second["units"]] == [True, False]
+    assert second["dry_score"] == 9
+
+
+def test_is_trivial():
+    """Test that only empty and boilerplate files count as trivial."""
+    assert is_trivial("")
+    assert is_trivial("# comment only\n")
+    assert is_trivial(
+        '"""Package."""\nfrom .core import Engine\n__all__ = ["Engine"]\n'
+    )
+    assert not is_trivial("def f():\n    return 1\n")
+    assert not is_trivial("LIMIT = 10\n")
+
+
+@patch("src.analyzer.GitHubClient")
+@patch("src.analyzer.AIClient")
+@patch("src.analyzer.load_config")
+@patch("src.analyzer.os.getenv")
+def test_code_analyzer_deduplicates_and_skips_trivial_files(
+    mock_getenv, mock_load_config, mock_ai_client, mock_github_client, tmp_path
+):
+    """Test one model call per unique content and none for trivial files."""
+    mock_load_config.return_value = {}
+    mock_getenv.side_effect = lambda key, default=None: {
+        "ENABLE_ANALYSIS": "true",
+        "REPO": "test/repo",
+    }.get(key, default)
+    code = "def f():\n    return 1\n"
+    mock_github_client.return_value.branch = "main"
+    mock_github_client.return_value.get_commit_sha.return_value = "abc123"
+    mock_github_client.return_value.iter_files.return_value = [
+        ("a/util.py", code),
+        ("vendor/util.py", code),
+        ("a/__init__.py", ""),
+    ]
+
+    analyzer = CodeAnalyzer()
+    analyzer.result_handler = AnalysisResultHandler(
+        output_file=str(tmp_path / "analysis_feedback.md")
+    )
+    analyzer.ai_client.analyze_code.return_value = "### DRY Analysis\n**Score: 8/10**\nA.\n\n### SOLID Analysis\n**Score: 6/10**\nA."
+    results = analyzer.analyze_repo()
+
+    analyzer.ai_client.analyze_code.assert_called_once()
+    assert results["vendor/util.py"]["duplicate_of"] == "a/util.py"
+    assert results["vendor/util.py"]["dry_score"] == 8
+    assert results["a/__init__.py"]["status"] == "skipped"
+
+
+@patch("src.analyzer.GitHubClient")
+@patch("src.analyzer.AIClient")
+@patch("src.analyzer.load_config")
+@patch("src.analyzer.os.getenv")
+def test_code_analyzer_streams_within_byte_budget(
+    mock_getenv, mock_load_config, mock_ai_client, mock_github_client, tmp_path
+):
+    """Test that files are pulled only as the in-flight byte budget allows."""
+    mock_load_config.return_value = {"concurrency": {"max_in_flight_bytes": 1}}
+    mock_getenv.side_effect = lambda key, default=None: {
+        "ENABLE_ANALYSIS": "true",
+        "REPO": "test/repo",
+    }.get(key, default)
+    active, peak = [], []
+
+    def iter_files(**kwargs):
+        for index in range(3):
+            code = f"def f{index}():\n    return {index}\n"
+            yield f"pkg{index}/mod.py", code
+            yield f"copy{index}/mod.py", code
+
+    mock_github_client.return_value.branch = "main"
+    mock_github_client.return_value.get_commit_sha.return_value = "abc123"
+    mock_github_client.return_value.iter_files.side_effect = iter_files
+
+    analyzer = CodeAnalyzer()
+    analyzer.result_handler = AnalysisResultHandler(
+        output_file=str(tmp_path / "analysis_feedback.md")
+    )
+
+    def analyze_code(code, **kwargs):
+        active.append(code)
+        peak.append(len(active))
+        time.sleep(0.01)
+        active.remove(code)
+        return "### DRY Analysis\n**Score: 8/10**\nA.\n\n### SOLID Analysis\n**Score: 6/10**\nA."
+
+    analyzer.ai_client.analyze_code.side_effect = analyze_code
+    results = analyzer.analyze_repo()
+
+    # A budget smaller than any file allows one file in flight at a time
+    assert peak == [1, 1, 1]
+    assert len(results) == 6
+    assert results["copy2/mod.py"]["duplicate_of"] == "pkg2/mod.py"
+    assert results["pkg1/mod.py"]["dry_score"] == 8
+
+
+@patch("src.analyzer.GitHubClient")
+@patch("src.analyzer.AIClient")
+@patch("src.analyzer.load_config")
+@patch("src.analyzer.os.getenv")
+def test_code_analyzer_skips_copies_of_files_skipped_by_token_budget(
+    mock_getenv, mock_load_config, mock_ai_client, mock_github_client, tmp_path
+):
+    """Test that a copy of a file skipped when work stopped is skipped too."""
+    mock_load_config.return_value = {"scheduler": {"token_budget": 10}}
+    mock_getenv.side_effect = lambda key, default=None: {
+        "ENABLE_ANALYSIS": "true",
+        "REPO": "test/repo",
+    }.get(key, default)
+    code = "def f():\n    return 1\n" * 3
+    other = "def g():\n    return 2\n" * 3
+    github = mock_github_client.return_value
+    github.branch = "main"
+    github.get_commit_sha.return_value = "abc123"
+    github.iter_files.return_value = [
+        ("a.py", code),
+        ("e.py", other),
+        ("copy/e.py", other),
+    ]
+
+    analyzer = CodeAnalyzer()
+    analyzer.ai_client.tokens_used = 0
+    analyzer.ai_client.analyze_code.return_value = (
+        "### DRY Analysis\n**Score: 8/10**\nA."
+    )
+    analyzer.result_handler = AnalysisResultHandler(
+        output_file=str(tmp_path / "analysis_feedback.md")
+    )
+    results = analyzer.analyze_repo()
+
+    # a.py in flight uses up the budget, so e.py and its copy never start
+    assert results["e.py"]["reason"] == "token_budget"
+    assert results["copy/e.py"]["reason"] == "token_budget"
+
+
+@patch("src.analyzer.GitHubClient")
+@patch("src.analyzer.AIClient")
+@patch("src.analyzer.load_config")
+@patch("src.analyzer.os.getenv")
+def test_code_analyzer_reports_files_skipped_by_token_budget(
+    mock_getenv, mock_load_config, mock_ai_client, mock_github_client, tmp_path
+):
+    """Test that an exhausted token budget skips files without fetching them."""
+    mock_load_config.return_value = {"scheduler": {"token_budget": 0}}
+    mock_getenv.side_effect = lambda key, default=None: {
+        "ENABLE_ANALYSIS": "true",
+        "REPO": "test/repo",
+    }.get(key, default)
+    github = mock_github_client.return_value
+    github.branch = "main"
+    github.get_commit_sha.return_value = "abc123"
+    github.get_churn.return_value = {}
+    github.iter_entries.return_value = [
+        {"path": "a.py", "size": 10},
+        {"path": "b.py", "size": 20},
+    ]
+    github.iter_files.side_effect = lambda entries: ((e["path"], "x") for e in entries)
+
+    analyzer = CodeAnalyzer()
+    analyzer.ai_client.tokens_used = 0
+    analyzer.result_handler = AnalysisResultHandler(
+        output_file=str(tmp_path / "analysis_feedback.md")
+    )
+    results = analyzer.analyze_repo()
+
+    analyzer.ai_client.analyze_code.assert_not_called()
+    assert results["a.py"] == {
+        "status": "skipped",
+        "reason": "token_budget",
+        "dry_score": "N/A",
+        "solid_score": "N/A",
+        "full_analysis": "",
+        "findings": [],
+    }
+    assert results["b.py"]["reason"] == "token_budget"
+    assert analyzer.result_handler.store.read_metadata()["complete"] is False
+
+
+@patch("src.analyzer.GitHubClient")
+@patch("src.analyzer.AIClient")
+@patch("src.analyzer.load_config")
+@patch("src.analyzer.os.getenv")
+def test_code_analyzer_analyzes_only_its_shard(
+    mock_getenv, mock_load_config, mock_ai_client, mock_github_client, tmp_path
+):
+    """Test that a shard fetches only its entries and writes a partial store."""
+    mock_load_config.return_value = {"scheduler": {"priority": ["size"]}}
+    mock_getenv.side_effect = lambda key, default=None: {
+        "ENABLE_ANALYSIS": "true",
+        "REPO": "test/repo",
+    }.get(key, default)
+    github = mock_github_client.return_value
+    github.branch = "main"
+    github.get_commit_sha.return_value = "abc123"
+    github.iter_entries.return_value = [
+        {"path": "a.py", "sha": "1", "size": 100},
+        {"path": "b.py", "sha": "2", "size": 90},
+    ]
+    github.iter_files.side_effect = lambda entries: (
+        (e["path"], f"def {e['path'][0]}():\n    return 1\n") for e in entries
+    )
+
+    analyzer = CodeAnalyzer(shard_index=1, shard_count=2)
+    assert analyzer.result_handler.store.path == "analysis_results.shard-1-of-2.jsonl"
+    analyzer.result_handler = AnalysisResultHandler(
+        output_file=str(tmp_path / "analysis_feedback.md")
+    )
+    analyzer.ai_client.analyze_code.return_value = (
+        "### DRY Analysis\n**Score: 8/10**\nA."
+    )
+    results = analyzer.analyze_repo()
+
+    assert list(results) == ["b.py"]
+    metadata = analyzer.result_handler.store.read_metadata()
+    assert metadata["shard"] == {"index": 1, "count": 2}
+
+
+@patch("src.analyzer.GitHubClient")
+@patch("src.analyzer.AIClient")
+@patch("src.analyzer.load_config")
+@patch("src.analyzer.os.getenv")
+def test_code_analyzer_compares_pull_request_with_baseline(
+    mock_getenv, mock_load_config, mock_ai_client, mock_github_client, tmp_path
+):
+    """Test that a PR run analyzes only changed blobs and a push refreshes the baseline."""
+    config = {
+        "baseline": {
+            "enabled": True,
+            "results_file": str(tmp_path / "baseline.jsonl"),
+        }
+    }
+    mock_load_config.return_value = config
+    mock_getenv.side_effect = lambda key, default=None: {
+        "ENABLE_ANALYSIS": "true",
+        "REPO": "test/repo",
+    }.get(key, default)
+    github = mock_github_client.return_value
+    github.branch = "main"
+    github.get_commit_sha.return_value = "base1"
+    github.get_churn.return_value = {}
+    github.get_pull_request_files.return_value = set()
+    github.iter_entries.return_value = [
+        {"path": "a.py", "sha": "1", "size": 10},
+        {"path": "b.py", "sha": "2", "size": 10},
+    ]
+    github.iter_files.side_effect = lambda entries: (
+        (e["path"], f"def {e['path'][0]}():\n    return 1\n") for e in entries
+    )
+
+    def run(pr_number=None):
+        analyzer = CodeAnalyzer(pr_number=pr_number)
+        analyzer.result_handler = AnalysisResultHandler(
+            output_file=str(tmp_path / "analysis_feedback.md")
+        )
+        return analyzer, analyzer.analyze_repo()
+
+    mock_ai_client.return_value.analyze_code.return_value = (
+        "### DRY Analysis\n**Score: 8/10**\nA.\n### SOLID Analysis\n**Score: 8/10**\nB."
+    )
+
+    # A push to main analyzes everything and stores the baseline
+    analyzer, _ = run()
+    assert analyzer.ai_client.analyze_code.call_count == 2
+    analyzer.ai_client.analyze_code.reset_mock()
+
+    # The pull request only changes b.py; a.py is reused from the baseline
+    github.iter_entries.return_value = [
+        {"path": "a.py", "sha": "1", "size": 10},
+        {"path": "b.py", "sha": "3", "size": 10},
+    ]
+    github.get_commit_sha.return_value = "head1"
+    github.get_merge_base.return_value = "base1"
+    analyzer, results = run(pr_number=7)
+
+    assert analyzer.ai_client.analyze_code.call_count == 1
+    assert results["a.py"]["baseline"]["status"] == "unchanged"
+    assert results["b.py"]["baseline"] == {
+        "status": "changed",
+        "commit": "base1",
+        "dry_score": 8,
+        "solid_score": 8,
+    }
+    metadata = analyzer.result_handler.store.read_metadata()
+    assert metadata["baseline_commit_sha"] == "base1"
+    assert metadata["rollup"][""]["files"] == 2
+    assert metadata["rollup"][""]["lines"] == 4
+
+
+@patch("src.analyzer.GitHubClient")
+@patch("src.analyzer.AIClient")
+@patch("src.analyzer.load_config")
+@patch("src.analyzer.os.getenv")
+def test_sharded_pull_request_reports_only_deleted_files_removed(
+    mock_getenv, mock_load_config, mock_ai_client, mock_github_client, tmp_path
+):
+    """Test that shards compared with the baseline do not report each other's files removed."""
+    config = {
+        "baseline": {
+            "enabled": True,
+            "results_file": str(tmp_path / "baseline.jsonl"),
+        }
+    }
+    mock_load_config.return_value = config
+    mock_getenv.side_effect = lambda key, default=None: {
+        "ENABLE_ANALYSIS": "true",
+        "REPO": "test/repo",
+    }.get(key, default)
+    paths = [f"f{index}.py" for index in range(4)]
+    scored = {"dry_score": 8, "solid_score": 8, "full_analysis": "", "findings": []}
+    Baseline(str(tmp_path / "baseline.jsonl")).save(
+        {
+            "repo": "test/repo",
+            "commit_sha": "base1",
+            "config_fingerprint": config_fingerprint(config),
+        },
+        {path: scored for path in paths + ["old.py"]},
+        {path: "1" for path in paths + ["old.py"]},
+    )
+
+    github = mock_github_client.return_value
+    github.branch = "feature"
+    github.get_commit_sha.return_value = "head1"
+    github.get_merge_base.return_value = "base1"
+    github.get_churn.return_value = {}
+    github.get_pull_request_files.return_value = set()
+    github.iter_entries.return_value = [
+        {"path": path, "sha": "1", "size": 10} for path in paths
+    ]
+    github.iter_files.side_effect = lambda entries: iter(())
+
+    for index in range(2):
+        analyzer = CodeAnalyzer(
+            shard_index=index, shard_count=2, pr_number=7, output_dir=str(tmp_path)
+        )
+        analyzer.analyze_repo()
+
+    results = merge_partials(
+        [str(tmp_path / f"analysis_results.shard-{i}-of-2.jsonl") for i in range(2)],
+        output_file=str(tmp_path / "analysis_feedback.md"),
+    )
+
+    assert {path: results[path]["baseline"]["status"] for path in results} == {
+        "f0.py": "unchanged",
+        "f1.py": "unchanged",
+        "f2.py": "unchanged",
+        "f3.py": "unchanged",
+        "old.py": "removed",
+    }
+
+
+@patch("src.analyzer.GitHubClient")
+@patch("src.analyzer.AIClient")
+@patch("src.analyzer.load_config")
+@patch("src.analyzer.os.getenv")
+def test_architecture_summarizes_each_unique_content_once(
+    mock_getenv, mock_load_config, mock_ai_client, mock_github_client, tmp_path
+):
+    """Test that copies reuse the original's summary and trivial files are not summarized."""
+    mock_load_config.return_value = {
+        "architecture": {
+            "enabled": True,
+            "cache_file": str(tmp_path / "summaries.json"),
+        }
+    }
+    mock_getenv.side_effect = lambda key, default=None: {
+        "ENABLE_ANALYSIS": "true",
+        "REPO": "test/repo",
+    }.get(key, default)
+    code = "def f():\n    return 1\n"
+    github = mock_github_client.return_value
+    github.branch = "main"
+    github.get_commit_sha.return_value = "abc123"
+    github.iter_files.return_value = [
+        ("a/util.py", code),
+        ("vendor/util.py", code),
+        ("a/__init__.py", "from a.util import f\n"),
+    ]
+    ai_client = mock_ai_client.return_value
+    ai_client.analyze_code.return_value = "### DRY Analysis\n**Score: 8/10**\nA."
+    ai_client.summarize_file.return_value = "Defines f."
+    ai_client.analyze_architecture.return_value = (
+        "### DRY Analysis\n**Score: 7/10**\nA."
+    )
+
+    analyzer = CodeAnalyzer()
+    analyzer.result_handler = AnalysisResultHandler(
+        output_file=str(tmp_path / "analysis_feedback.md")
+    )
+    analyzer.analyze_repo()
+
+    ai_client.summarize_file.assert_called_once()
+    scope, summaries, graph = ai_client.analyze_architecture.call_args.args
+    assert summaries == {
+        "a/__init__.py": "(trivial file)",
+        "a/util.py": "Defines f.",
+        "vendor/util.py": "Defines f.",
+    }
+    assert graph["a/__init__.py"] == ["a/util.py"]
+
+
+def test_result_handler_labels_quality_score_by_repo(tmp_path):
+    """Test that repositories sharing a process export separate score gauges."""
+    metrics.reset()
+    for repo, score in (("org/a", 8), ("org/b", 4)):
+        output_dir = tmp_path / repo.replace("/", "__")
+        output_dir.mkdir()
+        handler = AnalysisResultHandler(
+            output_file=str(output_dir / "analysis_feedback.md")
+        )
+        handler.set_metadata({"repo": repo, "commit_sha": "abc"})
+        results = handler.create_spool()
+        results.add(
+            "app.py", {"dry_score": score, "solid_score": score, "full_analysis": ""}
+        )
+        handler.save_results(results)
+
+    gauges = {
+        gauge["labels"]["repo"]: gauge["value"]
+        for gauge in metrics.snapshot()["gauges"]
+        if gauge["name"] == "quality_score" and gauge["labels"]["kind"] == "repo"
+    }
+    assert gauges == {"org/a": 8, "org/b": 4}
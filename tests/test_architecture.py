@@ -0,0 +1,75 @@
+from unittest.mock import MagicMock
+from src.analyzer import AnalysisResultHandler
+from src.architecture import ArchitectureAnalyzer, build_import_graph
+
+FILES = [
+    ("pkg/__init__.py", "from .core import Engine\n"),
+    ("pkg/core.py", "import os\nfrom pkg import util\n"),
+    ("pkg/util.py", "from . import core\nfrom .. import setup\n"),
+    ("setup.py", "import requests\n"),
+    ("README.md", "# Readme\n"),
+]
+
+ANALYSIS = (
+    "### DRY Analysis\n**Score: 8/10**\nFine.\n\n"
+    "### SOLID Analysis\n**Score: 4/10**\nCore depends on concrete util."
+)
+
+
+def make_analyzer(tmp_path, **kwargs):
+    ai_client = MagicMock()
+    ai_client.summarize_file.side_effect = (
+        lambda path, code, words: f"Summary of {path}"
+    )
+    ai_client.analyze_architecture.return_value = ANALYSIS
+    analyzer = ArchitectureAnalyzer(
+        ai_client,
+        AnalysisResultHandler(output_file=str(tmp_path / "analysis_feedback.md")),
+        cache_file=str(tmp_path / "summaries.json"),
+        **kwargs,
+    )
+    return analyzer, ai_client
+
+
+def test_build_import_graph():
+    """Test that absolute and relative imports resolve to repository files only."""
+    graph = build_import_graph(FILES)
+
+    assert graph == {
+        "pkg/__init__.py": ["pkg/core.py"],
+        "pkg/core.py": ["pkg/__init__.py", "pkg/util.py"],
+        "pkg/util.py": ["pkg/__init__.py", "pkg/core.py", "setup.py"],
+        "setup.py": [],
+    }
+
+
+def test_architecture_analysis_reuses_cached_summaries(tmp_path):
+    """Test that only changed files are summarized again on the next run."""
+    analyzer, ai_client = make_analyzer(tmp_path)
+
+    results = analyzer.analyze(FILES)
+    analyzer.save_cache()
+
+    assert list(results) == ["<architecture>"]
+    assert results["<architecture>"]["solid_score"] == 4
+    assert results["<architecture>"]["kind"] == "architecture"
+    assert ai_client.summarize_file.call_count == 4
+
+    analyzer, ai_client = make_analyzer(tmp_path)
+    changed = [(p, c + "x = 1\n" if p == "setup.py" else c) for p, c in FILES]
+    analyzer.analyze(changed)
+
+    ai_client.summarize_file.assert_called_once()
+    scope, summaries, graph = ai_client.analyze_architecture.call_args.args
+    assert summaries["pkg/core.py"] == "Summary of pkg/core.py"
+    assert graph["pkg/core.py"] == ["pkg/__init__.py", "pkg/util.py"]
+
+
+def test_architecture_analysis_splits_large_repos_by_package(tmp_path):
+    """Test that auto scope analyzes packages separately when summaries are large."""
+    analyzer, ai_client = make_analyzer(tmp_path, max_prompt_chars=10)
+
+    results = analyzer.analyze(FILES)
+
+    assert set(results) == {"<architecture> pkg", "<architecture> ."}
+    assert results["<architecture> ."]["files"] == ["setup.py"]
@@ -0,0 +1,78 @@
+from src.baseline import Baseline
+
+SCORED = {"dry_score": 8, "solid_score": 7, "full_analysis": "A.", "findings": []}
+FAILED = {"status": "failed", "dry_score": "N/A", "solid_score": "N/A"}
+
+
+def _baseline(tmp_path, results, blobs):
+    path = str(tmp_path / "cache" / "baseline.jsonl")
+    Baseline(path).save(
+        {"repo": "org/api", "commit_sha": "base1", "config_fingerprint": "f1"},
+        results,
+        blobs,
+    )
+    return Baseline(path)
+
+
+def test_load_requires_same_repository_and_config(tmp_path):
+    """Test that a baseline of another repository or config is not used."""
+    baseline = _baseline(tmp_path, {"a.py": SCORED}, {"a.py": "1"})
+
+    assert not baseline.load("org/web", "f1")
+    assert not baseline.load("org/api", "f2")
+    assert baseline.load("org/api", "f1")
+    assert baseline.results == {"a.py": SCORED}
+    assert baseline.blobs == {"a.py": "1"}
+
+
+def test_reuse_only_unchanged_analyzed_blobs(tmp_path):
+    """Test that only results of unchanged blobs that were analyzed are reused."""
+    baseline = _baseline(
+        tmp_path,
+        {"a.py": SCORED, "b.py": SCORED, "c.py": FAILED},
+        {"a.py": "1", "b.py": "2", "c.py": "3"},
+    )
+    baseline.load("org/api", "f1")
+
+    reused = baseline.reuse(
+        [
+            {"path": "a.py", "sha": "1"},
+            {"path": "b.py", "sha": "changed"},
+            {"path": "c.py", "sha": "3"},
+            {"path": "d.py", "sha": "4"},
+        ]
+    )
+
+    assert reused == {"a.py": SCORED}
+
+
+def test_compare_annotates_changes_and_removed_files(tmp_path):
+    """Test the baseline note of unchanged, changed, added and removed files."""
+    baseline = _baseline(
+        tmp_path,
+        {"a.py": SCORED, "b.py": SCORED, "gone.py": SCORED},
+        {"a.py": "1", "b.py": "2", "gone.py": "9"},
+    )
+    baseline.load("org/api", "f1")
+    entries = [
+        {"path": "a.py", "sha": "1"},
+        {"path": "b.py", "sha": "3"},
+        {"path": "new.py", "sha": "4"},
+    ]
+    results = {"a.py": SCORED, "b.py": dict(SCORED, dry_score=5), "new.py": SCORED}
+
+    compared = dict(baseline.compare(entries, results, merge_base="older"))
+
+    assert compared["a.py"]["baseline"]["status"] == "unchanged"
+    assert compared["b.py"]["dry_score"] == 5
+    assert compared["b.py"]["baseline"] == {
+        "status": "changed",
+        "commit": "base1",
+        "dry_score": 8,
+        "solid_score": 7,
+        "merge_base": "older",
+    }
+    assert compared["new.py"]["baseline"]["status"] == "added"
+    assert "dry_score" not in compared["new.py"]["baseline"]
+    assert compared["gone.py"]["status"] == "removed"
+    assert compared["gone.py"]["baseline"]["solid_score"] == 7
@@ -0,0 +1,34 @@
+from benchmarks.fake_servers import FakeRepository
+from benchmarks.run_benchmarks import compare, percentile, run_scenario
+
+
+def test_percentile():
+    """Test nearest-rank percentiles."""
+    samples = list(range(1, 101))
+
+    assert percentile(samples, 50) == 50
+    assert percentile(samples, 99) == 99
+    assert percentile([], 50) is None
+
+
+def test_fake_repository_is_deterministic():
+    """Test that the generated repository is identical across runs."""
+    first, second = FakeRepository(20), FakeRepository(20)
+
+    assert first.tree() == second.tree()
+    assert len([p for p in first.files if p.endswith(".py")]) == 20
+
+
+def test_run_scenario_end_to_end(tmp_path):
+    """Test a small end-to-end run against the local fake servers."""
+    scenario = run_scenario("smoke", 5, output_dir=str(tmp_path))
+
+    assert scenario["files_analyzed"] == 5
+    # The pinned benchmark config sends one request per unique file
+    assert scenario["openai_requests"] == 5
+    assert set(scenario["stages"]) >= {"get_files", "analyze_file", "save_results"}
+    assert scenario["peak_traced_memory_bytes"] > 0
+    assert (tmp_path / "analysis_feedback.md").exists()
+
+    report = {"scenarios": {"smoke": scenario}}
+    assert compare(report, report)[0].startswith("smoke: throughput")
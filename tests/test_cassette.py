@@ -0,0 +1,133 @@
+import gzip
+import pytest
+import requests
+from unittest.mock import MagicMock, patch
+from openai.types.chat import ChatCompletion
+from src.ai_client import AIClient
+from src.cassette import Cassette, CassetteMiss, active_cassette
+from src.concurrency import get_retry_after
+from src.github_client import GitHubAPIClient
+from src.resilience import classify_error
+
+COMPLETION = {
+    "id": "chatcmpl-1",
+    "object": "chat.completion",
+    "created": 1700000000,
+    "model": "gpt-4o-mini",
+    "choices": [
+        {
+            "index": 0,
+            "finish_reason": "stop",
+            "message": {"role": "assistant", "content": "**Score: 8/10**"},
+        }
+    ],
+    "usage": {"prompt_tokens": 12, "completion_tokens": 5, "total_tokens": 17},
+}
+
+
+def _response(status, body):
+    response = requests.Response()
+    response.status_code = status
+    response._content = body.encode("utf-8")
+    response.headers["Content-Type"] = "application/json"
+    response.headers["Authorization"] = "token secret-token"
+    return response
+
+
+def test_github_traffic_is_recorded_redacted_and_replayed(tmp_path, monkeypatch):
+    """Test that GitHub responses replay without a network and without secrets."""
+    monkeypatch.setenv("GITHUB_TOKEN", "secret-token")
+    path = str(tmp_path / "run.jsonl.gz")
+    session = MagicMock()
+    session.get.return_value = _response(200, '{"sha": "abc", "echo": "secret-token"}')
+
+    with Cassette(path, mode="record"):
+        data = GitHubAPIClient("secret-token", session).make_request("https://x/repo")
+    assert data == {"sha": "abc", "echo": "secret-token"}
+    assert active_cassette() is None
+
+    with gzip.open(path, "rt") as f:
+        recording = f.read()
+    assert "secret-token" not in recording
+    assert "[REDACTED]" in recording
+
+    offline = MagicMock()
+    offline.get.side_effect = AssertionError("no network on replay")
+    with Cassette(path, mode="replay", latency_scale=0):
+        client = GitHubAPIClient("", offline)
+        assert client.make_request("https://x/repo") == {
+            "sha": "abc",
+            "echo": "[REDACTED]",
+        }
+        with pytest.raises(CassetteMiss):
+            client.make_request("https://x/other")
+
+
+def test_openai_completions_and_errors_replay(tmp_path, monkeypatch):
+    """Test that completions and rate limit errors replay in recorded order."""
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-live")
+    path = str(tmp_path / "run.jsonl.gz")
+    rate_limited = Exception("Rate limit reached")
+    rate_limited.status_code = 429
+    rate_limited.response = MagicMock(headers={"retry-after": "2"})
+
+    with Cassette(path, mode="record"):
+        client = AIClient()
+        client.client = MagicMock()
+        client.client.chat.completions.create.side_effect = [
+            rate_limited,
+            ChatCompletion.model_validate(COMPLETION),
+        ]
+        request = {"model": "gpt-4o-mini", "messages": [], "max_tokens": 10}
+        with pytest.raises(Exception):
+            client._create(**request)
+        client._create(**request)
+
+    monkeypatch.delenv("OPENAI_API_KEY")
+    with Cassette(path, mode="replay", latency_scale=0):
+        client = AIClient()
+        client.client = MagicMock()
+        client.client.chat.completions.create.side_effect = AssertionError("network")
+        with pytest.raises(Exception) as excinfo:
+            client._create(**request)
+        response = client._create(**request)
+
+    assert type(excinfo.value).__name__ == "Exception"
+    assert classify_error(excinfo.value) == "rate_limited"
+    assert get_retry_after(excinfo.value) == 2.0
+    assert response.model_dump(mode="json") == ChatCompletion.model_validate(
+        COMPLETION
+    ).model_dump(mode="json")
+    assert response.usage.prompt_tokens == 12
+
+
+def test_replay_scales_recorded_latency(tmp_path):
+    """Test that replayed responses wait for the recorded latency times the scale."""
+    path = str(tmp_path / "run.jsonl.gz")
+    with Cassette(path, mode="record") as cassette:
+        with patch("src.cassette.time.perf_counter", side_effect=[1.0, 1.5]):
+            cassette.play("github", {"url": "u"}, lambda: "ok", str, str)
+
+    with patch("src.cassette.time.sleep") as mock_sleep:
+        with Cassette(path, mode="replay", latency_scale=2.0) as cassette:
+            assert cassette.play("github", {"url": "u"}, None, str, str) == "ok"
+    mock_sleep.assert_called_once_with(1.0)
+
+
+def test_from_config_environment_overrides(monkeypatch):
+    """Test that the environment selects the cassette mode, path and latency scale."""
+    monkeypatch.delenv("ANALYSIS_CASSETTE_MODE", raising=False)
+    assert not Cassette.from_config({}).enabled
+
+    monkeypatch.setenv("ANALYSIS_CASSETTE_MODE", "Replay")
+    monkeypatch.setenv("ANALYSIS_CASSETTE", "ci.jsonl.gz")
+    monkeypatch.setenv("ANALYSIS_CASSETTE_LATENCY", "0")
+    cassette = Cassette.from_config({"cassette": {"latency_scale": 0.5}})
+
+    assert (cassette.mode, cassette.path, cassette.latency_scale) == (
+        "replay",
+        "ci.jsonl.gz",
+        0.0,
+    )
+    with pytest.raises(ValueError):
+        Cassette(mode="rewind")
@@ -0,0 +1,70 @@
+from src.code_compactor import CodeCompactor, estimate_tokens
+
+SAMPLE = '''# Copyright (c) Example Corp.
+# Licensed under the MIT License.
+"""Module docstring.
+
+With a long description.
+"""
+
+
+class Greeter:
+    """Greets people.
+
+    More detail that the model does not need.
+    """
+
+    def greet(self, name):  # say hello
+        message = f"Hello, {name}"
+        return message
+
+    def template(self):
+        return """line one
+    line two"""
+'''
+
+
+def test_compact_keeps_original_line_numbers():
+    """Test that comments, blank lines and docstring bodies go, numbering stays."""
+    compacted = CodeCompactor().compact(SAMPLE)
+
+    assert compacted.lines[:4] == [
+        (3, '"""Module docstring."""'),
+        (9, "class Greeter:"),
+        (10, ' """Greets people."""'),
+        (15, " def greet(self, name):"),
+    ]
+    assert (16, '  message = f"Hello, {name}"') in compacted.lines
+    assert estimate_tokens(compacted.text()) < 0.7 * estimate_tokens(SAMPLE)
+    compile(compacted.text(), "sample.py", "exec")
+
+
+def test_compact_preserves_multiline_strings():
+    """Test that rows inside a multi-line string are kept verbatim."""
+    compacted = CodeCompactor().compact(SAMPLE)
+
+    assert (21, '    line two"""') in compacted.lines
+
+
+def test_compact_strip_docstrings_keeps_valid_bodies():
+    """Test that stripping a docstring-only body leaves a placeholder statement."""
+    code = 'def stub():\n    """Only a docstring."""\n'
+
+    compacted = CodeCompactor(docstrings="strip").compact(code)
+
+    assert compacted.lines == [(1, "def stub():"), (2, " ...")]
+
+
+def test_compact_returns_unparseable_code_unchanged():
+    """Test that code that does not parse is left as is."""
+    code = "def broken(:\n    pass"
+
+    compacted = CodeCompactor().compact(code)
+
+    assert compacted.lines == [(1, "def broken(:"), (2, "    pass")]
+
+
+def test_estimate_tokens():
+    """Test the token estimate counts words, symbols and whitespace runs."""
+    assert estimate_tokens("return x + 1") == 4
+    assert estimate_tokens("        return x") == 3
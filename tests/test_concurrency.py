@@ -0,0 +1,134 @@
+import random
+import threading
+import time
+from unittest.mock import MagicMock
+from src.concurrency import AdaptiveConcurrencyLimiter, get_retry_after, set_tenant
+
+
+def make_error(headers):
+    """Builds an object shaped like an OpenAI API error with response headers."""
+    error = MagicMock()
+    error.response.headers = headers
+    return error
+
+
+def test_get_retry_after_formats():
+    """Test Retry-After parsing from milliseconds, seconds and HTTP dates."""
+    assert get_retry_after(make_error({"retry-after-ms": "1500"})) == 1.5
+    assert get_retry_after(make_error({"retry-after": "3"})) == 3.0
+    assert (
+        get_retry_after(make_error({"retry-after": "Mon, 01 Jan 2001 00:00:00 GMT"}))
+        == 0.0
+    )
+    assert get_retry_after(make_error({})) is None
+    assert get_retry_after(Exception("no response")) is None
+
+
+def test_additive_increase_on_healthy_requests():
+    """Test that the limit grows by about one per window of successes."""
+    limiter = AdaptiveConcurrencyLimiter(initial=2, maximum=4)
+
+    for _ in range(2):
+        limiter.on_success(0.1)
+    assert limiter.current_limit in (2, 3)
+
+    for _ in range(20):
+        limiter.on_success(0.1)
+    assert limiter.current_limit == 4
+
+
+def test_multiplicative_decrease_on_rate_limit():
+    """Test that a 429 halves the limit and pauses new requests."""
+    limiter = AdaptiveConcurrencyLimiter(initial=8, cooldown_seconds=0)
+
+    limiter.on_rate_limited(retry_after=0.2)
+
+    assert limiter.current_limit == 4
+    start = time.monotonic()
+    with limiter.slot():
+        assert limiter.in_flight == 1
+    assert time.monotonic() - start >= 0.15
+    assert limiter.in_flight == 0
+
+
+def test_decrease_on_latency_spike_respects_cooldown():
+    """Test that latency spikes cut the limit at most once per cooldown."""
+    limiter = AdaptiveConcurrencyLimiter(initial=8, cooldown_seconds=60)
+    limiter.on_success(0.1)
+
+    limiter.on_success(1.0)
+    limiter.on_success(1.0)
+
+    assert limiter.current_limit == 4
+
+
+def test_slower_kinds_of_request_are_not_latency_spikes():
+    """Test that mixed fast and slow tiers keep the limit up when all are healthy."""
+    limiter = AdaptiveConcurrencyLimiter(initial=4, maximum=16, cooldown_seconds=0)
+    rng = random.Random(0)
+
+    for _ in range(500):
+        if rng.random() < 0.7:
+            limiter.on_success(rng.uniform(1, 2), kind="triage")
+        else:
+            limiter.on_success(rng.uniform(6, 10), kind="escalation")
+
+    assert limiter.current_limit == 16
+
+
+def test_limit_never_drops_below_minimum():
+    """Test that repeated rate limits stop at the configured minimum."""
+    limiter = AdaptiveConcurrencyLimiter(initial=4, minimum=2, cooldown_seconds=0)
+
+    for _ in range(5):
+        limiter.on_rate_limited()
+
+    assert limiter.current_limit == 2
+
+
+def test_from_config():
+    """Test building the limiter from the concurrency config section."""
+    limiter = AdaptiveConcurrencyLimiter.from_config(
+        {"concurrency": {"initial": 3, "min": 2, "max": 6}}
+    )
+
+    assert (limiter.current_limit, limiter.minimum, limiter.maximum) == (3, 2, 6)
+
+
+def test_free_slot_goes_to_tenant_with_fewest_in_flight():
+    """Test that a waiting tenant with fewer requests in flight gets the next slot."""
+    limiter = AdaptiveConcurrencyLimiter(initial=2, minimum=1, maximum=2)
+    acquired = []
+
+    def hold_slots():
+        set_tenant("big")
+        limiter.acquire()
+        limiter.acquire()
+        started.set()
+        release.wait()
+        limiter.release()
+        release_again.wait()
+        limiter.release()
+
+    def request(tenant):
+        set_tenant(tenant)
+        limiter.acquire()
+        acquired.append(tenant)
+
+    started, release, release_again = (threading.Event() for _ in range(3))
+    holder = threading.Thread(target=hold_slots)
+    holder.start()
+    started.wait()
+    waiters = [threading.Thread(target=request, args=(t,)) for t in ("big", "small")]
+    for waiter in waiters:
+        waiter.start()
+        time.sleep(0.05)
+
+    release.set()
+    time.sleep(0.1)
+    assert acquired == ["small"]
+
+    release_again.set()
+    for thread in [holder] + waiters:
+        thread.join(timeout=2)
+    assert acquired == ["small", "big"]
@@ -1,6 +1,6 @@
 import pytest
 import yaml
-from src.config_loader import load_config, ConfigManager
+from src.config_loader import config_fingerprint, load_config, ConfigManager
 
 
 @pytest.fixture
@@ -133,7 +133,7 @@ def test_validate_config(config_manager_with_defaults):
     # Invalid config (missing required section) should fail validation
     invalid_config = {
         "analysis": {},
-        "prompt_customization": {}
+        "prompt_customization": {},
         # Missing feedback_format
     }
     assert config_manager_with_defaults._validate_config(invalid_config) is False
@@ -156,3 +156,28 @@ def test_merge_configs(config_manager_with_defaults):
     assert merged["b"]["d"] == 3  # Unchanged nested
     assert merged["b"]["e"] == 5  # New nested
     assert merged["f"] == 6  # New top-level
+
+
+def test_config_path_from_environment(temp_config_file, monkeypatch):
+    """Test that ANALYSIS_CONFIG selects the config file."""
+    monkeypatch.setenv("ANALYSIS_CONFIG", str(temp_config_file))
+
+    assert ConfigManager().config_path == str(temp_config_file)
+    assert load_config()["analysis"]["dry"]["weight"] == 0.8
+
+
+def test_config_fingerprint_ignores_operational_settings():
+    """Test that only settings that change analysis output change the fingerprint."""
+    config = {"analysis": {"dry": {"weight": 0.6}}, "models": {"routing": "single"}}
+    operational = dict(
+        config,
+        scheduler={"deadline_seconds": 600},
+        concurrency={"max": 4},
+        metrics={"enabled": False},
+        feedback_format={"max_comments": 2},
+    )
+
+    assert config_fingerprint(operational) == config_fingerprint(config)
+    assert config_fingerprint(
+        dict(config, models={"routing": "cascade"})
+    ) != config_fingerprint(config)
@@ -0,0 +1,45 @@
+import json
+import threading
+from src.disk_cache import DiskCache
+
+
+def test_disk_cache_saves_while_other_threads_write(tmp_path):
+    """Test that saves without pruning are safe while entries are being added."""
+    cache = DiskCache(str(tmp_path / "cache.json"))
+    errors = []
+
+    def writer(index):
+        for item in range(2000):
+            cache.put(f"{index}:{item}", {"findings": [{"line": item}] * 10})
+
+    def saver():
+        for _ in range(20):
+            try:
+                cache.save(prune=False)
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(index,)) for index in range(4)]
+    threads += [threading.Thread(target=saver) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    cache.save(prune=False)
+
+    assert errors == []
+    assert len(json.loads((tmp_path / "cache.json").read_text())["entries"]) == 8000
+    assert [path.name for path in tmp_path.iterdir()] == ["cache.json"]
+
+
+def test_disk_cache_keeps_most_recently_used_entries(tmp_path):
+    """Test that a capped cache drops its least recently used entries when saved."""
+    path = str(tmp_path / "cache.json")
+    cache = DiskCache(path, max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.put(key, key.upper())
+    assert cache.get("a") == "A"
+
+    cache.save(prune=False)
+
+    assert DiskCache(path).entries == {"c": "C", "a": "A"}
@@ -0,0 +1,52 @@
+from src.file_filter import FileFilter, glob_to_regex, language_for
+
+
+def test_glob_to_regex():
+    """Test gitignore-style glob semantics."""
+    assert glob_to_regex("*.py").match("a/b/c.py")
+    assert glob_to_regex("venv/").match("venv/lib/site.py")
+    assert glob_to_regex("venv/").match("tools/venv/x.py")
+    assert glob_to_regex("build/*.py").match("build/x.py")
+    assert not glob_to_regex("build/*.py").match("build/sub/x.py")
+    assert not glob_to_regex("build/*.py").match("src/build/x.py")
+    assert glob_to_regex("**/migrations/**").match("app/migrations/0001.py")
+    assert glob_to_regex("src/**").match("src/a/b.py")
+
+
+def test_file_filter_checks_path_and_size():
+    """Test that files are filtered by extension, globs and size."""
+    file_filter = FileFilter(
+        extensions=[".py", ".ts"],
+        include=["src/**"],
+        exclude=["*_pb2.py"],
+        max_file_bytes=1000,
+    )
+
+    assert file_filter.check("src/app.py", 10) is None
+    assert file_filter.check("src/web/app.ts", 10) is None
+    assert file_filter.check("src/README.md", 10) == "extension"
+    assert file_filter.check("scripts/run.py", 10) == "not_included"
+    assert file_filter.check("src/api_pb2.py", 10) == "excluded"
+    assert file_filter.check("src/data.py", 5000) == "too_large"
+
+
+def test_file_filter_respects_gitattributes():
+    """Test linguist-generated/vendored rules, where the last match wins."""
+    file_filter = FileFilter(respect_gitattributes=True)
+    file_filter.load_gitattributes(
+        "# comment\n"
+        "gen/** linguist-generated\n"
+        "gen/keep.py -linguist-generated\n"
+        "third_party/ linguist-vendored=true\n"
+    )
+
+    assert file_filter.check("gen/models.py") == "generated"
+    assert file_filter.check("gen/keep.py") is None
+    assert file_filter.check("third_party/lib.py") == "generated"
+    assert file_filter.check("src/app.py") is None
+
+
+def test_language_for():
+    """Test language names by extension."""
+    assert language_for("a.py") == "Python"
+    assert language_for("web/app.tsx") == "TypeScript"
@@ -1,5 +1,6 @@
 import pytest
 from unittest.mock import patch
+from src.file_filter import FileFilter
 from src.github_client import GitHubClient, GitHubAPIClient, EnvironmentManager
 
 
@@ -59,6 +60,141 @@ def test_github_client_get_files(mock_make_request, mock_env_vars):
         assert files[1][0] == "folder/nested.py"
 
 
+@patch("src.github_client.GitHubAPIClient.make_request")
+def test_github_client_get_files_fetches_each_blob_once(
+    mock_make_request, mock_env_vars
+):
+    """Test that paths sharing a blob SHA are fetched once."""
+    mock_make_request.return_value = {
+        "tree": [
+            {"path": "a/util.py", "type": "blob", "sha": "111"},
+            {"path": "vendor/util.py", "type": "blob", "sha": "111"},
+            {"path": "b.py", "type": "blob", "sha": "222"},
+        ]
+    }
+
+    with patch(
+        "src.github_client.GitHubClient.get_file_content", return_value="x = 1"
+    ) as mock_content:
+        files = GitHubClient("test/repo").get_files()
+
+    assert [path for path, _ in files] == ["a/util.py", "vendor/util.py", "b.py"]
+    assert mock_content.call_count == 2
+
+
+@patch("src.github_client.GitHubAPIClient.make_request")
+def test_github_client_get_files_filters_before_fetching(
+    mock_make_request, mock_env_vars
+):
+    """Test that excluded, generated and oversized files are never fetched."""
+    mock_make_request.return_value = {
+        "tree": [
+            {"path": ".gitattributes", "type": "blob", "size": 30},
+            {"path": "src/app.py", "type": "blob", "size": 100},
+            {"path": "venv/lib/six.py", "type": "blob", "size": 100},
+            {"path": "gen/api.py", "type": "blob", "size": 100},
+            {"path": "data/huge.py", "type": "blob", "size": 10**7},
+        ]
+    }
+    file_filter = FileFilter(
+        exclude=["venv/"], max_file_bytes=10**6, respect_gitattributes=True
+    )
+
+    def content(path):
+        return "gen/** linguist-generated" if path == ".gitattributes" else "x = 1"
+
+    with patch(
+        "src.github_client.GitHubClient.get_file_content", side_effect=content
+    ) as mock_content:
+        files = GitHubClient("test/repo").get_files(file_filter=file_filter)
+
+    assert files == [("src/app.py", "x = 1")]
+    assert [c.args[0] for c in mock_content.call_args_list] == [
+        ".gitattributes",
+        "src/app.py",
+    ]
+
+
+@patch("src.github_client.GitHubAPIClient.make_request")
+def test_github_client_get_files_walks_truncated_tree(mock_make_request, mock_env_vars):
+    """Test that a truncated listing falls back to recursive subtree fetches."""
+    trees = {
+        "trees/test-branch?recursive=1": {"truncated": True, "tree": []},
+        "trees/test-branch": {
+            "tree": [
+                {"path": "setup.py", "type": "blob", "sha": "a"},
+                {"path": "src", "type": "tree", "sha": "t1"},
+                {"path": "docs", "type": "tree", "sha": "t3"},
+            ]
+        },
+        # Too large even on its own: walked one level down
+        "trees/t1?recursive=1": {"truncated": True, "tree": []},
+        "trees/t1": {
+            "tree": [
+                {"path": "app.py", "type": "blob", "sha": "b"},
+                {"path": "core", "type": "tree", "sha": "t2"},
+            ]
+        },
+        "trees/t2?recursive=1": {
+            "tree": [
+                {"path": "engine.py", "type": "blob", "sha": "c"},
+                {"path": "io", "type": "tree", "sha": "t4"},
+                {"path": "io/disk.py", "type": "blob", "sha": "d"},
+            ]
+        },
+        "trees/t3?recursive=1": {
+            "tree": [
+                {"path": "api", "type": "tree", "sha": "t5"},
+                {"path": "api/conf.py", "type": "blob", "sha": "e"},
+            ]
+        },
+    }
+
+    def request(url):
+        return trees[url.split("/git/")[1]]
+
+    mock_make_request.side_effect = request
+    client = GitHubClient("test/repo")
+
+    with patch(
+        "src.github_client.GitHubClient.get_file_content", side_effect=lambda p: p
+    ):
+        files = client.get_files()
+
+    assert sorted(path for path, _ in files) == [
+        "docs/api/conf.py",
+        "setup.py",
+        "src/app.py",
+        "src/core/engine.py",
+        "src/core/io/disk.py",
+    ]
+    assert files[0] == ("setup.py", "setup.py")
+    # Subtrees listed whole are not walked directory by directory
+    requested = sorted(
+        c.args[0].split("/git/")[1] for c in mock_make_request.call_args_list
+    )
+    assert requested == sorted(trees)
+
+
+@patch("src.github_client.GitHubAPIClient.make_request")
+def test_github_client_iter_files_fetches_lazily(mock_make_request, mock_env_vars):
+    """Test that file contents are only fetched as the iterator is consumed."""
+    mock_make_request.return_value = {
+        "tree": [
+            {"path": "a.py", "type": "blob", "sha": "1"},
+            {"path": "b.py", "type": "blob", "sha": "2"},
+        ]
+    }
+
+    with patch(
+        "src.github_client.GitHubClient.get_file_content", return_value="x = 1"
+    ) as mock_content:
+        files = GitHubClient("test/repo").iter_files()
+        assert next(files) == ("a.py", "x = 1")
+        assert mock_content.call_count == 1
+        assert list(files) == [("b.py", "x = 1")]
+
+
 def test_github_client_init(mock_env_vars):
     """Test GitHub client initialization."""
     client = GitHubClient("test/repo")
@@ -82,3 +218,15 @@ def test_github_client_api_error(mock_make_request, mock_env_vars):
 
     # Should return empty list on error
     assert files == []
+
+
+@patch("src.github_client.GitHubAPIClient.make_request")
+def test_github_client_get_commit_sha(mock_make_request, mock_env_vars):
+    """Test resolving the branch to a commit SHA pins later requests to it."""
+    mock_make_request.return_value = {"sha": "abc123"}
+
+    client = GitHubClient("test/repo")
+
+    assert client.get_commit_sha() == "abc123"
+    assert "abc123" in client._get_tree_url()
+    assert "abc123" in client._get_content_url("test.py")
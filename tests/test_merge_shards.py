@@ -0,0 +1,77 @@
+import pytest
+from unittest.mock import patch
+from src.merge_shards import main, merge_partials
+from src.result_store import ResultStore
+
+METADATA = {"repo": "test/repo", "commit_sha": "abc", "config_fingerprint": "f1"}
+
+
+def _result(dry, solid):
+    return {
+        "dry_score": dry,
+        "solid_score": solid,
+        "full_analysis": "Analysis.",
+        "findings": [],
+    }
+
+
+def _write_partial(tmp_path, index, count, results, **overrides):
+    path = str(tmp_path / f"analysis_results.shard-{index}-of-{count}.jsonl")
+    metadata = dict(METADATA, shard={"index": index, "count": count}, **overrides)
+    ResultStore(path).write(metadata, results)
+    return path
+
+
+def test_merge_partials_combines_shards(tmp_path):
+    """Test that partial results are merged into one report and store."""
+    partials = [
+        _write_partial(tmp_path, 0, 2, {"a.py": _result(8, 7)}),
+        _write_partial(tmp_path, 1, 2, {"b.py": _result(5, 6)}),
+    ]
+    output_file = str(tmp_path / "analysis_feedback.md")
+
+    results = merge_partials(partials, output_file=output_file)
+
+    assert dict(results) == {
+        "a.py": _result(8, 7),
+        "b.py": _result(5, 6),
+    }
+    metadata = ResultStore(str(tmp_path / "analysis_results.jsonl")).read_metadata()
+    assert metadata["commit_sha"] == "abc"
+    assert metadata["shards"] == 2
+    assert metadata["complete"] is True
+    with open(output_file) as f:
+        assert "## Analysis for b.py" in f.read()
+
+
+def test_merge_partials_marks_missing_shards_incomplete(tmp_path):
+    """Test that a merge without every shard is not a complete run."""
+    partials = [_write_partial(tmp_path, 0, 3, {"a.py": _result(8, 7)})]
+
+    merge_partials(partials, output_file=str(tmp_path / "analysis_feedback.md"))
+
+    metadata = ResultStore(str(tmp_path / "analysis_results.jsonl")).read_metadata()
+    assert metadata["complete"] is False
+
+
+def test_merge_partials_rejects_other_runs(tmp_path):
+    """Test that partials of different commits are not merged."""
+    partials = [
+        _write_partial(tmp_path, 0, 2, {}),
+        _write_partial(tmp_path, 1, 2, {}, commit_sha="def"),
+    ]
+
+    with pytest.raises(ValueError):
+        merge_partials(partials, output_file=str(tmp_path / "analysis_feedback.md"))
+
+
+@patch("src.merge_shards.post_pr_review")
+@patch("src.merge_shards.post_pr_comment")
+def test_merge_command_posts_one_comment(mock_comment, mock_review, tmp_path):
+    """Test that the merge command posts a single comment and review."""
+    partial = _write_partial(tmp_path, 0, 1, {"a.py": _result(8, 7)})
+
+    assert main([partial, "--output", str(tmp_path / "analysis_feedback.md")]) == 0
+
+    mock_comment.assert_called_once()
+    assert "a.py" in mock_review.call_args.args[0]
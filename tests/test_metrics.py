@@ -0,0 +1,53 @@
+import json
+from src.metrics import MetricsRegistry
+
+
+def test_counters_and_gauges():
+    """Test counters accumulate per label set and gauges keep the last value."""
+    registry = MetricsRegistry()
+
+    registry.increment("github_requests_total", endpoint="contents", status=200)
+    registry.increment("github_requests_total", endpoint="contents", status=200)
+    registry.increment("github_requests_total", endpoint="trees", status=200)
+    registry.set_gauge("concurrency_limit", 4)
+    registry.set_gauge("concurrency_limit", 8)
+
+    assert (
+        registry.get_counter("github_requests_total", endpoint="contents", status=200)
+        == 2
+    )
+    snapshot = registry.snapshot()
+    assert len(snapshot["counters"]) == 2
+    assert snapshot["gauges"][0]["value"] == 8
+
+
+def test_histogram_prometheus_output():
+    """Test that histograms render cumulative buckets, sum and count."""
+    registry = MetricsRegistry(prefix="test")
+
+    registry.observe("stage_duration_seconds", 0.02, stage="fetch")
+    registry.observe("stage_duration_seconds", 3, stage="fetch")
+
+    text = registry.to_prometheus()
+
+    assert "# TYPE test_stage_duration_seconds histogram" in text
+    assert 'test_stage_duration_seconds_bucket{stage="fetch",le="0.025"} 1' in text
+    assert 'test_stage_duration_seconds_bucket{stage="fetch",le="5"} 2' in text
+    assert 'test_stage_duration_seconds_bucket{stage="fetch",le="+Inf"} 2' in text
+    assert 'test_stage_duration_seconds_count{stage="fetch"} 2' in text
+
+
+def test_export_writes_json_and_textfile(tmp_path):
+    """Test exporting metrics to both formats."""
+    registry = MetricsRegistry()
+    with registry.timer("stage_duration_seconds", stage="save_results"):
+        pass
+    registry.increment("openai_tokens_total", 120, model="gpt-4o-mini", kind="prompt")
+
+    json_path, prom_path = tmp_path / "m.json", tmp_path / "m.prom"
+    registry.export(str(json_path), str(prom_path))
+
+    data = json.loads(json_path.read_text())
+    assert data["histograms"][0]["count"] == 1
+    assert data["counters"][0]["value"] == 120
+    assert "code_quality_openai_tokens_total" in prom_path.read_text()
@@ -0,0 +1,105 @@
+import json
+from unittest.mock import MagicMock, patch
+from src.multi_repo import MultiRepoAnalyzer, list_org_repos, parse_repo, summarize
+from src.post_comment import FeedbackFormatter
+from src.rollup import Rollup
+
+
+def _repo(name, archived=False, fork=False):
+    return {
+        "full_name": f"org/{name}",
+        "default_branch": "main",
+        "archived": archived,
+        "fork": fork,
+    }
+
+
+def test_parse_repo():
+    """Test splitting repository arguments into name and optional branch."""
+    assert parse_repo("org/api") == ("org/api", None)
+    assert parse_repo("org/web@develop") == ("org/web", "develop")
+
+
+@patch("src.multi_repo.EnvironmentManager.get_api_url")
+def test_list_org_repos_paginates_and_filters(mock_api_url):
+    """Test that every page is read and archived repositories and forks are dropped."""
+    mock_api_url.return_value = "https://api.github.com"
+    first_page = [_repo(f"r{i}") for i in range(98)] + [
+        _repo("old", archived=True),
+        _repo("copy", fork=True),
+    ]
+    api_client = MagicMock()
+    api_client.make_request.side_effect = [first_page, [_repo("last")]]
+
+    repos = list_org_repos(api_client, "org")
+
+    assert len(repos) == 99
+    assert ("org/last", "main") in repos
+    assert ("org/old", "main") not in repos
+    assert api_client.make_request.call_args_list[1].args[0].endswith("&page=2")
+
+    api_client.make_request.side_effect = [first_page, []]
+    repos = list_org_repos(api_client, "org", include_archived=True)
+    assert ("org/old", "main") in repos
+    assert ("org/copy", "main") not in repos
+
+
+@patch("src.multi_repo.CodeAnalyzer")
+def test_run_writes_summary_and_isolates_failures(mock_analyzer_class, tmp_path):
+    """Test that each repository gets its own directory and one failure does not stop the rest."""
+
+    def make_analyzer(repo, branch, shared, output_dir):
+        analyzer = MagicMock()
+        if repo == "org/broken":
+            analyzer.analyze_repo.side_effect = RuntimeError("boom")
+        else:
+            analyzer.analyze_repo.return_value = {
+                "a.py": {"dry_score": 8, "solid_score": 6},
+                "b.py": {"status": "failed"},
+            }
+        analyzer.github_client.get_default_branch.return_value = "main"
+        return analyzer
+
+    mock_analyzer_class.side_effect = make_analyzer
+    shared = MagicMock(config={})
+    runner = MultiRepoAnalyzer(
+        [("org/api", None), ("org/broken", "dev")],
+        output_dir=str(tmp_path),
+        shared=shared,
+    )
+
+    summaries = runner.run()
+
+    assert summaries["org/api"] == {
+        "files": 2,
+        "failed": 1,
+        "mean_score": 7.0,
+        "status": "ok",
+    }
+    assert summaries["org/broken"] == {"status": "failed", "error": "boom"}
+    assert (tmp_path / "org__api").is_dir()
+    shared.save_caches.assert_called_once()
+    shared.export_metrics.assert_called_once_with(str(tmp_path))
+    with open(tmp_path / "analysis_summary.json") as f:
+        assert json.load(f) == summaries
+    assert mock_analyzer_class.call_args_list[0].kwargs["shared"] is shared
+
+
+def test_summarize_uses_the_report_score():
+    """Test that the mean score is weighted like the report and the rollup."""
+    config = {"analysis": {"dry": {"weight": 0.75}, "solid": {"weight": 0.25}}}
+    results = {
+        "a.py": {"dry_score": 8, "solid_score": 4, "full_analysis": ""},
+        # A single score is not enough for a combined score
+        "b.py": {"dry_score": 2, "solid_score": "N/A", "full_analysis": ""},
+    }
+    rollup = Rollup.from_config(config)
+    rollup.update("a.py", results["a.py"])
+
+    summary = summarize(results, {"dry_weight": 0.75, "solid_weight": 0.25})
+
+    assert summary["mean_score"] == 7.0
+    assert rollup.snapshot()[""]["score"] == 7.0
+    assert "7.0" in FeedbackFormatter(config).format_all_feedback(
+        {"a.py": results["a.py"]}
+    )
@@ -1,5 +1,7 @@
 from unittest.mock import MagicMock, patch
+from src.config_loader import config_fingerprint
 from src.post_comment import (
+    CommentSplitter,
     get_analysis_feedback,
     FeedbackFormatter,
     FeedbackProvider,
@@ -141,13 +143,14 @@ def test_github_pr_commenter_validation(mock_getenv, mock_extract_pr):
     commenter = GitHubPRCommenter()
 
     # Validation should fail
-    assert commenter._validate() is False
+    assert commenter.validate() is False
 
 
+@patch("requests.get")
 @patch("requests.post")
 @patch("src.post_comment.GitHubPRCommenter._extract_pr_number")
 @patch("os.getenv")
-def test_github_pr_commenter_post(mock_getenv, mock_extract_pr, mock_post):
+def test_github_pr_commenter_post(mock_getenv, mock_extract_pr, mock_post, mock_get):
     """Test posting a PR comment."""
     # Setup environment variables
     mock_getenv.side_effect = lambda key, default=None: {
@@ -164,6 +167,12 @@ def test_github_pr_commenter_post(mock_getenv, mock_extract_pr, mock_post):
     mock_response.status_code = 201
     mock_post.return_value = mock_response
 
+    # No previous report comments exist on the PR
+    mock_list_response = MagicMock()
+    mock_list_response.status_code = 200
+    mock_list_response.json.return_value = []
+    mock_get.return_value = mock_list_response
+
     # Create a commenter and post a comment
     commenter = GitHubPRCommenter()
     commenter.repo = "test/repo"  # Set the repo directly
@@ -178,3 +187,170 @@ def test_github_pr_commenter_post(mock_getenv, mock_extract_pr, mock_post):
     call_args = mock_post.call_args[0][0]  # Get the URL directly from positional args
     assert "test/repo" in call_args
     assert "123" in call_args
+
+
+@patch("src.post_comment.analyze_repo")
+@patch("src.post_comment.FeedbackProvider._get_current_commit_sha")
+def test_feedback_provider_reuses_fresh_results(mock_commit_sha, mock_analyze_repo):
+    """Test that fresh stored results are reused without re-running analysis."""
+    mock_store = MagicMock()
+    mock_store.read_metadata.return_value = {"repo": "test/repo", "ref": "main"}
+    mock_store.is_fresh.return_value = True
+    mock_store.load_results.return_value = {
+        "src/test_file.py": {"dry_score": 6, "solid_score": 7, "full_analysis": "X"}
+    }
+    mock_commit_sha.return_value = "abc123"
+
+    provider = FeedbackProvider()
+    provider.store = mock_store
+    feedback = provider.get_feedback()
+
+    assert "src/test_file.py" in feedback
+    mock_analyze_repo.assert_not_called()
+
+
+@patch("src.post_comment.analyze_repo")
+@patch("src.post_comment.FeedbackProvider._get_current_commit_sha")
+def test_feedback_provider_reuses_partial_results(
+    mock_commit_sha, mock_analyze_repo, tmp_path
+):
+    """Test that a run stopped at its budget is rendered, not analyzed again."""
+    provider = FeedbackProvider(str(tmp_path / "results.jsonl"))
+    provider.store.write(
+        {
+            "repo": "test/repo",
+            "ref": "main",
+            "commit_sha": "abc123",
+            "config_fingerprint": config_fingerprint(provider.formatter.config),
+            "complete": False,
+        },
+        {
+            "src/done.py": {"dry_score": 6, "solid_score": 7, "full_analysis": "X"},
+            "src/late.py": {
+                "status": "skipped",
+                "reason": "deadline",
+                "dry_score": "N/A",
+                "solid_score": "N/A",
+                "full_analysis": "",
+                "findings": [],
+            },
+        },
+    )
+    mock_commit_sha.return_value = "abc123"
+
+    feedback = provider.get_feedback()
+
+    mock_analyze_repo.assert_not_called()
+    assert "src/done.py" in feedback
+    assert "`src/late.py`" in feedback
+
+
+@patch("src.post_comment.analyze_repo")
+@patch("src.post_comment.FeedbackProvider._get_current_commit_sha")
+def test_feedback_provider_reanalyzes_stale_results(mock_commit_sha, mock_analyze_repo):
+    """Test that stale stored results trigger a fresh analysis."""
+    mock_store = MagicMock()
+    mock_store.read_metadata.return_value = {"repo": "test/repo", "ref": "main"}
+    mock_store.is_fresh.return_value = False
+    mock_commit_sha.return_value = "def456"
+    mock_analyze_repo.return_value = {
+        "src/other.py": {"dry_score": 4, "solid_score": 5, "full_analysis": "Y"}
+    }
+
+    provider = FeedbackProvider()
+    provider.store = mock_store
+    feedback = provider.get_feedback()
+
+    mock_analyze_repo.assert_called_once()
+    assert "src/other.py" in feedback
+
+
+def _make_commenter():
+    """Creates a commenter with a PR context set directly."""
+    with patch("src.post_comment.GitHubPRCommenter._extract_pr_number"):
+        commenter = GitHubPRCommenter()
+    commenter.repo = "test/repo"
+    commenter.pr_number = "123"
+    commenter.token = "test-token"
+    return commenter
+
+
+def _list_response(comments):
+    """Builds a mocked response for the comment listing endpoint."""
+    response = MagicMock()
+    response.status_code = 200
+    response.json.return_value = comments
+    return response
+
+
+@patch("requests.patch")
+@patch("requests.post")
+@patch("requests.get")
+def test_github_pr_commenter_updates_existing_comment(mock_get, mock_post, mock_patch):
+    """Test that a previous report comment is edited in place."""
+    commenter = _make_commenter()
+    old_body = "<!-- github-code-quality:report part=1/1 hash=0000 -->\nOld report"
+    mock_get.return_value = _list_response(
+        [{"id": 1, "body": "Unrelated"}, {"id": 42, "body": old_body}]
+    )
+    mock_patch.return_value = MagicMock(status_code=200)
+
+    assert commenter.post_comment("New report") is True
+
+    mock_post.assert_not_called()
+    assert mock_patch.call_args[0][0].endswith("/issues/comments/42")
+    assert "New report" in mock_patch.call_args[1]["json"]["body"]
+
+
+@patch("requests.patch")
+@patch("requests.post")
+@patch("requests.get")
+def test_github_pr_commenter_skips_unchanged_report(mock_get, mock_post, mock_patch):
+    """Test that no write request is made when the report hash is unchanged."""
+    commenter = _make_commenter()
+    _, chunks = commenter._render_chunks("Same report")
+    mock_get.return_value = _list_response([{"id": 42, "body": chunks[0]}])
+
+    assert commenter.post_comment("Same report") is True
+
+    mock_post.assert_not_called()
+    mock_patch.assert_not_called()
+
+
+def test_comment_splitter_respects_limits():
+    """Test that oversized reports are split into bounded chunks."""
+    splitter = CommentSplitter(max_comments=3, max_chars=1200, reserve=200)
+    body = "".join(f"## Analysis for file{i}.py\n" + "x" * 300 + "\n" for i in range(5))
+
+    chunks = splitter.split(body)
+
+    assert len(chunks) == 2
+    assert all(len(chunk) <= 1000 for chunk in chunks)
+    assert "".join(chunks) == body
+
+    truncated = CommentSplitter(max_comments=1, max_chars=1200, reserve=200)
+    chunks = truncated.split(body)
+    assert len(chunks) == 1
+    assert "Report truncated" in chunks[0]
+
+
+def test_comment_splitter_keeps_details_blocks_balanced():
+    """Test that headings inside collapsed file sections are never split points."""
+    splitter = CommentSplitter(max_comments=10, max_chars=1200, reserve=200)
+    section = (
+        "<details>\n<summary><code>file{i}.py</code> (score 5.0)</summary>\n\n"
+        "## Analysis for file{i}.py\n\n### DRY Analysis\n" + "x" * 300 + "\n\n"
+        "## Findings\n" + "y" * 200 + "\n\n</details>\n\n"
+    )
+    body = "## Code Quality Summary\n\n" + "".join(
+        section.format(i=i) for i in range(4)
+    )
+    # One file too large for a comment of its own
+    body += section.format(i=9).replace("x" * 300, ("x" * 80 + "\n") * 20)
+
+    chunks = splitter.split(body)
+
+    assert len(chunks) > 3
+    for chunk in chunks:
+        assert len(chunk) <= 1000
+        assert chunk.count("<details>") == chunk.count("</details>")
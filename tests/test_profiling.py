@@ -0,0 +1,57 @@
+from concurrent.futures import ThreadPoolExecutor
+from src.profiling import ProfilingSession, profile_stage
+
+
+def test_profiling_disabled_by_default(monkeypatch):
+    """Test that profiling stays off without config or environment opt-in."""
+    monkeypatch.delenv("ANALYSIS_PROFILE", raising=False)
+
+    session = ProfilingSession.from_config({"profiling": {"enabled": False}})
+
+    assert session.enabled is False
+
+
+def test_profiling_enabled_from_environment(monkeypatch):
+    """Test the environment switch and stage selection."""
+    monkeypatch.setenv("ANALYSIS_PROFILE", "memory")
+    monkeypatch.setenv("ANALYSIS_PROFILE_STAGES", "analyze_file, save_results")
+
+    session = ProfilingSession.from_config({})
+
+    assert session.cpu is False
+    assert session.memory is True
+    assert session.stages == {"analyze_file", "save_results"}
+
+
+def test_profiling_session_writes_artifacts(tmp_path):
+    """Test that CPU and allocation profiles are written to the output directory."""
+    session = ProfilingSession(
+        output_dir=str(tmp_path), cpu=True, memory=True, stages=["build"]
+    )
+
+    with session:
+        with profile_stage("build"):
+            data = [str(i) * 10 for i in range(1000)]
+        with profile_stage("not_sampled"):
+            data.append("x")
+
+    assert (tmp_path / "analysis_profile.pstats").exists()
+    assert "cumulative" in (tmp_path / "analysis_profile.txt").read_text()
+    memory_report = (tmp_path / "analysis_memory.txt").read_text()
+    assert "[build]" in memory_report
+    assert "[not_sampled]" not in memory_report
+
+
+def _worker_hot_spot():
+    return sum(index * index for index in range(20000))
+
+
+def test_cpu_profile_includes_worker_threads(tmp_path):
+    """Test that functions run on a thread pool appear in the CPU profile."""
+    session = ProfilingSession(output_dir=str(tmp_path), cpu=True, top_n=200)
+
+    with session:
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            list(executor.map(lambda _: _worker_hot_spot(), range(4)))
+
+    assert "_worker_hot_spot" in (tmp_path / "analysis_profile.txt").read_text()
@@ -0,0 +1,199 @@
+from src.report_renderer import ReportRenderer, split_analysis_sections
+
+SAMPLE_ANALYSIS = (
+    "### DRY Analysis\n**Score: 8/10**\nDRY text.\n\n"
+    "### SOLID Analysis\n**Score: 6/10**\nSOLID text.\n\n"
+    "### Findings\n- Line 3: Issue"
+)
+
+
+def _file_formatter(path, result):
+    return f"## Analysis for {path}\n{result['full_analysis']}"
+
+
+def _make_results(count, analysis="x" * 200):
+    return {
+        f"file{i}.py": {
+            "dry_score": i % 10,
+            "solid_score": 5,
+            "full_analysis": analysis,
+        }
+        for i in range(count)
+    }
+
+
+def test_split_analysis_sections():
+    """Test that each section is extracted without its heading and score line."""
+    sections = split_analysis_sections(SAMPLE_ANALYSIS)
+
+    assert sections["dry"] == "DRY text."
+    assert sections["solid"] == "SOLID text."
+    assert sections["findings"] == "- Line 3: Issue"
+
+    unstructured = split_analysis_sections("Error analyzing code")
+    assert unstructured["dry"] == "Error analyzing code"
+    assert unstructured["solid"] == ""
+
+
+def test_report_renderer_orders_worst_first():
+    """Test that the summary and details list the worst files first."""
+    renderer = ReportRenderer(
+        {}, {"dry_weight": 0.5, "solid_weight": 0.5}, _file_formatter
+    )
+    results = {
+        "good.py": {"dry_score": 9, "solid_score": 9, "full_analysis": "A"},
+        "bad.py": {"dry_score": 2, "solid_score": 3, "full_analysis": "B"},
+        "failed.py": {"dry_score": "N/A", "solid_score": "N/A", "full_analysis": "C"},
+    }
+
+    report = renderer.render(results)
+
+    assert report.startswith("## Code Quality Summary")
+    assert (
+        report.index("`failed.py`")
+        < report.index("`bad.py`")
+        < report.index("`good.py`")
+    )
+    assert "| `bad.py` | 2 | 3 | 2.5 |" in report
+    assert report.count("<details>") == 3
+
+
+def test_report_renderer_respects_byte_budget():
+    """Test that details are truncated gracefully once the budget is reached."""
+    renderer = ReportRenderer(
+        {"max_report_bytes": 3000, "summary_rows": 5},
+        {"dry_weight": 0.5, "solid_weight": 0.5},
+        _file_formatter,
+    )
+
+    report = renderer.render(_make_results(50))
+
+    assert len(report.encode("utf-8")) <= 3200
+    assert "45 more file(s) not shown" in report
+    assert "omitted to stay within the 3000-byte report budget" in report
+
+
+def test_report_renderer_marks_failed_files():
+    """Test that files whose analysis failed are reported as failed."""
+    renderer = ReportRenderer({}, {}, _file_formatter)
+    results = _make_results(2)
+    results["broken.py"] = {
+        "status": "failed",
+        "error": "Error analyzing code: timeout",
+        "dry_score": "N/A",
+        "solid_score": "N/A",
+        "full_analysis": "",
+    }
+
+    report = renderer.render(results)
+
+    assert "Analyzed 3 file(s) (1 failed)." in report
+    assert "| `broken.py` | N/A | N/A | failed |" in report
+    assert "<code>broken.py</code> (score failed)" in report
+
+
+def test_report_renderer_leaves_out_skipped_files():
+    """Test that trivial files are counted but not listed."""
+    renderer = ReportRenderer({}, {}, _file_formatter)
+    results = _make_results(1)
+    results["pkg/__init__.py"] = {"status": "skipped", "reason": "trivial"}
+
+    report = renderer.render(results)
+
+    assert "Analyzed 1 file(s)" in report
+    assert "_1 trivial file(s) skipped._" in report
+    assert "__init__" not in report
+
+
+def test_report_renderer_names_files_left_by_the_scheduler():
+    """Test that files skipped at a deadline or token budget are named."""
+    renderer = ReportRenderer({"summary_rows": 1}, {}, _file_formatter)
+    results = _make_results(1)
+    results["late.py"] = {"status": "skipped", "reason": "deadline"}
+    results["later.py"] = {"status": "skipped", "reason": "deadline"}
+
+    report = renderer.render(results)
+
+    assert (
+        "**2 file(s) not analyzed (deadline reached):** `late.py` and 1 more" in report
+    )
+
+
+def test_report_renderer_lists_only_regressions_against_baseline():
+    """Test that a baseline comparison details only files that regressed enough."""
+    renderer = ReportRenderer({}, {}, _file_formatter, regression_threshold=1.0)
+
+    def compared(dry, solid, status, before=None):
+        note = {"status": status, "commit": "abcdef123"}
+        if before is not None:
+            note["dry_score"], note["solid_score"] = before
+        return {
+            "dry_score": dry,
+            "solid_score": solid,
+            "full_analysis": f"{status} analysis",
+            "baseline": note,
+        }
+
+    report = renderer.render(
+        {
+            "same.py": compared(8, 8, "unchanged", (8, 8)),
+            "worse.py": compared(4, 6, "changed", (8, 8)),
+            "slightly_worse.py": compared(8, 7, "changed", (8, 8)),
+            "new.py": compared(2, 2, "added"),
+        }
+    )
+
+    assert "## Code Quality Changes" in report
+    assert "Compared with `abcdef1`: 2 changed, 1 added, 0 removed." in report
+    assert "| `worse.py` | 8.0 | 5.0 | -3.0 |" in report
+    assert "slightly_worse.py" not in report
+    assert "new.py" not in report
+    assert "<summary><code>worse.py</code>" in report
+
+
+def test_report_renderer_notes_when_nothing_regressed():
+    """Test the change report when no file dropped by the threshold."""
+    renderer = ReportRenderer({}, {}, _file_formatter, regression_threshold=2.0)
+    result = {
+        "dry_score": 7,
+        "solid_score": 7,
+        "full_analysis": "",
+        "baseline": {
+            "status": "changed",
+            "commit": "abcdef123",
+            "merge_base": "0123456789",
+            "dry_score": 8,
+            "solid_score": 8,
+        },
+    }
+
+    report = renderer.render({"a.py": result})
+
+    assert "Mean score 8.0 → 7.0 (-1.0)." in report
+    assert "not at the merge base `0123456`" in report
+    assert "No file's score dropped by 2.0 or more." in report
+    assert "<details>" not in report
+
+
+def test_report_renderer_summarizes_rollup():
+    """Test that the summary gives the repository score and worst packages first."""
+    renderer = ReportRenderer({}, {}, _file_formatter)
+    rollup = {
+        "": {
+            "kind": "repo",
+            "files": 3,
+            "lines": 120,
+            "dry_score": 6.5,
+            "solid_score": 7.0,
+            "score": 6.75,
+        },
+        "src": {"kind": "package", "files": 2, "lines": 100, "score": 7.5},
+        "src/legacy": {"kind": "package", "files": 1, "lines": 20, "score": 3.0},
+        "docs": {"kind": "directory", "files": 1, "lines": 20, "score": 9.0},
+    }
+
+    report = renderer.render(_make_results(3), rollup)
+
+    assert "**Repository score: 6.75** (DRY 6.5, SOLID 7.0) over 3 file(s)" in report
+    assert report.index("`src/legacy`") < report.index("| `src` |")
+    assert "`docs`" not in report
@@ -0,0 +1,116 @@
+import time
+import pytest
+from unittest.mock import MagicMock
+from src.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    Hedger,
+    RetryPolicy,
+    classify_error,
+)
+
+
+def make_status_error(status):
+    """Builds an exception carrying an HTTP status code like the OpenAI SDK's."""
+    error = Exception(f"status {status}")
+    error.status_code = status
+    return error
+
+
+def test_classify_error():
+    """Test that errors are classified by status code and type."""
+    assert classify_error(make_status_error(429)) == "rate_limited"
+    assert classify_error(make_status_error(503)) == "transient"
+    assert classify_error(make_status_error(401)) == "fatal"
+    assert classify_error(ConnectionError("reset")) == "transient"
+    assert classify_error(ValueError("bad")) == "fatal"
+
+
+def test_retry_policy_backoff_with_jitter():
+    """Test that delays are capped, jittered and honour Retry-After."""
+    policy = RetryPolicy(max_attempts=3, base_delay=1.0, max_delay=4.0)
+
+    for attempt in range(1, 6):
+        assert 0 <= policy.delay(attempt) <= min(4.0, 2 ** (attempt - 1))
+    assert policy.delay(1, retry_after=2.5) == 2.5
+    assert policy.should_retry("transient", 2)
+    assert not policy.should_retry("transient", 3)
+    assert not policy.should_retry("fatal", 1)
+
+
+def test_circuit_breaker_opens_and_recovers():
+    """Test that the breaker opens at the threshold and closes after a probe."""
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    time.sleep(0.06)
+    breaker.before_call()  # the probe is allowed through
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # but only one at a time
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+
+
+def test_hedger_disabled_calls_directly():
+    """Test that a disabled hedger calls the function once on the caller's thread."""
+    hedger = Hedger(enabled=False)
+    func = MagicMock(return_value="result")
+
+    assert hedger.call(func) == "result"
+    func.assert_called_once()
+
+
+def test_hedger_sends_duplicate_for_slow_request():
+    """Test that a request slower than the percentile gets a faster duplicate."""
+    hedger = Hedger(enabled=True, percentile=95, min_samples=3)
+    for _ in range(3):
+        hedger.observe(0.01)
+    delays = iter([0.5, 0.0])
+
+    def request():
+        delay = next(delays)
+        time.sleep(delay)
+        return delay
+
+    start = time.monotonic()
+    assert hedger.call(request) == 0.0
+    assert time.monotonic() - start < 0.4
+
+
+def test_circuit_breaker_released_probe_lets_another_through():
+    """Test that releasing an inconclusive probe allows the next call to probe."""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+
+    assert breaker.before_call() is True
+    breaker.release_probe()
+    assert breaker.before_call() is True
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_hedger_does_not_count_time_waiting_for_a_thread():
+    """Test that a request queued behind busy threads is not hedged for waiting."""
+    hedger = Hedger(enabled=True, percentile=95, min_samples=3, max_workers=1)
+    for _ in range(3):
+        hedger.observe(0.05)
+
+    calls = []
+
+    def request():
+        calls.append(1)
+        time.sleep(0.01)
+        return "result"
+
+    hedger.call(lambda: None)  # starts the executor
+    busy = hedger._executor.submit(time.sleep, 0.2)
+    assert hedger.call(request) == "result"
+    busy.result()
+    assert len(calls) == 1
@@ -0,0 +1,28 @@
+from src.result_spool import ResultSpool
+
+
+def test_result_spool_reads_results_back_from_disk():
+    """Test that spooled results behave like a read-only dict."""
+    spool = ResultSpool()
+    spool.add("a.py", {"dry_score": 8, "findings": []})
+    spool.update({"b.py": {"dry_score": 5}})
+    spool.add("a.py", {"dry_score": 9})
+
+    assert len(spool) == 2
+    assert list(spool) == ["a.py", "b.py"]
+    assert spool["a.py"] == {"dry_score": 9}
+    assert "b.py" in spool and "c.py" not in spool
+    assert spool == {"a.py": {"dry_score": 9}, "b.py": {"dry_score": 5}}
+    assert spool.get("c.py") is None
+    spool.close()
+
+
+def test_on_add_sees_every_result():
+    """Test that the on_add callback is called for each added result."""
+    added = []
+    spool = ResultSpool(on_add=lambda path, result: added.append((path, result)))
+    spool.add("a.py", {"dry_score": 1})
+    spool.update({"b.py": {"dry_score": 2}})
+
+    assert added == [("a.py", {"dry_score": 1}), ("b.py", {"dry_score": 2})]
+    spool.close()
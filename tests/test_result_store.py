@@ -0,0 +1,47 @@
+from src.result_store import ResultStore
+
+
+def test_result_store_round_trip(tmp_path):
+    """Test writing and reading back metadata and results."""
+    store = ResultStore(str(tmp_path / "results.jsonl"))
+    results = {
+        "a.py": {"dry_score": 8, "solid_score": 7, "full_analysis": "A"},
+        "b.py": {"dry_score": 5, "solid_score": 6, "full_analysis": "B"},
+    }
+
+    store.write({"commit_sha": "abc123", "config_fingerprint": "fp"}, results)
+
+    metadata = store.read_metadata()
+    assert metadata["commit_sha"] == "abc123"
+    assert "generated_at" in metadata
+    assert store.load_results() == results
+
+
+def test_result_store_freshness(tmp_path):
+    """Test that results are only fresh for the same commit and config."""
+    store = ResultStore(str(tmp_path / "results.jsonl"))
+    store.write({"commit_sha": "abc123", "config_fingerprint": "fp"}, {})
+
+    assert store.is_fresh("abc123", "fp") is True
+    assert store.is_fresh("def456", "fp") is False
+    assert store.is_fresh("abc123", "other") is False
+    assert store.is_fresh(None, "fp") is False
+
+
+def test_result_store_partial_run_is_fresh(tmp_path):
+    """Test that a run stopped at its budget is reused for the same commit."""
+    store = ResultStore(str(tmp_path / "results.jsonl"))
+    store.write(
+        {"commit_sha": "abc123", "config_fingerprint": "fp", "complete": False}, {}
+    )
+
+    assert store.is_fresh("abc123", "fp") is True
+    assert store.is_fresh("def456", "fp") is False
+
+
+def test_result_store_missing_file(tmp_path):
+    """Test that a missing store is never considered fresh."""
+    store = ResultStore(str(tmp_path / "missing.jsonl"))
+
+    assert store.read_metadata() is None
+    assert store.is_fresh("abc123", "fp") is False
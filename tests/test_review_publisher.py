@@ -0,0 +1,173 @@
+from unittest.mock import MagicMock, patch
+from src.review_publisher import (
+    REVIEW_MARKER_PATTERN,
+    SUPERSEDED_BODY,
+    PullRequestReviewer,
+    map_diff_positions,
+)
+
+SAMPLE_PATCH = (
+    "@@ -1,3 +1,4 @@\n"
+    " import os\n"
+    "-import sys\n"
+    "+import json\n"
+    "+import re\n"
+    " \n"
+    "@@ -10,2 +11,2 @@ def main():\n"
+    "-    pass\n"
+    "+    return 1\n"
+    "     # end"
+)
+
+
+def test_map_diff_positions():
+    """Test mapping new-file lines to positions across multiple hunks."""
+    positions = map_diff_positions(SAMPLE_PATCH)
+
+    assert positions[1] == 1  # context line
+    assert positions[2] == 3  # first added line, after the removed line
+    assert positions[3] == 4
+    assert positions[4] == 5
+    assert positions[11] == 8  # second hunk header counts as a position
+    assert positions[12] == 9
+    assert 10 not in positions
+
+
+def test_build_review_rolls_up_findings_outside_diff():
+    """Test that only findings on changed lines become inline comments."""
+    reviewer = PullRequestReviewer("test/repo", "123", "token")
+    results = {
+        "app.py": {
+            "findings": [
+                {"line": 2, "message": "Unused import"},
+                {"line": 2, "message": "Import order"},
+                {"line": 40, "message": "Long function"},
+            ]
+        },
+        "other.py": {"findings": [{"line": 1, "message": "Missing docstring"}]},
+    }
+
+    comments, outside = reviewer.build_review(
+        results, {"app.py": map_diff_positions(SAMPLE_PATCH)}
+    )
+
+    assert comments == [
+        {"path": "app.py", "position": 3, "body": "Unused import\n\nImport order"}
+    ]
+    assert [(path, f["line"]) for path, f in outside] == [
+        ("app.py", 40),
+        ("other.py", 1),
+    ]
+    assert "other.py:1" in reviewer.build_summary(len(comments), outside)
+
+
+def make_get(reviews=(), review_comments=None):
+    """Returns a fake requests.get serving PR files, reviews and review comments."""
+    review_comments = review_comments or {}
+
+    def get(url, headers=None, params=None):
+        response = MagicMock(status_code=200)
+        if url.endswith("/files"):
+            response.json.return_value = [{"filename": "app.py", "patch": SAMPLE_PATCH}]
+        elif url.endswith("/reviews"):
+            response.json.return_value = list(reviews)
+        else:
+            review_id = int(url.split("/")[-2])
+            response.json.return_value = review_comments.get(review_id, [])
+        return response
+
+    return get
+
+
+@patch("requests.post")
+@patch("requests.get")
+def test_submit_posts_single_review(mock_get, mock_post):
+    """Test that all inline comments are submitted through one review request."""
+    mock_get.side_effect = make_get()
+    mock_post.return_value = MagicMock(status_code=200)
+
+    reviewer = PullRequestReviewer("test/repo", "123", "token")
+    results = {
+        "app.py": {
+            "findings": [
+                {"line": 2, "message": "Unused import"},
+                {"line": 12, "message": "Magic number"},
+            ]
+        }
+    }
+
+    assert reviewer.submit(results) is True
+    mock_post.assert_called_once()
+    assert mock_post.call_args[0][0].endswith("/pulls/123/reviews")
+    payload = mock_post.call_args[1]["json"]
+    assert payload["event"] == "COMMENT"
+    assert len(payload["comments"]) == 2
+    assert REVIEW_MARKER_PATTERN.search(payload["body"])
+
+
+@patch("requests.delete")
+@patch("requests.put")
+@patch("requests.post")
+@patch("requests.get")
+def test_submit_retires_previous_reviews(mock_get, mock_post, mock_put, mock_delete):
+    """Test that a new review supersedes earlier ones instead of piling up."""
+    reviews = [
+        {"id": 7, "body": "<!-- github-code-quality:review hash=aaaa -->\nold"},
+        {"id": 8, "body": "Looks good to me"},
+    ]
+    mock_get.side_effect = make_get(reviews, {7: [{"id": 70}, {"id": 71}]})
+    for mock in (mock_post, mock_put, mock_delete):
+        mock.return_value = MagicMock(status_code=200)
+
+    reviewer = PullRequestReviewer("test/repo", "123", "token")
+    results = {"app.py": {"findings": [{"line": 2, "message": "Unused import"}]}}
+
+    assert reviewer.submit(results) is True
+    mock_post.assert_called_once()
+    assert [c.args[0].rsplit("/", 1)[1] for c in mock_delete.call_args_list] == [
+        "70",
+        "71",
+    ]
+    mock_put.assert_called_once()
+    assert mock_put.call_args[0][0].endswith("/pulls/123/reviews/7")
+    assert mock_put.call_args[1]["json"] == {"body": SUPERSEDED_BODY}
+
+
+@patch("requests.put")
+@patch("requests.post")
+@patch("requests.get")
+def test_submit_skips_unchanged_review(mock_get, mock_post, mock_put):
+    """Test that identical findings on a later push post nothing."""
+    mock_get.side_effect = make_get()
+    mock_post.return_value = MagicMock(status_code=200)
+    reviewer = PullRequestReviewer("test/repo", "123", "token")
+    results = {"app.py": {"findings": [{"line": 2, "message": "Unused import"}]}}
+    reviewer.submit(results)
+    posted = mock_post.call_args[1]["json"]["body"]
+    mock_post.reset_mock()
+
+    mock_get.side_effect = make_get([{"id": 7, "body": posted}])
+    assert reviewer.submit(results) is True
+
+    mock_post.assert_not_called()
+    mock_put.assert_not_called()
+
+
+@patch("requests.put")
+@patch("requests.post")
+@patch("requests.get")
+def test_submit_updates_summary_only_review_in_place(mock_get, mock_post, mock_put):
+    """Test that a review without inline comments replaces the previous body."""
+    reviews = [{"id": 7, "body": "<!-- github-code-quality:review hash=aaaa -->\nold"}]
+    mock_get.side_effect = make_get(reviews)
+    mock_put.return_value = MagicMock(status_code=200)
+
+    reviewer = PullRequestReviewer("test/repo", "123", "token")
+    results = {"app.py": {"findings": [{"line": 40, "message": "Long function"}]}}
+
+    assert reviewer.submit(results) is True
+    mock_post.assert_not_called()
+    mock_put.assert_called_once()
+    body = mock_put.call_args[1]["json"]["body"]
+    assert REVIEW_MARKER_PATTERN.search(body)
+    assert "app.py:40" in body
@@ -0,0 +1,69 @@
+from src.rollup import Rollup, scopes_of
+
+
+def _result(dry, solid, lines):
+    return {"dry_score": dry, "solid_score": solid, "lines": lines}
+
+
+def test_scopes_of():
+    """Test that a file counts towards the repository and each directory above it."""
+    assert scopes_of("setup.py") == [""]
+    assert scopes_of("src/pkg/mod.py") == ["", "src", "src/pkg"]
+
+
+def test_scores_are_weighted_by_lines():
+    """Test line-weighted DRY, SOLID and combined scores per scope."""
+    rollup = Rollup(dry_weight=0.75, solid_weight=0.25)
+    rollup.update("src/big.py", _result(4, 8, 300))
+    rollup.update("src/small.py", _result(8, 8, 100))
+    rollup.update("docs/conf.py", _result(10, "N/A", 50))
+
+    assert rollup.score("src") == {
+        "kind": "directory",
+        "files": 2,
+        "lines": 400,
+        "dry_score": 5.0,
+        "solid_score": 8.0,
+        "score": 5.75,
+    }
+    repo = rollup.score()
+    assert repo["kind"] == "repo"
+    assert repo["files"] == 3
+    assert repo["dry_score"] == round((4 * 300 + 8 * 100 + 10 * 50) / 450, 2)
+    assert repo["solid_score"] == 8.0
+    assert rollup.score("docs")["score"] is None
+
+
+def test_updates_replace_and_remove_results_incrementally():
+    """Test that replacing or removing a result updates the scopes above it."""
+    rollup = Rollup()
+    rollup.update("pkg/__init__.py", {"status": "skipped", "reason": "trivial"})
+    rollup.update("pkg/a.py", _result(4, 4, 10))
+    rollup.update("pkg/b.py", _result(8, 8, 10))
+    assert rollup.score("pkg")["kind"] == "package"
+    assert rollup.score("pkg")["score"] == 6.0
+
+    rollup.update("pkg/a.py", _result(8, 8, 10))
+    assert rollup.score("pkg")["score"] == 8.0
+
+    rollup.update("pkg/b.py", {"status": "removed"})
+    rollup.remove("pkg/__init__.py")
+    assert rollup.score("pkg") == {
+        "kind": "directory",
+        "files": 1,
+        "lines": 10,
+        "dry_score": 8.0,
+        "solid_score": 8.0,
+        "score": 8.0,
+    }
+
+    rollup.remove("pkg/a.py")
+    assert rollup.score("pkg") is None
+    assert rollup.snapshot() == {}
+
+
+def test_architecture_results_are_not_files():
+    """Test that architecture results are left out of the rollup."""
+    rollup = Rollup()
+    rollup.update("src/", {"kind": "architecture", "dry_score": 1, "solid_score": 1})
+    assert rollup.snapshot() == {}
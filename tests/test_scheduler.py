@@ -0,0 +1,93 @@
+from unittest.mock import patch
+from src.scheduler import WorkScheduler
+
+ENTRIES = [
+    {"path": "small.py", "size": 100},
+    {"path": "big.py", "size": 5000},
+    {"path": "changed.py", "size": 10},
+    {"path": "churned.py", "size": 10},
+    {"path": "mid.py", "size": 120},
+]
+
+
+def test_scheduler_orders_by_priority_then_longest_first():
+    """Test priority ordering with largest-first tie-breaking."""
+    scheduler = WorkScheduler()
+
+    ordered = scheduler.order(
+        ENTRIES,
+        changed={"changed.py"},
+        churn={"churned.py": 3},
+        previous_scores={"small.py": 3, "mid.py": 9},
+    )
+
+    assert [entry["path"] for entry in ordered] == [
+        "changed.py",
+        "churned.py",
+        "big.py",
+        "small.py",
+        "mid.py",
+    ]
+
+
+def test_scheduler_priorities_are_configurable():
+    """Test that the priority list decides the order."""
+    scheduler = WorkScheduler.from_config({"scheduler": {"priority": ["low_score"]}})
+
+    ordered = scheduler.order(ENTRIES, previous_scores={"big.py": 8, "small.py": 2})
+
+    assert [entry["path"] for entry in ordered][-2:] == ["small.py", "big.py"]
+
+
+def test_scheduler_stops_at_token_budget_and_records_the_rest():
+    """Test that admission stops cleanly once the token budget is spent."""
+    scheduler = WorkScheduler(token_budget=100)
+    scheduler.start()
+    used = [0]
+
+    admitted = []
+    for entry in scheduler.admit(ENTRIES, lambda: (used[0], 0)):
+        admitted.append(entry["path"])
+        used[0] += 60
+
+    assert admitted == ["small.py", "big.py"]
+    assert scheduler.skipped == [
+        ("changed.py", "token_budget"),
+        ("churned.py", "token_budget"),
+        ("mid.py", "token_budget"),
+    ]
+
+
+@patch("src.scheduler.time.monotonic")
+def test_scheduler_stops_at_deadline(mock_monotonic):
+    """Test the wall-clock deadline."""
+    scheduler = WorkScheduler(deadline_seconds=60)
+    mock_monotonic.return_value = 1000.0
+    scheduler.start()
+
+    mock_monotonic.return_value = 1059.0
+    assert scheduler.stop_reason() is None
+    mock_monotonic.return_value = 1060.0
+    assert scheduler.stop_reason() == "deadline"
+
+
+def test_scheduler_stop_is_permanent():
+    """Test that work stays stopped once the budget is reached, even if usage drops."""
+    scheduler = WorkScheduler(token_budget=100)
+    scheduler.start()
+
+    assert scheduler.stop_reason(50, 60) == "token_budget"
+    assert scheduler.stop_reason(50, 0) == "token_budget"
+    assert list(scheduler.admit(ENTRIES, lambda: (0, 0))) == []
+
+    scheduler.start()
+    assert scheduler.stop_reason(50, 0) is None
+
+
+def test_scheduler_counts_tokens_from_start():
+    """Test that a client's tokens from earlier runs do not count against the budget."""
+    scheduler = WorkScheduler(token_budget=100)
+    scheduler.start(tokens_used=1000)
+
+    assert scheduler.stop_reason(1050, 0) is None
+    assert scheduler.stop_reason(1050, 50) == "token_budget"
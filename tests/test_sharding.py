@@ -0,0 +1,35 @@
+import pytest
+from src.sharding import assign_shards, parse_shard, select_shard
+
+ENTRIES = [
+    {"path": f"src/module_{index}.py", "sha": f"sha{index}", "size": size}
+    for index, size in enumerate([9000, 8000, 500, 400, 300, 200, 100, 50])
+] + [{"path": "vendor/module_0.py", "sha": "sha0", "size": 9000}]
+
+
+def test_assign_shards_is_deterministic_and_balanced():
+    """Test that every shard computes the same size-balanced assignment."""
+    assignment = assign_shards(ENTRIES, 2)
+
+    assert assignment == assign_shards(list(reversed(ENTRIES)), 2)
+    assert set(assignment.values()) == {0, 1}
+    # The two largest files land on different shards
+    assert assignment["src/module_0.py"] != assignment["src/module_1.py"]
+    # Copies of the same blob are analyzed together
+    assert assignment["vendor/module_0.py"] == assignment["src/module_0.py"]
+
+
+def test_select_shard_partitions_entries():
+    """Test that the shards together cover every entry exactly once."""
+    shards = [select_shard(ENTRIES, index, 3) for index in range(3)]
+
+    paths = [entry["path"] for shard in shards for entry in shard]
+    assert sorted(paths) == sorted(entry["path"] for entry in ENTRIES)
+
+
+def test_parse_shard():
+    """Test shard settings validation."""
+    assert parse_shard(None, None) == (None, None)
+    assert parse_shard("1", "4") == (1, 4)
+    with pytest.raises(ValueError):
+        parse_shard(4, 4)
@@ -0,0 +1,105 @@
+from src.unit_cache import UnitCache, extract_units
+
+SAMPLE = '''import os
+
+LIMIT = 10
+
+
+def helper(value):
+    """Doubles a value."""
+    return value * 2
+
+
+class Service:
+    """A service."""
+
+    retries = 3
+
+    @staticmethod
+    def run(path):
+        return os.path.exists(path)
+
+    def stop(self):
+        pass
+'''
+
+
+def test_extract_units():
+    """Test that functions, methods, class bodies and module code become units."""
+    units = {unit.name: unit for unit in extract_units(SAMPLE)}
+
+    assert set(units) == {
+        "<module>",
+        "helper",
+        "Service",
+        "Service.run",
+        "Service.stop",
+    }
+    assert units["<module>"].lines == [1, 3]
+    assert units["helper"].lines == [6, 7, 8]
+    assert units["Service"].lines == [11, 12, 14]
+    assert units["Service.run"].lines == [16, 17, 18]
+    assert extract_units("def broken(:") is None
+
+
+def test_normalized_hash_ignores_formatting_comments_and_docstrings():
+    """Test that only real code changes alter a unit's hash."""
+    original = {unit.name: unit.digest for unit in extract_units(SAMPLE)}
+    cosmetic = SAMPLE.replace('"""Doubles a value."""', "# Doubles it").replace(
+        "value * 2", "value  *  2"
+    )
+    changed = SAMPLE.replace("value * 2", "value * 3")
+
+    assert {u.name: u.digest for u in extract_units(cosmetic)} == original
+    changed_digests = {u.name: u.digest for u in extract_units(changed)}
+    assert changed_digests["helper"] != original["helper"]
+    assert changed_digests["Service.run"] == original["Service.run"]
+
+
+def test_unit_cache_moves_findings_with_unit(tmp_path):
+    """Test that cached findings follow their unit to a new position."""
+    path = str(tmp_path / "units.json")
+    helper = {u.name: u for u in extract_units(SAMPLE)}["helper"]
+    cache = UnitCache(path, fingerprint="abc")
+    cache.put(helper, {"dry_score": 8, "findings": [{"line": 8, "message": "x"}]})
+    cache.save()
+
+    shifted = {u.name: u for u in extract_units("\n\n" + SAMPLE)}["helper"]
+    result = UnitCache(path, fingerprint="abc").get(shifted)
+
+    assert result["dry_score"] == 8
+    assert result["findings"] == [{"line": 10, "message": "x"}]
+    assert UnitCache(path, fingerprint="other").get(shifted) is None
+
+
+def test_unit_cache_maps_findings_through_non_contiguous_units(tmp_path):
+    """Test that module findings stay on their statement when code between grows."""
+    code = 'import os\n\n\ndef main():\n    return 1\n\n\nif __name__ == "__main__":\n    main()\n'
+    grown = code.replace("    return 1\n", "    a = 1\n    b = 2\n    return a + b\n")
+    module = {u.name: u for u in extract_units(code)}["<module>"]
+    cache = UnitCache(str(tmp_path / "units.json"))
+    cache.put(module, {"dry_score": 8, "findings": [{"line": 9, "message": "x"}]})
+
+    moved = {u.name: u for u in extract_units(grown)}["<module>"]
+    result = cache.get(moved)
+
+    assert moved.lines == [1, 10, 11]
+    assert result["findings"] == [{"line": 11, "message": "x"}]
+
+
+def test_unit_cache_prunes_unused_entries(tmp_path):
+    """Test that saving drops entries for units not seen in the run."""
+    path = str(tmp_path / "units.json")
+    units = {u.name: u for u in extract_units(SAMPLE)}
+    cache = UnitCache(path)
+    cache.put(units["helper"], {"dry_score": 8})
+    cache.put(units["Service.run"], {"dry_score": 6})
+    cache.save()
+
+    cache = UnitCache(path)
+    cache.get(units["helper"])
+    cache.save()
+
+    cache = UnitCache(path)
+    assert cache.get(units["helper"]) is not None
+    assert cache.get(units["Service.run"]) is None
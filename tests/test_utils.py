@@ -1,5 +1,18 @@
+import io
+import json
+import logging
+import logging.handlers
 from unittest.mock import patch, MagicMock
-from src.utils import Logger, log, LogLevel, enable_file_logging, set_log_level
+from src.utils import (
+    JSONFormatter,
+    Logger,
+    RateLimitFilter,
+    log,
+    log_context,
+    LogLevel,
+    enable_file_logging,
+    set_log_level,
+)
 
 
 def test_logger_init():
@@ -20,8 +33,10 @@ def test_logger_configure(mock_stream_handler, mock_add_handler):
     logger = Logger(name="test-logger")
     logger.configure(LogLevel.DEBUG)
 
-    # Verify handler was added
-    mock_add_handler.assert_called_with(mock_handler)
+    # Verify the logger only enqueues and the console handler runs in the listener
+    queued_handler = mock_add_handler.call_args[0][0]
+    assert isinstance(queued_handler, logging.handlers.QueueHandler)
+    assert mock_handler in logger.listener.handlers
     assert logger.logger.level == LogLevel.DEBUG.value
 
 
@@ -44,8 +59,7 @@ def test_logger_get_file_handler(mock_makedirs, mock_file_handler):
 
 
 @patch("src.utils.Logger.get_file_handler")
-@patch("logging.Logger.addHandler")
-def test_logger_enable_file_logging(mock_add_handler, mock_get_file_handler):
+def test_logger_enable_file_logging(mock_get_file_handler):
     """Test enabling file logging."""
     # Setup mock
     mock_handler = MagicMock()
@@ -55,9 +69,10 @@ def test_logger_enable_file_logging(mock_add_handler, mock_get_file_handler):
     logger = Logger(name="test-logger")
     logger.enable_file_logging("test.log")
 
-    # Verify handler was added
+    # Verify the file handler is driven by the background listener
     mock_get_file_handler.assert_called_with("test.log")
-    mock_add_handler.assert_called_with(mock_handler)
+    assert mock_handler in logger.listener.handlers
+    logger.stop()
 
 
 @patch("src.utils._logger.debug")
@@ -100,3 +115,68 @@ def test_set_log_level_function(mock_configure):
 
     # Verify the logger's method was called
     mock_configure.assert_called_with(LogLevel.ERROR)
+
+
+def _capture(logger, formatter):
+    """Routes a logger's listener output into a string buffer."""
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(formatter)
+    logger.output_handlers = [handler]
+    logger._start_listener()
+    return stream
+
+
+def test_structured_json_records():
+    """Test that records carry context and call-site fields as JSON."""
+    logger = Logger(name="test-structured")
+    stream = _capture(logger, JSONFormatter())
+
+    with log_context(stage="analyze_file", file="a.py"):
+        logger.info("Analyzed file", tokens=120)
+    logger.flush()
+    logger.stop()
+
+    record = json.loads(stream.getvalue().strip())
+    assert record["message"] == "Analyzed file"
+    assert record["stage"] == "analyze_file"
+    assert record["file"] == "a.py"
+    assert record["tokens"] == 120
+    assert "run_id" in record
+
+
+def test_rate_limit_filter_samples_repeats():
+    """Test that repeated warnings are limited and the excess is counted."""
+    rate_filter = RateLimitFilter(burst=2, window_seconds=60, sample_every=5)
+
+    def make_record(message):
+        record = logging.LogRecord("t", logging.WARNING, "", 0, message, None, None)
+        record.fields = {"rate_key": "fetch_failed"}
+        return record
+
+    records = [make_record(f"Unable to fetch file{i}.py") for i in range(10)]
+    allowed = [record for record in records if rate_filter.filter(record)]
+
+    # Two in the burst, then every fifth repeat (the 5th and 10th)
+    assert len(allowed) == 4
+    assert allowed[2].fields["suppressed"] == 2
+
+    info = logging.LogRecord("t", logging.INFO, "", 0, "Info", None, None)
+    assert all(rate_filter.filter(info) for _ in range(10))
+
+
+@patch("src.utils.time.monotonic")
+def test_rate_limit_filter_drops_expired_windows(mock_monotonic):
+    """Test that windows of messages with variable text do not accumulate."""
+    rate_filter = RateLimitFilter(burst=1, window_seconds=60)
+
+    mock_monotonic.return_value = 1000.0
+    for i in range(100):
+        record = logging.LogRecord("t", logging.WARNING, "", 0, f"f{i}.py", None, None)
+        rate_filter.filter(record)
+    assert len(rate_filter._windows) == 100
+
+    mock_monotonic.return_value = 1061.0
+    record = logging.LogRecord("t", logging.WARNING, "", 0, "f0.py", None, None)
+    assert rate_filter.filter(record)
+    assert len(rate_filter._windows) == 1
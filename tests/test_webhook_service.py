@@ -0,0 +1,172 @@
+import hashlib
+import hmac
+import json
+import threading
+import requests
+from unittest.mock import MagicMock, patch
+from src.webhook_service import (
+    CoalescingQueue,
+    WebhookService,
+    parse_event,
+    verify_signature,
+)
+
+SECRET = "s3cret"
+
+
+def _sign(body):
+    return "sha256=" + hmac.new(SECRET.encode(), body, hashlib.sha256).hexdigest()
+
+
+def _pull_request(number=7, sha="a" * 40, action="synchronize"):
+    return {
+        "action": action,
+        "repository": {"full_name": "org/api", "owner": {"login": "org"}},
+        "pull_request": {
+            "number": number,
+            "draft": False,
+            "head": {"label": "org:feature", "sha": sha},
+        },
+    }
+
+
+def _push(sha="b" * 40, ref="refs/heads/feature"):
+    return {
+        "ref": ref,
+        "after": sha,
+        "repository": {"full_name": "org/api", "owner": {"login": "org"}},
+    }
+
+
+def _service(**kwargs):
+    return WebhookService(SECRET, shared=MagicMock(config={}), **kwargs)
+
+
+def test_verify_signature():
+    """Test that only payloads signed with the secret are accepted."""
+    body = b'{"zen": "Keep it simple."}'
+    assert verify_signature(SECRET, body, _sign(body))
+    assert not verify_signature(SECRET, body + b" ", _sign(body))
+    assert not verify_signature(SECRET, body, None)
+    assert not verify_signature(SECRET, body, "sha1=abc")
+
+
+def test_parse_event():
+    """Test turning pull request and push payloads into jobs for a head."""
+    assert parse_event("pull_request", _pull_request()) == {
+        "repo": "org/api",
+        "head": "org:feature",
+        "sha": "a" * 40,
+        "pr_numbers": {7},
+    }
+    assert parse_event("push", _push())["head"] == "org:feature"
+    assert parse_event("push", _push())["branch"] == "feature"
+
+    assert parse_event("pull_request", _pull_request(action="closed")) is None
+    assert parse_event("push", _push(ref="refs/tags/v1.0")) is None
+    assert parse_event("push", _push(sha="0" * 40)) is None
+    assert parse_event("issues", {}) is None
+
+
+def test_handle_rejects_bad_signatures_and_coalesces_pushes():
+    """Test that rapid events for the same head become one job at the latest commit."""
+    service = _service(debounce_seconds=0)
+
+    body = json.dumps(_push()).encode()
+    assert service.handle("push", body, "sha256=bad") == (401, "invalid signature")
+    assert service.handle("push", body, _sign(body)) == (202, "queued")
+
+    body = json.dumps(_pull_request(sha="c" * 40)).encode()
+    assert service.handle("pull_request", body, _sign(body)) == (202, "coalesced")
+    assert len(service.queue) == 1
+
+    key, job = service.queue.get()
+    assert job["sha"] == "c" * 40
+    assert job["pr_numbers"] == {7}
+
+
+def test_handle_refuses_when_queue_is_full():
+    """Test that deliveries beyond the queue size get a 503."""
+    service = _service(queue_size=1, debounce_seconds=60)
+    first = json.dumps(_pull_request()).encode()
+    second = json.dumps(_push(ref="refs/heads/other")).encode()
+
+    assert service.handle("pull_request", first, _sign(first))[0] == 202
+    assert service.handle("push", second, _sign(second)) == (503, "queue full")
+
+
+def test_queue_never_runs_a_key_twice_at_once():
+    """Test that a job queued while its key runs waits until the first is done."""
+    queue = CoalescingQueue(maxsize=10)
+    queue.put("head", {"pr_numbers": set(), "sha": "1"})
+    key, job = queue.get()
+    queue.put("head", {"pr_numbers": set(), "sha": "2"})
+
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(queue.get()))
+    waiter.start()
+    waiter.join(timeout=0.1)
+    assert got == []
+
+    queue.done(key)
+    waiter.join(timeout=2)
+    assert got[0][1]["sha"] == "2"
+
+
+@patch("src.webhook_service.post_pr_review")
+@patch("src.webhook_service.GitHubPRCommenter")
+@patch("src.webhook_service.GitHubClient")
+@patch("src.webhook_service.CodeAnalyzer")
+def test_process_posts_to_open_pull_requests_of_a_push(
+    mock_analyzer_class, mock_client_class, mock_commenter_class, mock_review, tmp_path
+):
+    """Test that a push is analyzed on its branch and reported to the head's open PRs."""
+    results = {"a.py": {"dry_score": 8, "solid_score": 7, "full_analysis": ""}}
+    mock_analyzer_class.return_value.analyze_repo.return_value = results
+    mock_client_class.return_value.get_open_pull_requests.return_value = [3, 5]
+    service = _service(output_dir=str(tmp_path))
+
+    service.process(parse_event("push", _push()))
+
+    kwargs = mock_analyzer_class.call_args.kwargs
+    # The branch name, so that pushes to a baseline branch refresh it
+    assert kwargs["branch"] == "feature"
+    assert kwargs["pr_number"] == 3
+    assert kwargs["shared"] is service.shared
+    assert kwargs["output_dir"] == str(tmp_path / "org__api" / "org_feature")
+    assert [c.args[:2] for c in mock_commenter_class.call_args_list] == [
+        ("org/api", 3),
+        ("org/api", 5),
+    ]
+    assert mock_commenter_class.return_value.post_comment.call_count == 2
+    assert mock_review.call_count == 2
+    service.shared.save_caches.assert_called_once_with(prune=False)
+
+
+def test_server_accepts_signed_webhooks():
+    """Test the HTTP endpoint end to end with a local fake delivery."""
+    service = _service(debounce_seconds=60)
+    server = service.make_server(port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{server.server_port}"
+    try:
+        body = json.dumps(_pull_request()).encode()
+        response = requests.post(
+            url,
+            data=body,
+            headers={
+                "X-GitHub-Event": "pull_request",
+                "X-Hub-Signature-256": _sign(body),
+            },
+        )
+        assert response.status_code == 202
+        assert response.json() == {"message": "queued"}
+
+        response = requests.post(url, data=body, headers={"X-GitHub-Event": "push"})
+        assert response.status_code == 401
+
+        assert requests.get(f"{url}/healthz").json() == {"message": "1 job(s) queued"}
+    finally:
+        server.shutdown()
+        server.server_close()